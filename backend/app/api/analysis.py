@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from app.schemas.analysis import InvestmentRecommendation, InvestmentAnalysisResponse
 from app.services.analysis_service import analysis_service
+from app.services.rate_limiter import UpstreamUnavailableError
 
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
@@ -18,6 +19,8 @@ async def get_investment_recommendation(symbol: str):
     try:
         recommendation = await analysis_service.analyze_coin(symbol.upper())
         return recommendation
+    except UpstreamUnavailableError:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -1,6 +1,20 @@
+from typing import Union
 from fastapi import APIRouter, HTTPException
-from app.schemas.backtest import BacktestRequest, BacktestResponse
+from app.schemas.backtest import (
+    BacktestRequest,
+    BacktestResponse,
+    BacktestSweepRequest,
+    BacktestSweepResponse,
+    BacktestJobResponse,
+    PortfolioBacktestRequest,
+    PortfolioBacktestResponse,
+    WalkForwardRequest,
+    WalkForwardResponse,
+    MonteCarloRequest,
+    MonteCarloResponse
+)
 from app.services.backtest_service import backtest_service
+from app.services.backtest_job_service import backtest_job_service, JobQueueFullError
 
 router = APIRouter(prefix="/backtest", tags=["backtest"])
 
@@ -21,6 +35,154 @@ async def run_backtest(request: BacktestRequest):
         raise HTTPException(status_code=500, detail=f"Backtest failed: {str(e)}")
 
 
+@router.post("/sweep", response_model=BacktestSweepResponse)
+async def run_sweep(request: BacktestSweepRequest):
+    """
+    パラメータスイープ（グリッドサーチ）を実行
+
+    指定したパラメータ範囲の全組み合わせをバックテストし、指標の上位順に返す
+    """
+    try:
+        result = await backtest_service.run_sweep(request)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sweep failed: {str(e)}")
+
+
+@router.post("/portfolio", response_model=PortfolioBacktestResponse)
+async def run_portfolio_backtest(request: PortfolioBacktestRequest):
+    """
+    複数銘柄のポートフォリオでバックテストを実行
+
+    現金を全銘柄で共有し、ポートフォリオ全体の資産曲線と銘柄ごとの損益寄与を返す
+    """
+    try:
+        result = await backtest_service.run_portfolio_backtest(request)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Portfolio backtest failed: {str(e)}")
+
+
+@router.post("/walk-forward", response_model=WalkForwardResponse)
+async def run_walk_forward(request: WalkForwardRequest):
+    """
+    ウォークフォワード分析を実行
+
+    インサンプルで最適化したパラメータのアウトオブサンプル成績をウィンドウごとに返す
+    """
+    try:
+        result = await backtest_service.run_walk_forward(request)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Walk-forward analysis failed: {str(e)}")
+
+
+@router.post("/monte-carlo", response_model=MonteCarloResponse)
+async def run_monte_carlo(request: MonteCarloRequest):
+    """
+    モンテカルロ分析を実行
+
+    取引リターンの復元抽出、または1本ごとのリターンのブロックブートストラップで
+    総リターン・最大ドローダウン・シャープレシオの分布と信頼区間を返す
+    """
+    try:
+        result = await backtest_service.run_monte_carlo(request)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Monte Carlo analysis failed: {str(e)}")
+
+
+async def _submit_job(kind: str, request) -> dict:
+    """ジョブを投入（待機中ジョブが上限なら429）"""
+    try:
+        return await backtest_job_service.submit(kind, request)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@router.post("/jobs/run", response_model=BacktestJobResponse, status_code=202)
+async def submit_backtest_job(request: BacktestRequest):
+    """
+    バックテストを非同期ジョブとして投入
+
+    ジョブIDを返す。状態は GET /backtest/jobs/{job_id}、結果は GET /backtest/jobs/{job_id}/result で取得
+    """
+    return await _submit_job("run", request)
+
+
+@router.post("/jobs/sweep", response_model=BacktestJobResponse, status_code=202)
+async def submit_sweep_job(request: BacktestSweepRequest):
+    """
+    パラメータスイープを非同期ジョブとして投入
+    """
+    return await _submit_job("sweep", request)
+
+
+@router.post("/jobs/walk-forward", response_model=BacktestJobResponse, status_code=202)
+async def submit_walk_forward_job(request: WalkForwardRequest):
+    """
+    ウォークフォワード分析を非同期ジョブとして投入
+    """
+    return await _submit_job("walk_forward", request)
+
+
+@router.post("/jobs/monte-carlo", response_model=BacktestJobResponse, status_code=202)
+async def submit_monte_carlo_job(request: MonteCarloRequest):
+    """
+    モンテカルロ分析を非同期ジョブとして投入
+    """
+    return await _submit_job("monte_carlo", request)
+
+
+@router.get("/jobs/{job_id}", response_model=BacktestJobResponse)
+async def get_job(job_id: str):
+    """
+    ジョブの状態と進捗を取得
+    """
+    job = await backtest_job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/result", response_model=Union[BacktestResponse, BacktestSweepResponse, WalkForwardResponse, MonteCarloResponse])
+async def get_job_result(job_id: str):
+    """
+    完了したジョブの結果を取得
+    """
+    job = await backtest_job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=400, detail=f"Job failed: {job['error']}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    result = await backtest_job_service.get_result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job result expired")
+    return result
+
+
+@router.delete("/jobs/{job_id}", response_model=BacktestJobResponse)
+async def cancel_job(job_id: str):
+    """
+    ジョブをキャンセル（待機中はキューから除外、実行中は中断）
+    """
+    job = await backtest_job_service.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.get("/strategies")
 async def get_available_strategies():
     """
@@ -0,0 +1,76 @@
+from fastapi import APIRouter
+from app.services.analysis_service import analysis_service
+from app.services.backtest_cache import backtest_cache
+from app.services.cache_codec import cache_codec
+from app.services.circuit_breaker import coingecko_breaker
+from app.services.compute_pool import compute_pool
+from app.services.crypto_service import crypto_service
+from app.services.http_client import http_client_service
+from app.services.prewarm_service import prewarm_service
+from app.services.rate_limiter import coingecko_limiter
+from app.services.redis_service import redis_service
+from app.services.single_flight import single_flight
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/http")
+async def get_http_metrics():
+    """
+    CoinGecko向けHTTPコネクションプールの利用状況を取得
+    """
+    return http_client_service.get_stats()
+
+
+@router.get("/rate-limit")
+async def get_rate_limit_metrics():
+    """
+    CoinGecko呼び出し予算（トークンバケット）の残量と優先度ごとの取得・待機件数を取得
+    """
+    return coingecko_limiter.get_stats()
+
+
+@router.get("/circuit-breaker")
+async def get_circuit_breaker_metrics():
+    """
+    CoinGecko呼び出しのサーキットブレーカーの状態（closed / open / half_open）と
+    成功・失敗・拒否の件数、障害中に最後に取得できたデータを返した件数を取得
+    """
+    return {
+        **coingecko_breaker.get_stats(),
+        "last_known_good_hits": crypto_service.last_known_good_hits,
+    }
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """
+    キャッシュ層（プロセス内LRU・Redis）ごとのヒット率、保存形式（コーデック）と圧縮率、
+    リクエスト集約・バックグラウンド再取得の件数、
+    投資推奨キャッシュのヒット率、バックテスト結果キャッシュの使用量を取得
+    """
+    return {
+        "tiers": redis_service.get_cache_stats(),
+        "codec": cache_codec.get_stats(),
+        "single_flight": single_flight.get_stats(),
+        "stale_while_revalidate": crypto_service.get_cache_stats(),
+        "recommendations": analysis_service.get_cache_stats(),
+        "backtest_results": backtest_cache.get_stats(),
+    }
+
+
+@router.get("/compute")
+async def get_compute_metrics():
+    """
+    バックテスト計算プールのキューの深さと実行時間を取得
+    """
+    return compute_pool.get_stats()
+
+
+@router.get("/prewarm")
+async def get_prewarm_metrics():
+    """
+    キャッシュ事前更新のキーごとの最終更新時刻・経過時間・遅延と、上流API予算の状況を取得
+    """
+    return prewarm_service.get_stats()
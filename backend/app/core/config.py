@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -32,6 +33,84 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Analysis
+    INDICATOR_BACKEND: str = "auto"  # auto / numpy / python
+    ANALYSIS_CONCURRENCY: int = 4  # analyze_top_coinsの同時分析数
+    ANALYSIS_CACHE_ENABLED: bool = True  # 同じ価格系列の投資推奨を再利用（現在価格は別途更新）
+    ANALYSIS_CACHE_TTL: int = 3600  # 秒
+
+    # Backtest
+    COMPUTE_POOL_KIND: str = "process"  # process / thread
+    COMPUTE_POOL_WORKERS: int = 0  # 0ならCPU数
+    BACKTEST_SWEEP_MAX_COMBINATIONS: int = 5000
+    BACKTEST_SWEEP_CHUNK_SIZE: int = 250  # プールへ1回に渡す組み合わせ数
+    BACKTEST_PORTFOLIO_MAX_SYMBOLS: int = 50
+    BACKTEST_JOB_MAX_CONCURRENT: int = 2  # 同時に実行する非同期ジョブ数（Redis使用時は全プロセスの合計）
+    BACKTEST_JOB_HEARTBEAT_INTERVAL: float = 10.0  # 実行中ジョブの生存通知の間隔（秒）
+    BACKTEST_JOB_HEARTBEAT_TIMEOUT: int = 60  # 生存通知がこの秒数途絶えた実行中ジョブは失敗扱い
+    BACKTEST_JOB_MAX_QUEUED: int = 100  # 待機中ジョブの上限（超えると429）
+    BACKTEST_JOB_TTL: int = 86400  # ジョブの状態・結果の保持期間（秒）
+    BACKTEST_CACHE_ENABLED: bool = True  # 同一リクエスト・同一価格データの結果を再利用
+    BACKTEST_CACHE_TTL: int = 86400  # Redisでの保持期間（秒）
+    BACKTEST_CACHE_LOCAL_MAX_BYTES: int = 32 * 1024 * 1024  # プロセス内LRUの上限（バイト）
+    BACKTEST_MONTE_CARLO_MAX_SIMULATIONS: int = 20000
+    BACKTEST_MONTE_CARLO_BATCH_SIZE: int = Field(500, gt=0)  # 1回にまとめて計算する試行数（メモリ使用量の上限）
+
+    # HTTP client (CoinGecko)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 秒
+    HTTP_CONNECT_TIMEOUT: float = 5.0  # 秒
+    HTTP_DEFAULT_TIMEOUT: float = 10.0  # 秒
+    HTTP2_ENABLED: bool = False  # 有効化には h2 パッケージが必要
+    COINGECKO_MARKETS_TIMEOUT: float = 10.0  # /coins/markets（秒）
+    COINGECKO_CHART_TIMEOUT: float = 15.0  # /coins/{id}/market_chart（秒）
+
+    # CoinGecko rate limit / retry
+    COINGECKO_RATE_LIMIT_PER_MINUTE: int = 30  # 上流APIの呼び出し予算
+    COINGECKO_RATE_LIMIT_BURST: int = 5  # 連続して呼び出せる回数
+    COINGECKO_RATE_LIMIT_BACKEND: str = "local"  # local / redis（全ワーカーで予算を共有）
+    COINGECKO_BACKGROUND_RESERVE: float = 1.0  # backgroundの呼び出しでは使わずに残す予算
+    COINGECKO_RATE_LIMIT_MAX_WAIT: float = 10.0  # 予算待ちの上限（秒、超えたら503）
+    COINGECKO_MAX_RETRIES: int = 3  # 429・5xx・通信エラーのリトライ回数
+    COINGECKO_RETRY_BASE_DELAY: float = 0.5  # 秒
+    COINGECKO_RETRY_MAX_DELAY: float = 10.0  # バックオフ・Retry-Afterの上限（秒）
+
+    # CoinGecko circuit breaker（障害時は最後に取得できたデータを古い値として返す）
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # 連続失敗でサーキットを開く回数
+    CIRCUIT_BREAKER_RECOVERY_TIMEOUT: float = 30.0  # 開いてから復旧を試すまでの秒数
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1  # 半開状態で同時に試す呼び出し数
+    LAST_KNOWN_GOOD_TTL: int = 7 * 86400  # 最後に取得できたデータの保持期間（秒）
+
+    # Cache（soft TTL経過後は古い値を返しつつ再取得、hard TTLで破棄）
+    PRICE_CACHE_SOFT_TTL: int = 60  # 秒
+    PRICE_CACHE_HARD_TTL: int = 600  # 秒
+    CHART_CACHE_SOFT_TTL: int = 300  # 秒
+    CHART_CACHE_HARD_TTL: int = 3600  # 秒
+    SINGLE_FLIGHT_DISTRIBUTED: bool = False  # Redisロックでワーカー間もリクエストを集約
+    SINGLE_FLIGHT_LOCK_TIMEOUT: float = 15.0  # 秒
+    LOCAL_CACHE_ENABLED: bool = True  # Redisの前段にプロセス内LRUを置く（Pub/Subで無効化）
+    LOCAL_CACHE_PREFIXES: List[str] = ["crypto:", "analysis:"]  # ローカル層に載せるキー
+    LOCAL_CACHE_MAX_BYTES: int = 16 * 1024 * 1024  # ローカル層の上限（JSONのバイト数）
+    LOCAL_CACHE_TTL: float = 30.0  # ローカル層で保持する最大秒数（通知を取りこぼした場合の上限）
+    CACHE_SERIALIZER: str = "orjson"  # json / orjson / msgpack（未インストールならjson）
+    CACHE_COMPRESSION: str = "zstd"  # none / zlib / zstd / lz4（未インストールなら圧縮しない）
+    CACHE_COMPRESSION_MIN_BYTES: int = 2048  # これ以上の値だけ圧縮（バイト）
+
+    # Prewarm（TTL切れ前に主要通貨のキャッシュをバックグラウンドで更新）
+    PREWARM_ENABLED: bool = True
+    PREWARM_SYMBOLS: List[str] = []  # 空なら対応している全通貨
+    PREWARM_CHART_DAYS: List[int] = [7, 30]  # 事前更新するチャートの日数
+    PREWARM_REFRESH_RATIO: float = 0.8  # soft TTLのこの割合が経過したら更新
+    PREWARM_JITTER: float = 0.1  # 更新間隔の揺らぎ（±割合）
+    PREWARM_CONCURRENCY: int = 2  # 同時に実行する更新数
+
+    # Price history store
+    PRICE_HISTORY_ENABLED: bool = True
+    PRICE_HISTORY_SYNC_INTERVAL: int = 300  # 末尾の差分を取り直す間隔（秒）
+    PRICE_ARCHIVE_ENABLED: bool = True  # 列指向アーカイブ（メモリマップ）を併用
+    PRICE_ARCHIVE_DIR: str = "data/price_archive"
+
     # External APIs
     COINGECKO_API_KEY: str = ""
     BINANCE_API_KEY: str = ""
@@ -38,7 +38,7 @@ async def get_db() -> AsyncSession:
 async def init_db():
     """データベースの初期化"""
     # モデルをインポート（テーブル作成のため）
-    from app.models import portfolio, virtual_portfolio  # noqa
+    from app.models import portfolio, virtual_portfolio, price_history  # noqa
 
     async with engine.begin() as conn:
         # テーブルを作成
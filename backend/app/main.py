@@ -1,10 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import init_db
 from app.services.redis_service import redis_service
-from app.api import crypto, portfolio, analysis, backtest, virtual_portfolio
+from app.services.http_client import http_client_service
+from app.services.compute_pool import compute_pool
+from app.services.backtest_job_service import backtest_job_service
+from app.services.prewarm_service import prewarm_service
+from app.services.rate_limiter import UpstreamUnavailableError
+from app.api import crypto, portfolio, analysis, backtest, virtual_portfolio, metrics
 
 
 @asynccontextmanager
@@ -17,8 +23,33 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✅ Database initialized")
 
+    await http_client_service.connect()
+    print("✅ HTTP client pool ready")
+
+    compute_pool.start()
+    print("✅ Compute pool ready")
+
+    await backtest_job_service.start()
+    print("✅ Backtest job workers started")
+
+    if settings.PREWARM_ENABLED:
+        prewarm_service.start()
+        print("✅ Cache prewarm scheduler started")
+
     yield
     # シャットダウン
+    await prewarm_service.stop()
+    print("❌ Cache prewarm scheduler stopped")
+
+    await backtest_job_service.stop()
+    print("❌ Backtest job workers stopped")
+
+    compute_pool.shutdown()
+    print("❌ Compute pool closed")
+
+    await http_client_service.disconnect()
+    print("❌ HTTP client pool closed")
+
     await redis_service.disconnect()
     print("❌ Redis disconnected")
 
@@ -40,6 +71,15 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(UpstreamUnavailableError)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailableError):
+    """上流APIのレート制限・障害（サーキットが開いている）で取得できなかった場合は503（Retry-After付き）を返す"""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, round(exc.retry_after)))
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+
 @app.get("/")
 async def root():
     """ルートエンドポイント"""
@@ -62,3 +102,4 @@ app.include_router(portfolio.router, prefix=settings.API_V1_PREFIX)
 app.include_router(analysis.router, prefix=settings.API_V1_PREFIX)
 app.include_router(backtest.router, prefix=settings.API_V1_PREFIX)
 app.include_router(virtual_portfolio.router, prefix=settings.API_V1_PREFIX)
+app.include_router(metrics.router, prefix=settings.API_V1_PREFIX)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Float, BigInteger
+from app.core.database import Base
+
+
+class PriceHistory(Base):
+    """価格履歴（通貨・粒度ごとの時系列）"""
+    __tablename__ = "price_history"
+
+    symbol = Column(String(10), primary_key=True)  # 通貨シンボル（BTC, ETH, etc.）
+    interval = Column(String(10), primary_key=True)  # 粒度（daily / hourly）
+    timestamp = Column(BigInteger, primary_key=True)  # UNIXタイムスタンプ（ミリ秒）
+    price = Column(Float, nullable=False)  # 価格（USD）
+
+    def __repr__(self):
+        return f"<PriceHistory(symbol={self.symbol}, interval={self.interval}, timestamp={self.timestamp})>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 
@@ -10,6 +10,14 @@ class BacktestStrategy(BaseModel):
     sell_signal: str = Field(..., description="売りシグナル条件 (rsi_overbought/macd_dead_cross/bb_upper_breach)")
     initial_capital: float = Field(10000.0, description="初期資金（USD）")
     trade_size_percent: float = Field(100.0, description="1回の取引で使用する資金の割合（%）")
+    rsi_period: int = Field(14, ge=1, description="RSIの期間")
+    rsi_oversold: float = Field(30.0, description="RSI売られすぎの閾値")
+    rsi_overbought: float = Field(70.0, description="RSI買われすぎの閾値")
+    macd_fast: int = Field(12, ge=1, description="MACD短期EMAの期間")
+    macd_slow: int = Field(26, ge=1, description="MACD長期EMAの期間")
+    macd_signal_period: int = Field(9, ge=1, description="MACDシグナルラインの期間")
+    bb_period: int = Field(20, ge=1, description="ボリンジャーバンドの期間")
+    bb_std_dev: float = Field(2.0, gt=0, description="ボリンジャーバンドの標準偏差倍率")
 
 
 class BacktestTrade(BaseModel):
@@ -92,3 +100,198 @@ class BacktestResponse(BaseModel):
                 "equity_curve": []
             }
         }
+
+
+class ParameterRange(BaseModel):
+    """スイープするパラメータの範囲（valuesを指定するか、start/stop/stepで指定）"""
+    values: Optional[List[float]] = Field(None, description="試す値のリスト")
+    start: Optional[float] = Field(None, description="開始値")
+    stop: Optional[float] = Field(None, description="終了値（含む）")
+    step: Optional[float] = Field(None, gt=0, description="刻み幅")
+
+
+class BacktestSweepRequest(BaseModel):
+    """パラメータスイープ（グリッドサーチ）リクエスト"""
+    symbol: str = Field(..., description="通貨シンボル")
+    strategy: BacktestStrategy = Field(..., description="基準となる戦略（スイープしないパラメータはこの値を使用）")
+    parameters: Dict[str, ParameterRange] = Field(
+        ...,
+        description="スイープするパラメータと範囲 (rsi_period/rsi_oversold/rsi_overbought/macd_fast/macd_slow/"
+                    "macd_signal_period/bb_period/bb_std_dev/trade_size_percent)"
+    )
+    period_days: int = Field(90, description="バックテスト期間（日数）")
+    sort_by: str = Field("total_return_percent", description="ランキングに使う指標")
+    top_n: int = Field(20, ge=1, description="返す上位件数")
+
+
+class BacktestSweepResult(BaseModel):
+    """パラメータの組み合わせごとの結果"""
+    rank: int = Field(..., description="順位")
+    parameters: Dict[str, Union[int, float]] = Field(..., description="パラメータの組み合わせ")
+    final_capital: float = Field(..., description="最終資金")
+    metrics: BacktestMetrics = Field(..., description="パフォーマンス指標")
+
+
+class BacktestSweepResponse(BaseModel):
+    """パラメータスイープ（グリッドサーチ）レスポンス"""
+    symbol: str = Field(..., description="通貨シンボル")
+    name: str = Field(..., description="通貨名")
+    strategy: BacktestStrategy
+    start_date: datetime = Field(..., description="バックテスト開始日")
+    end_date: datetime = Field(..., description="バックテスト終了日")
+    total_combinations: int = Field(..., description="評価した組み合わせ数")
+    skipped_combinations: int = Field(0, description="不正なため除外した組み合わせ数")
+    sort_by: str = Field(..., description="ランキングに使った指標")
+    elapsed_seconds: float = Field(..., description="計算時間（秒）")
+    results: List[BacktestSweepResult] = Field(..., description="上位の結果（sort_byの降順）")
+
+
+class BacktestJobResponse(BaseModel):
+    """非同期バックテストジョブの状態"""
+    job_id: str = Field(..., description="ジョブID")
+    kind: str = Field(..., description="ジョブの種類 (run/sweep/walk_forward/monte_carlo)")
+    status: str = Field(..., description="状態 (queued/running/completed/failed/cancelled)")
+    progress: float = Field(..., description="進捗（0.0〜1.0）")
+    error: Optional[str] = Field(None, description="失敗時のエラーメッセージ")
+    created_at: datetime = Field(..., description="投入日時")
+    started_at: Optional[datetime] = Field(None, description="実行開始日時")
+    finished_at: Optional[datetime] = Field(None, description="終了日時")
+
+
+class PortfolioBacktestRequest(BaseModel):
+    """ポートフォリオ（複数銘柄）バックテストリクエスト"""
+    symbols: List[str] = Field(..., min_length=1, description="通貨シンボルのリスト")
+    strategy: BacktestStrategy
+    period_days: int = Field(90, description="バックテスト期間（日数）")
+    position_sizing: str = Field(
+        "equal_weight",
+        description="ポジションサイズ (equal_weight: 総資産を銘柄数で等分 / cash_split: 現金を同時に買う銘柄で等分)"
+    )
+    rebalance_interval: int = Field(0, ge=0, description="保有銘柄を等配分に戻す間隔（本数、0ならリバランスしない）")
+
+
+class PortfolioBacktestTrade(BacktestTrade):
+    """ポートフォリオバックテストの取引記録"""
+    symbol: str = Field(..., description="通貨シンボル")
+
+
+class AssetAttribution(BaseModel):
+    """銘柄ごとの損益寄与"""
+    symbol: str = Field(..., description="通貨シンボル")
+    name: str = Field(..., description="通貨名")
+    trades: int = Field(..., description="取引回数（売買合計）")
+    winning_trades: int = Field(..., description="勝ちトレード数")
+    losing_trades: int = Field(..., description="負けトレード数")
+    win_rate: float = Field(..., description="勝率（%）")
+    profit_loss: float = Field(..., description="実現損益（USD）")
+    contribution_percent: float = Field(..., description="総リターン率への寄与（%）")
+
+
+class PortfolioBacktestResponse(BaseModel):
+    """ポートフォリオ（複数銘柄）バックテストレスポンス"""
+    symbols: List[str] = Field(..., description="通貨シンボルのリスト")
+    strategy: BacktestStrategy
+    position_sizing: str = Field(..., description="ポジションサイズ")
+    rebalance_interval: int = Field(..., description="リバランス間隔（本数）")
+    start_date: datetime = Field(..., description="バックテスト開始日")
+    end_date: datetime = Field(..., description="バックテスト終了日")
+    initial_capital: float = Field(..., description="初期資金")
+    final_capital: float = Field(..., description="最終資金")
+    trades: List[PortfolioBacktestTrade] = Field(..., description="取引履歴")
+    metrics: BacktestMetrics = Field(..., description="ポートフォリオ全体のパフォーマンス指標")
+    attribution: List[AssetAttribution] = Field(..., description="銘柄ごとの損益寄与")
+    equity_curve: List[dict] = Field(..., description="資産曲線 [{timestamp, value}]")
+
+
+class WalkForwardRequest(BaseModel):
+    """ウォークフォワード分析リクエスト"""
+    symbol: str = Field(..., description="通貨シンボル")
+    strategy: BacktestStrategy = Field(..., description="基準となる戦略（最適化しないパラメータはこの値を使用）")
+    parameters: Dict[str, ParameterRange] = Field(..., description="各ウィンドウで最適化するパラメータと範囲")
+    period_days: int = Field(365, description="分析期間（日数）")
+    in_sample_bars: int = Field(90, ge=10, description="インサンプル（最適化）区間の本数")
+    out_of_sample_bars: int = Field(30, ge=5, description="アウトオブサンプル（検証）区間の本数")
+    step_bars: Optional[int] = Field(None, ge=1, description="ウィンドウをずらす本数（省略時はアウトオブサンプルの本数）")
+    optimize_by: str = Field("total_return_percent", description="最適化に使う指標")
+
+
+class WalkForwardWindow(BaseModel):
+    """ウォークフォワードの1ウィンドウの結果"""
+    index: int = Field(..., description="ウィンドウ番号")
+    in_sample_start: datetime = Field(..., description="インサンプル開始日時")
+    in_sample_end: datetime = Field(..., description="インサンプル終了日時")
+    out_of_sample_start: datetime = Field(..., description="アウトオブサンプル開始日時")
+    out_of_sample_end: datetime = Field(..., description="アウトオブサンプル終了日時")
+    parameters: Dict[str, Union[int, float]] = Field(..., description="インサンプルで選ばれたパラメータ")
+    in_sample_metrics: BacktestMetrics = Field(..., description="インサンプルのパフォーマンス指標")
+    out_of_sample_metrics: BacktestMetrics = Field(..., description="アウトオブサンプルのパフォーマンス指標")
+
+
+class WalkForwardResponse(BaseModel):
+    """ウォークフォワード分析レスポンス"""
+    symbol: str = Field(..., description="通貨シンボル")
+    name: str = Field(..., description="通貨名")
+    strategy: BacktestStrategy
+    optimize_by: str = Field(..., description="最適化に使った指標")
+    total_combinations: int = Field(..., description="ウィンドウごとに評価した組み合わせ数")
+    windows: List[WalkForwardWindow] = Field(..., description="ウィンドウごとの結果")
+    profitable_windows: int = Field(..., description="アウトオブサンプルで利益が出たウィンドウ数")
+    out_of_sample_return_percent: float = Field(..., description="アウトオブサンプル区間をつないだ複利リターン率（%）")
+    walk_forward_efficiency: Optional[float] = Field(
+        None, description="アウトオブサンプルとインサンプルの1本あたり平均リターンの比"
+    )
+    equity_curve: List[dict] = Field(..., description="アウトオブサンプル区間をつないだ資産曲線 [{timestamp, value}]")
+    elapsed_seconds: float = Field(..., description="計算時間（秒）")
+
+
+class MonteCarloRequest(BaseModel):
+    """モンテカルロ分析リクエスト"""
+    symbol: str = Field(..., description="通貨シンボル")
+    strategy: BacktestStrategy
+    period_days: int = Field(90, description="バックテスト期間（日数）")
+    method: str = Field(
+        "trades", description="再標本化の方法 (trades: 取引リターンの復元抽出 / block_bootstrap: 1本ごとのリターンのブロック抽出)"
+    )
+    simulations: int = Field(1000, ge=100, description="試行回数")
+    block_size: Optional[int] = Field(None, ge=1, description="ブロック長（block_bootstrapのみ、省略時は系列長の立方根）")
+    confidence_level: float = Field(0.95, gt=0, lt=1, description="信頼区間の水準")
+    seed: int = Field(42, description="乱数シード（同じシードなら同じ結果）")
+
+
+class MetricHistogram(BaseModel):
+    """分布のヒストグラム"""
+    bin_edges: List[float] = Field(..., description="階級の境界")
+    counts: List[int] = Field(..., description="階級ごとの度数")
+
+
+class MetricDistribution(BaseModel):
+    """指標の分布"""
+    samples: int = Field(..., description="有効な試行数")
+    mean: float = Field(..., description="平均")
+    std: float = Field(..., description="標準偏差")
+    min: float = Field(..., description="最小値")
+    max: float = Field(..., description="最大値")
+    percentiles: Dict[str, float] = Field(..., description="パーセンタイル {p5, p25, p50, p75, p95}")
+    ci_lower: float = Field(..., description="信頼区間の下限")
+    ci_upper: float = Field(..., description="信頼区間の上限")
+    histogram: MetricHistogram
+
+
+class MonteCarloResponse(BaseModel):
+    """モンテカルロ分析レスポンス"""
+    symbol: str = Field(..., description="通貨シンボル")
+    name: str = Field(..., description="通貨名")
+    strategy: BacktestStrategy
+    method: str = Field(..., description="再標本化の方法")
+    simulations: int = Field(..., description="試行回数")
+    block_size: Optional[int] = Field(None, description="使用したブロック長（block_bootstrapのみ）")
+    confidence_level: float = Field(..., description="信頼区間の水準")
+    seed: int = Field(..., description="乱数シード")
+    observed: BacktestMetrics = Field(..., description="実際の価格経路でのパフォーマンス指標")
+    total_return_percent: Optional[MetricDistribution] = Field(None, description="総リターン率（%）の分布")
+    max_drawdown: Optional[MetricDistribution] = Field(None, description="最大ドローダウン（%）の分布")
+    sharpe_ratio: Optional[MetricDistribution] = Field(
+        None, description="シャープレシオの分布（tradesは取引単位、block_bootstrapは1本単位）"
+    )
+    probability_of_loss: float = Field(..., description="総リターンがマイナスになった試行の割合")
+    elapsed_seconds: float = Field(..., description="計算時間（秒）")
@@ -15,6 +15,8 @@ class CryptoPriceResponse(BaseModel):
     high_24h: Optional[float] = Field(None, description="24時間最高価格（USD）")
     low_24h: Optional[float] = Field(None, description="24時間最低価格（USD）")
     last_updated: datetime = Field(..., description="最終更新時刻")
+    is_stale: bool = Field(False, description="上流APIの障害中に最後に取得できたデータを返している場合True")
+    data_age_seconds: Optional[float] = Field(None, description="キャッシュから返した場合のデータ取得からの経過秒数")
 
     class Config:
         json_schema_extra = {
@@ -59,6 +61,8 @@ class ChartDataResponse(BaseModel):
     name: str = Field(..., description="通貨名")
     prices: list[ChartDataPoint] = Field(..., description="価格データポイントのリスト")
     total_points: int = Field(..., description="データポイント数")
+    is_stale: bool = Field(False, description="上流APIの障害中に最後に取得できたデータを返している場合True")
+    data_age_seconds: Optional[float] = Field(None, description="キャッシュから返した場合のデータ取得からの経過秒数")
 
     class Config:
         json_schema_extra = {
@@ -1,4 +1,5 @@
-from typing import List
+from typing import List, Optional, Sequence
+import asyncio
 import statistics
 from app.schemas.analysis import (
     InvestmentRecommendation,
@@ -7,17 +8,58 @@ from app.schemas.analysis import (
     MACDIndicator,
     BollingerBands
 )
+from app.schemas.crypto import CryptoPriceResponse
+from app.core.config import settings
 from app.services.crypto_service import crypto_service
+from app.services.redis_service import redis_service
+from app.services.backtest_cache import series_fingerprint
+from app.services import numpy_indicators
 
 
 class AnalysisService:
     """投資分析サービス"""
 
+    # これ未満のデータ点数では純Python実装の方が速い
+    NUMPY_MIN_POINTS = 64
+
+    # 投資推奨キャッシュのキー（シンボル・価格系列のフィンガープリントを付ける）
+    CACHE_KEY_PREFIX = "analysis:recommendation:"
+
+    def __init__(self):
+        # 指標計算バックエンド（auto: NumPyが使えればNumPy）
+        if settings.INDICATOR_BACKEND == "python" or not numpy_indicators.NUMPY_AVAILABLE:
+            self.backend = "python"
+        else:
+            self.backend = "numpy"
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _use_numpy(self, prices) -> bool:
+        """NumPyバックエンドを使うか判定（2次元配列は純Python実装で扱えないため常にNumPy）"""
+        if self.backend != "numpy":
+            return False
+        return len(prices) >= self.NUMPY_MIN_POINTS or getattr(prices, "ndim", 1) > 1
+
+    def _as_list(self, prices: Sequence[float]) -> List[float]:
+        """純Python実装用にリストへ変換（NumPy配列などを受け取った場合）"""
+        if isinstance(prices, list):
+            return prices
+        return numpy_indicators.as_array(prices).tolist()
+
+    def prepare_prices(self, prices: Sequence[float]) -> Sequence[float]:
+        """系列計算に使うバックエンドの形式（NumPy配列またはリスト）に一度だけ変換"""
+        if self._use_numpy(prices):
+            return numpy_indicators.as_array(prices)
+        return self._as_list(prices)
+
     def calculate_ema(self, prices: List[float], period: int) -> List[float]:
         """EMA（指数移動平均）を計算"""
         if len(prices) < period:
             return []
 
+        if self._use_numpy(prices):
+            return numpy_indicators.ema(prices, period).tolist()
+
         ema = []
         multiplier = 2 / (period + 1)
 
@@ -159,6 +201,9 @@ class AnalysisService:
         if len(prices) < 2:
             return 0.0
 
+        if self._use_numpy(prices):
+            return numpy_indicators.volatility(prices)
+
         # 価格変動率を計算
         returns = [(prices[i] - prices[i-1]) / prices[i-1] * 100
                    for i in range(1, len(prices))]
@@ -172,16 +217,19 @@ class AnalysisService:
 
         # 線形回帰の傾きを簡易計算
         n = len(prices)
-        x_mean = (n - 1) / 2
-        y_mean = sum(prices) / n
+        if self._use_numpy(prices):
+            slope, y_mean = numpy_indicators.trend_slope(prices)
+        else:
+            x_mean = (n - 1) / 2
+            y_mean = sum(prices) / n
 
-        numerator = sum((i - x_mean) * (prices[i] - y_mean) for i in range(n))
-        denominator = sum((i - x_mean) ** 2 for i in range(n))
+            numerator = sum((i - x_mean) * (prices[i] - y_mean) for i in range(n))
+            denominator = sum((i - x_mean) ** 2 for i in range(n))
 
-        if denominator == 0:
-            return "neutral", 0.0
+            if denominator == 0:
+                return "neutral", 0.0
 
-        slope = numerator / denominator
+            slope = numerator / denominator
 
         # トレンド強度を計算（傾きを正規化）
         price_range = max(prices) - min(prices)
@@ -201,6 +249,154 @@ class AnalysisService:
 
         return trend, trend_strength
 
+    def calculate_rsi_series(self, prices: Sequence[float], period: int = 14) -> Sequence[float]:
+        """RSIの系列を計算（i番目の値はcalculate_rsi(prices[:i+1])と一致）"""
+        if self._use_numpy(prices):
+            return numpy_indicators.rsi_series(prices, period)
+
+        prices = self._as_list(prices)
+        deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
+        gains = [d if d > 0 else 0 for d in deltas]
+        losses = [-d if d < 0 else 0 for d in deltas]
+
+        rsi_values = []
+        for i in range(len(prices)):
+            if i < period:
+                rsi_values.append(50.0)  # データ不足の場合は中立値
+                continue
+
+            avg_gain = sum(gains[i-period:i]) / period
+            avg_loss = sum(losses[i-period:i]) / period
+
+            if avg_loss == 0:
+                rsi_values.append(100.0)
+                continue
+
+            rs = avg_gain / avg_loss
+            rsi_values.append(100 - (100 / (1 + rs)))
+
+        return rsi_values
+
+    def calculate_macd_series(
+        self,
+        prices: Sequence[float],
+        fast: int = 12,
+        slow: int = 26,
+        signal_period: int = 9
+    ) -> dict:
+        """
+        MACDの系列を計算
+
+        既定の期間（12/26/9）では、i番目の値はcalculate_macd(prices[:i+1])と一致する。
+        """
+        if self._use_numpy(prices):
+            return numpy_indicators.macd_series(prices, fast, slow, signal_period)
+
+        prices = self._as_list(prices)
+        ema_fast = self.calculate_ema(prices, fast)
+        ema_slow = self.calculate_ema(prices, slow)
+        macd_line_values = [ema_fast[i] - ema_slow[i] for i in range(len(ema_slow))]
+        signal_line_values = self.calculate_ema(macd_line_values, signal_period)
+
+        series = {"macd_line": [], "signal_line": [], "histogram": [], "macd_signal": []}
+        for i in range(len(prices)):
+            # prices[:i+1]に対するMACDライン・シグナルラインの個数
+            macd_count = i + 1 - (slow - 1)
+            signal_count = macd_count - (signal_period - 1)
+
+            if macd_count < 1:
+                macd_line, signal_line, histogram, signal = 0.0, 0.0, 0.0, "neutral"
+            elif signal_count < 1:
+                macd_line = macd_line_values[macd_count - 1]
+                signal_line, histogram, signal = 0.0, macd_line, "neutral"
+            else:
+                macd_line = macd_line_values[macd_count - 1]
+                signal_line = signal_line_values[signal_count - 1]
+                histogram = macd_line - signal_line
+
+                # シグナル判定
+                signal = "neutral"
+                if signal_count >= 2:
+                    prev_histogram = macd_line_values[macd_count - 2] - signal_line_values[signal_count - 2]
+                    if prev_histogram < 0 and histogram > 0:
+                        signal = "buy"  # ゴールデンクロス
+                    elif prev_histogram > 0 and histogram < 0:
+                        signal = "sell"  # デッドクロス
+
+            series["macd_line"].append(macd_line)
+            series["signal_line"].append(signal_line)
+            series["histogram"].append(histogram)
+            series["macd_signal"].append(signal)
+
+        return series
+
+    def calculate_bollinger_series(self, prices: Sequence[float], period: int = 20, std_dev: float = 2) -> dict:
+        """ボリンジャーバンドの系列を計算（i番目の値はcalculate_bollinger_bands(prices[:i+1])と一致）"""
+        if self._use_numpy(prices):
+            return numpy_indicators.bollinger_series(prices, period, std_dev)
+
+        prices = self._as_list(prices)
+        series = {"upper_band": [], "middle_band": [], "lower_band": [], "bb_position": []}
+        for i in range(len(prices)):
+            if i + 1 < period:
+                middle = sum(prices[:i+1]) / (i + 1)
+                series["upper_band"].append(middle)
+                series["middle_band"].append(middle)
+                series["lower_band"].append(middle)
+                series["bb_position"].append("middle")
+                continue
+
+            recent_prices = prices[i+1-period:i+1]
+            middle_band = sum(recent_prices) / period
+            variance = sum((p - middle_band) ** 2 for p in recent_prices) / period
+            std = variance ** 0.5
+            upper_band = middle_band + (std * std_dev)
+            lower_band = middle_band - (std * std_dev)
+
+            current_price = prices[i]
+            if current_price > upper_band:
+                position = "above_upper"
+            elif current_price > middle_band:
+                position = "upper_half"
+            elif current_price > lower_band:
+                position = "lower_half"
+            else:
+                position = "below_lower"
+
+            series["upper_band"].append(upper_band)
+            series["middle_band"].append(middle_band)
+            series["lower_band"].append(lower_band)
+            series["bb_position"].append(position)
+
+        return series
+
+    def calculate_indicator_series(
+        self,
+        prices: Sequence[float],
+        rsi_period: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal_period: int = 9,
+        bb_period: int = 20,
+        bb_std_dev: float = 2
+    ) -> dict:
+        """
+        全期間のRSI/MACD/ボリンジャーバンド系列を一括計算
+
+        既定のパラメータでは、各系列のi番目の値はprices[:i+1]に対して
+        個別の計算関数を呼び出した結果と一致する。
+
+        Returns:
+            {"rsi", "macd_line", "signal_line", "histogram", "macd_signal",
+             "upper_band", "middle_band", "lower_band", "bb_position"} の系列辞書
+            （NumPyバックエンドではNumPy配列）
+        """
+        prices = self.prepare_prices(prices)
+        series = {"rsi": self.calculate_rsi_series(prices, rsi_period)}
+        series.update(self.calculate_macd_series(prices, macd_fast, macd_slow, macd_signal_period))
+        series.update(self.calculate_bollinger_series(prices, bb_period, bb_std_dev))
+        return series
+
     def calculate_recommendation_score(
         self,
         rsi: float,
@@ -344,20 +540,54 @@ class AnalysisService:
 
         return "、".join(reasons)
 
-    async def analyze_coin(self, symbol: str) -> InvestmentRecommendation:
-        """個別通貨を分析"""
-        # 現在価格を取得
-        price_data = await crypto_service.get_price(symbol)
+    async def analyze_coin(
+        self,
+        symbol: str,
+        price_data: Optional[CryptoPriceResponse] = None
+    ) -> InvestmentRecommendation:
+        """
+        個別通貨を分析（現在価格を取得済みなら渡す）
+
+        指標・スコアは価格系列だけで決まるため、シンボルと系列の内容（フィンガープリント）を
+        キーにキャッシュする。チャートが更新されれば別キーになり再計算される。
+        現在価格は価格キャッシュの更新間隔で別途差し替える。
+        """
+        if price_data is None:
+            # 現在価格と30日間の価格系列を並行して取得
+            price_data, series = await asyncio.gather(
+                crypto_service.get_price(symbol),
+                crypto_service.get_price_series(symbol, 30)
+            )
+        else:
+            series = await crypto_service.get_price_series(symbol, 30)
         if not price_data:
             raise ValueError(f"Price data not found for {symbol}")
 
-        # 30日間のチャートデータを取得
-        chart_data = await crypto_service.get_chart_data(symbol, 30)
-        if not chart_data or len(chart_data.prices) < 7:
+        if not series or len(series[1]) < 7:
             raise ValueError(f"Insufficient chart data for {symbol}")
 
-        prices = [p.price for p in chart_data.prices]
+        timestamps, prices = series
+
+        cache_key = None
+        if settings.ANALYSIS_CACHE_ENABLED:
+            cache_key = f"{self.CACHE_KEY_PREFIX}{symbol.upper()}:{series_fingerprint(timestamps, prices)}"
+            cached = await redis_service.get(cache_key)
+            if cached:
+                self.cache_hits += 1
+                return InvestmentRecommendation(**cached).model_copy(
+                    update={"symbol": symbol, "current_price": price_data.current_price}
+                )
+            self.cache_misses += 1
+
+        recommendation = self.build_recommendation(symbol, self._as_list(prices), price_data.current_price)
+        if cache_key:
+            await redis_service.set(
+                cache_key, recommendation.model_dump(mode="json"), expire=settings.ANALYSIS_CACHE_TTL
+            )
+        return recommendation
 
+    def build_recommendation(self, symbol: str, prices: List[float], current_price: float) -> InvestmentRecommendation:
+        """価格系列から投資推奨を作成"""
         # テクニカル指標を計算
         rsi = self.calculate_rsi(prices)
         volatility = self.calculate_volatility(prices)
@@ -397,8 +627,8 @@ class AnalysisService:
 
         return InvestmentRecommendation(
             symbol=symbol,
-            name=chart_data.name,
-            current_price=price_data.current_price,
+            name=crypto_service.get_coin_name(symbol),
+            current_price=current_price,
             recommendation_score=score,
             recommendation=recommendation,
             risk_level=risk_level,
@@ -406,20 +636,41 @@ class AnalysisService:
             reasoning=reasoning
         )
 
+    def get_cache_stats(self) -> dict:
+        """推奨キャッシュのヒット・ミス件数を取得"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": (self.cache_hits / lookups) if lookups else 0.0,
+        }
+
     async def analyze_top_coins(self, limit: int = 10) -> InvestmentAnalysisResponse:
         """トップ通貨を分析"""
         # 主要通貨のシンボル
         symbols = ["BTC", "ETH", "BNB", "XRP", "ADA", "SOL", "DOT", "DOGE", "AVAX", "MATIC"]
         symbols = symbols[:limit]
 
-        recommendations = []
-        for symbol in symbols:
-            try:
-                recommendation = await self.analyze_coin(symbol)
-                recommendations.append(recommendation)
-            except Exception as e:
-                print(f"Failed to analyze {symbol}: {e}")
-                continue
+        # 現在価格はキャッシュを1回のMGET（不足分はCoinGeckoへの1回のリクエスト）で一括取得
+        try:
+            prices = await crypto_service.get_prices_map(symbols)
+        except Exception as e:
+            print(f"Failed to fetch prices: {e}")
+            prices = {}
+
+        # 同時実行数を制限して並行分析（CoinGeckoのレート制限対策）
+        semaphore = asyncio.Semaphore(max(1, settings.ANALYSIS_CONCURRENCY))
+
+        async def analyze(symbol: str) -> Optional[InvestmentRecommendation]:
+            async with semaphore:
+                try:
+                    return await self.analyze_coin(symbol, prices.get(symbol))
+                except Exception as e:
+                    print(f"Failed to analyze {symbol}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(analyze(symbol) for symbol in symbols))
+        recommendations = [r for r in results if r is not None]
 
         # スコアで降順ソート
         recommendations.sort(key=lambda x: x.recommendation_score, reverse=True)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+from array import array
+from typing import Optional, Sequence
+from app.core.config import settings
+from app.schemas.backtest import BacktestRequest, BacktestResponse
+from app.services.lru_cache import SizedLRUCache
+from app.services.redis_service import redis_service
+
+# キーの形式を変えたら上げる（古いエントリを読まないようにする）
+CACHE_KEY_VERSION = 1
+
+
+def series_fingerprint(timestamps: Sequence[int], prices: Sequence[float]) -> str:
+    """価格系列の内容から決まるフィンガープリント（データが変われば変わる）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for values, typecode, dtype in ((timestamps, "q", "<i8"), (prices, "d", "<f8")):
+        if hasattr(values, "astype"):
+            digest.update(values.astype(dtype).tobytes())
+        elif typecode == "q":
+            digest.update(array(typecode, (int(v) for v in values)).tobytes())
+        else:
+            digest.update(array(typecode, (float(v) for v in values)).tobytes())
+    return digest.hexdigest()
+
+
+def request_key(request: BacktestRequest, fingerprint: str) -> str:
+    """
+    正規化したリクエストと価格系列のフィンガープリントからキャッシュキーを作成
+
+    結果に影響しない戦略名は除き、シンボルは大文字に揃える。
+    """
+    normalized = {
+        "version": CACHE_KEY_VERSION,
+        "symbol": request.symbol.upper(),
+        "period_days": request.period_days,
+        "strategy": request.strategy.model_dump(exclude={"name"}),
+        "series": fingerprint,
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class BacktestResultCache:
+    """
+    バックテスト結果のキャッシュ（内容アドレス方式）
+
+    キーはリクエストと価格系列の内容から決まるため、価格データが更新されると
+    自動的に別キーになり古い結果は参照されなくなる（明示的な無効化は不要）。
+    プロセス内のサイズ上限付きLRUをRedisの前段に置く。
+    """
+
+    KEY_PREFIX = "backtest:result:"
+
+    def __init__(self, local_max_bytes: int, ttl: int):
+        self.ttl = ttl
+        self.local = SizedLRUCache(local_max_bytes)
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    async def get(self, key: str) -> Optional[BacktestResponse]:
+        """キャッシュされた結果を取得（LRU → Redisの順）"""
+        cached = self.local.get(key)
+        if cached is not None:
+            return BacktestResponse.model_validate_json(cached)
+
+        data = await redis_service.get(f"{self.KEY_PREFIX}{key}")
+        if data is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        response = BacktestResponse(**data)
+        self._set_local(key, response)
+        return response
+
+    async def set(self, key: str, response: BacktestResponse):
+        """結果を保存"""
+        self._set_local(key, response)
+        await redis_service.set(
+            f"{self.KEY_PREFIX}{key}", response.model_dump(mode="json"), expire=self.ttl
+        )
+
+    def _set_local(self, key: str, response: BacktestResponse):
+        """LRUにはJSONのバイト列で保存（サイズを正確に数え、共有オブジェクトの変更も防ぐ）"""
+        encoded = response.model_dump_json().encode()
+        self.local.set(key, encoded, len(encoded))
+
+    def get_stats(self) -> dict:
+        """ヒット・ミス件数とLRUの使用量を取得"""
+        return {
+            "local": self.local.get_stats(),
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+        }
+
+
+# グローバルインスタンス
+backtest_cache = BacktestResultCache(
+    local_max_bytes=settings.BACKTEST_CACHE_LOCAL_MAX_BYTES,
+    ttl=settings.BACKTEST_CACHE_TTL
+)
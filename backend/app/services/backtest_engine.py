@@ -0,0 +1,596 @@
+"""
+バックテストの計算コア
+
+価格列・指標系列・パラメータだけを受け取る純粋な関数群。
+DB・Redis・HTTPに依存しないため、プロセスプールのワーカーからもそのまま呼び出せる。
+取引記録は {"index", "type", "price", "amount", "value", "profit_loss",
+"profit_loss_percent"} の辞書、資産曲線は評価額のリストで表す。
+ポートフォリオ（複数銘柄）版は (時点, 銘柄) のNumPy行列を受け取り、
+シグナル判定を銘柄方向にベクトル化する。
+"""
+import statistics
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPyが無い環境ではポートフォリオ版を使用しない
+    np = None
+
+WARMUP_BARS = 30  # 最初の30本は指標計算に必要
+
+# 戦略パラメータの既定値（従来の固定値）
+DEFAULT_PARAMETERS = {
+    "rsi_period": 14,
+    "rsi_oversold": 30.0,
+    "rsi_overbought": 70.0,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal_period": 9,
+    "bb_period": 20,
+    "bb_std_dev": 2.0,
+}
+
+# ポートフォリオのポジションサイズ決定方法
+POSITION_SIZING_METHODS = ("equal_weight", "cash_split")
+
+# シグナル → 必要な指標の種類
+SIGNAL_INDICATORS = {
+    "rsi_oversold": "rsi",
+    "rsi_overbought": "rsi",
+    "macd_golden_cross": "macd",
+    "macd_dead_cross": "macd",
+    "bb_lower_breach": "bb",
+    "bb_upper_breach": "bb",
+}
+
+
+def indicator_key(kind: str, params: dict) -> tuple:
+    """指標系列を共有するためのキー（計算に効くパラメータだけを含む）"""
+    if kind == "rsi":
+        return ("rsi", int(params["rsi_period"]))
+    if kind == "macd":
+        return ("macd", int(params["macd_fast"]), int(params["macd_slow"]), int(params["macd_signal_period"]))
+    return ("bb", int(params["bb_period"]), float(params["bb_std_dev"]))
+
+
+def validate_parameters(params: dict) -> Optional[str]:
+    """パラメータの整合性を確認し、問題があればエラーメッセージを返す"""
+    for name in ("rsi_period", "macd_fast", "macd_slow", "macd_signal_period", "bb_period"):
+        if int(params[name]) < 1:
+            return f"{name} must be >= 1"
+    if int(params["macd_fast"]) > int(params["macd_slow"]):
+        return "macd_fast must not exceed macd_slow"
+    if float(params["bb_std_dev"]) <= 0:
+        return "bb_std_dev must be positive"
+    return None
+
+
+def _as_list(values: Sequence) -> list:
+    """NumPy配列ならPythonのリストに変換（要素ごとの比較を速くするため）"""
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def buy_flags(signal: str, indicators: Dict[tuple, Sequence], params: dict) -> List[bool]:
+    """買いシグナルの時系列フラグを計算"""
+    kind = SIGNAL_INDICATORS.get(signal)
+    if kind is None:
+        return []
+    values = _as_list(indicators[indicator_key(kind, params)])
+    if signal == "rsi_oversold":
+        threshold = params["rsi_oversold"]
+        return [v < threshold for v in values]
+    if signal == "macd_golden_cross":
+        return [v == "buy" for v in values]
+    if signal == "bb_lower_breach":
+        return [v == "below_lower" for v in values]
+    return []
+
+
+def sell_flags(signal: str, indicators: Dict[tuple, Sequence], params: dict) -> List[bool]:
+    """売りシグナルの時系列フラグを計算"""
+    kind = SIGNAL_INDICATORS.get(signal)
+    if kind is None:
+        return []
+    values = _as_list(indicators[indicator_key(kind, params)])
+    if signal == "rsi_overbought":
+        threshold = params["rsi_overbought"]
+        return [v > threshold for v in values]
+    if signal == "macd_dead_cross":
+        return [v == "sell" for v in values]
+    if signal == "bb_upper_breach":
+        return [v == "above_upper" for v in values]
+    return []
+
+
+def simulate(
+    prices: Sequence[float],
+    buy: Sequence[bool],
+    sell: Sequence[bool],
+    initial_capital: float,
+    trade_size_percent: float,
+    start: int = WARMUP_BARS,
+    end: Optional[int] = None
+) -> Tuple[List[dict], List[float]]:
+    """
+    売買シグナルに従って取引をシミュレート
+
+    Args:
+        prices: 価格列
+        buy: 各時点の買いシグナル（空なら買わない）
+        sell: 各時点の売りシグナル（空なら売らない）
+        initial_capital: 初期資金
+        trade_size_percent: 1回の取引で使用する資金の割合（%）
+        start: シミュレーション開始インデックス
+        end: シミュレーション終了インデックス（含まない、Noneなら末尾まで）
+
+    Returns:
+        (取引記録のリスト, 各時点の評価額のリスト)
+    """
+    prices = [float(price) for price in _as_list(prices)]
+    end = len(prices) if end is None else end
+    trades = []
+    equity_values = []
+    cash = initial_capital
+    position = 0.0  # 保有数量
+    position_entry_price = 0.0
+
+    for i in range(start, end):
+        current_price = prices[i]
+
+        # ポジションなし & 買いシグナル → 買い
+        if position == 0 and buy and buy[i] and cash > 0:
+            trade_amount = (cash * trade_size_percent / 100) / current_price
+            trade_value = trade_amount * current_price
+
+            if trade_value > 0:
+                trades.append({
+                    "index": i,
+                    "type": "buy",
+                    "price": current_price,
+                    "amount": trade_amount,
+                    "value": trade_value,
+                    "profit_loss": None,
+                    "profit_loss_percent": None,
+                })
+
+                cash -= trade_value
+                position = trade_amount
+                position_entry_price = current_price
+
+        # ポジションあり & 売りシグナル → 売り
+        elif position > 0 and sell and sell[i]:
+            trades.append(_sell_trade(i, current_price, position, position_entry_price))
+
+            cash += position * current_price
+            position = 0.0
+            position_entry_price = 0.0
+
+        # 資産曲線を記録
+        equity_values.append(cash + (position * current_price))
+
+    # 最後にポジションを持っていたら清算
+    if position > 0:
+        trades.append(_sell_trade(end - 1, prices[end - 1], position, position_entry_price))
+
+    return trades, equity_values
+
+
+def _sell_trade(index: int, price: float, position: float, entry_price: float) -> dict:
+    """売却の取引記録を作成"""
+    trade_value = position * price
+    profit_loss = trade_value - (position * entry_price)
+    profit_loss_percent = (profit_loss / (position * entry_price)) * 100
+    return {
+        "index": index,
+        "type": "sell",
+        "price": price,
+        "amount": position,
+        "value": trade_value,
+        "profit_loss": profit_loss,
+        "profit_loss_percent": profit_loss_percent,
+    }
+
+
+def calculate_metrics(trades: List[dict], equity_values: List[float], initial_capital: float) -> dict:
+    """パフォーマンス指標を計算（BacktestMetricsのフィールドと同じキーの辞書）"""
+    # 売り取引のみを抽出（利益計算のため）
+    sell_trades = [t for t in trades if t["type"] == "sell" and t["profit_loss"] is not None]
+
+    if not sell_trades:
+        return {
+            "total_trades": len(trades),
+            "winning_trades": 0,
+            "losing_trades": 0,
+            "win_rate": 0.0,
+            "total_return": 0.0,
+            "total_return_percent": 0.0,
+            "max_drawdown": 0.0,
+            "sharpe_ratio": None,
+            "avg_profit_per_trade": 0.0,
+            "avg_profit_per_winning_trade": 0.0,
+            "avg_loss_per_losing_trade": 0.0,
+        }
+
+    # 勝ち・負けトレード
+    winning_trades = [t for t in sell_trades if t["profit_loss"] > 0]
+    losing_trades = [t for t in sell_trades if t["profit_loss"] <= 0]
+
+    total_trades = len(sell_trades)
+    num_winning = len(winning_trades)
+    num_losing = len(losing_trades)
+    win_rate = (num_winning / total_trades * 100) if total_trades > 0 else 0.0
+
+    # トータルリターン
+    total_return = sum(t["profit_loss"] for t in sell_trades)
+    total_return_percent = (total_return / initial_capital) * 100
+
+    # 平均利益・損失
+    avg_profit_per_trade = total_return / total_trades if total_trades > 0 else 0.0
+    avg_profit_per_winning = (
+        sum(t["profit_loss"] for t in winning_trades) / num_winning
+        if num_winning > 0 else 0.0
+    )
+    avg_loss_per_losing = (
+        sum(t["profit_loss"] for t in losing_trades) / num_losing
+        if num_losing > 0 else 0.0
+    )
+
+    return {
+        "total_trades": total_trades,
+        "winning_trades": num_winning,
+        "losing_trades": num_losing,
+        "win_rate": win_rate,
+        "total_return": total_return,
+        "total_return_percent": total_return_percent,
+        "max_drawdown": calculate_max_drawdown(equity_values),
+        "sharpe_ratio": calculate_sharpe_ratio(sell_trades) if len(sell_trades) > 1 else None,
+        "avg_profit_per_trade": avg_profit_per_trade,
+        "avg_profit_per_winning_trade": avg_profit_per_winning,
+        "avg_loss_per_losing_trade": avg_loss_per_losing,
+    }
+
+
+def calculate_max_drawdown(equity_values: List[float]) -> float:
+    """最大ドローダウンを計算"""
+    if not equity_values:
+        return 0.0
+
+    peak = equity_values[0]
+    max_dd = 0.0
+
+    for value in equity_values:
+        if value > peak:
+            peak = value
+        drawdown = ((value - peak) / peak) * 100
+        if drawdown < max_dd:
+            max_dd = drawdown
+
+    return max_dd
+
+
+def calculate_sharpe_ratio(sell_trades: List[dict]) -> float:
+    """シャープレシオを計算"""
+    if len(sell_trades) < 2:
+        return 0.0
+
+    returns = [t["profit_loss_percent"] for t in sell_trades if t["profit_loss_percent"] is not None]
+
+    if not returns:
+        return 0.0
+
+    avg_return = statistics.mean(returns)
+    std_return = statistics.stdev(returns) if len(returns) > 1 else 1.0
+
+    # リスクフリーレートは0と仮定
+    return avg_return / std_return if std_return > 0 else 0.0
+
+
+def run(
+    prices: Sequence[float],
+    indicators: Dict[tuple, Sequence],
+    strategy: dict,
+    params: dict,
+    start: int = WARMUP_BARS,
+    end: Optional[int] = None
+) -> dict:
+    """
+    1つのパラメータの組み合わせでシミュレーションと指標計算を行う
+
+    Args:
+        prices: 価格列
+        indicators: indicator_keyをキーとする指標系列
+        strategy: buy_signal / sell_signal / initial_capital / trade_size_percent
+        params: 戦略パラメータ（trade_size_percentを含む場合はstrategyより優先）
+        start: シミュレーション開始インデックス
+        end: シミュレーション終了インデックス（含まない、Noneなら末尾まで）
+
+    Returns:
+        {"trades", "equity_values", "metrics"}
+    """
+    trades, equity_values = simulate(
+        prices,
+        buy_flags(strategy["buy_signal"], indicators, params),
+        sell_flags(strategy["sell_signal"], indicators, params),
+        strategy["initial_capital"],
+        params.get("trade_size_percent", strategy["trade_size_percent"]),
+        start,
+        end
+    )
+    return {
+        "trades": trades,
+        "equity_values": equity_values,
+        "metrics": calculate_metrics(trades, equity_values, strategy["initial_capital"]),
+    }
+
+
+def evaluate(
+    prices: Sequence[float],
+    indicators: Dict[tuple, Sequence],
+    strategy: dict,
+    params: dict,
+    start: int = WARMUP_BARS,
+    end: Optional[int] = None
+) -> dict:
+    """
+    1つのパラメータの組み合わせを評価（取引履歴を含まない要約）
+
+    Returns:
+        {"parameters", "metrics", "final_capital"}
+    """
+    result = run(prices, indicators, strategy, params, start, end)
+    equity_values = result["equity_values"]
+    return {
+        "parameters": params,
+        "metrics": result["metrics"],
+        "final_capital": equity_values[-1] if equity_values else strategy["initial_capital"],
+    }
+
+
+def rank_key(value: Optional[float]) -> Tuple[bool, float]:
+    """指標値の並べ替えキー（降順で並べたときNoneが最下位になる）"""
+    return value is not None, value or 0.0
+
+
+def evaluate_chunk(
+    prices: Sequence[float],
+    indicators: Dict[tuple, Sequence],
+    strategy: dict,
+    param_sets: List[dict]
+) -> List[dict]:
+    """複数の組み合わせをまとめて評価（プールへの受け渡し回数を減らすため）"""
+    prices = _as_list(prices)
+    return [evaluate(prices, indicators, strategy, params) for params in param_sets]
+
+
+def walk_forward_window(
+    prices: Sequence[float],
+    indicators: Dict[tuple, Sequence],
+    strategy: dict,
+    param_sets: List[dict],
+    in_sample: Tuple[int, int],
+    out_of_sample: Tuple[int, int],
+    optimize_by: str
+) -> dict:
+    """
+    ウォークフォワードの1ウィンドウを評価
+
+    インサンプル区間で全組み合わせを評価して最良のパラメータを選び、
+    続くアウトオブサンプル区間でそのパラメータを評価する。指標系列は全期間で
+    計算済みのもの（各時点の値はその時点までの価格だけで決まる）をそのまま使う。
+
+    Returns:
+        {"parameters", "in_sample_metrics", "out_of_sample_metrics", "out_of_sample_equity"}
+    """
+    prices = _as_list(prices)
+    best = max(
+        (evaluate(prices, indicators, strategy, params, *in_sample) for params in param_sets),
+        key=lambda result: rank_key(result["metrics"][optimize_by])
+    )
+    out_of_sample_result = run(prices, indicators, strategy, best["parameters"], *out_of_sample)
+    return {
+        "parameters": best["parameters"],
+        "in_sample_metrics": best["metrics"],
+        "out_of_sample_metrics": out_of_sample_result["metrics"],
+        "out_of_sample_equity": out_of_sample_result["equity_values"],
+    }
+
+
+def buy_mask(signal: str, indicators: Dict[tuple, "np.ndarray"], params: dict) -> "np.ndarray":
+    """買いシグナルの (時点, 銘柄) マスクを計算（配列のまま比較）"""
+    kind = SIGNAL_INDICATORS.get(signal)
+    if kind is None:
+        return None
+    values = indicators[indicator_key(kind, params)]
+    if signal == "rsi_oversold":
+        return values < params["rsi_oversold"]
+    if signal == "macd_golden_cross":
+        return values == "buy"
+    if signal == "bb_lower_breach":
+        return values == "below_lower"
+    return np.zeros(values.shape, dtype=bool)
+
+
+def sell_mask(signal: str, indicators: Dict[tuple, "np.ndarray"], params: dict) -> "np.ndarray":
+    """売りシグナルの (時点, 銘柄) マスクを計算（配列のまま比較）"""
+    kind = SIGNAL_INDICATORS.get(signal)
+    if kind is None:
+        return None
+    values = indicators[indicator_key(kind, params)]
+    if signal == "rsi_overbought":
+        return values > params["rsi_overbought"]
+    if signal == "macd_dead_cross":
+        return values == "sell"
+    if signal == "bb_upper_breach":
+        return values == "above_upper"
+    return np.zeros(values.shape, dtype=bool)
+
+
+def simulate_portfolio(
+    prices: "np.ndarray",
+    buy: "np.ndarray",
+    sell: "np.ndarray",
+    initial_capital: float,
+    trade_size_percent: float,
+    sizing: str = "equal_weight",
+    rebalance_interval: int = 0,
+    start: int = WARMUP_BARS
+) -> Tuple[List[dict], List[float]]:
+    """
+    複数銘柄で現金を共有して取引をシミュレート
+
+    各時点で売り → リバランス → 買いの順に処理する。シグナル判定は
+    銘柄方向のベクトル演算で行い、Pythonのループは取引が発生した銘柄だけを回る。
+
+    Args:
+        prices: (時点, 銘柄) の価格行列
+        buy: 買いシグナルのマスク（Noneなら買わない）
+        sell: 売りシグナルのマスク（Noneなら売らない）
+        initial_capital: 初期資金
+        trade_size_percent: 1銘柄あたりの目標配分に対する投資割合（%）
+        sizing: equal_weight（総資産をN等分した額を上限に買う）/
+                cash_split（その時点の現金を同時に買う銘柄で等分）
+        rebalance_interval: 保有銘柄を目標配分に戻す間隔（本数、0なら行わない）
+        start: シミュレーション開始インデックス
+
+    Returns:
+        (取引記録のリスト（"asset"に銘柄の列番号）, 各時点の評価額のリスト)
+    """
+    num_bars, num_assets = prices.shape
+    cash = float(initial_capital)
+    amounts = np.zeros(num_assets)
+    entry_prices = np.zeros(num_assets)  # 平均取得単価
+    trades = []
+    equity_values = []
+
+    def sell_asset(t: int, asset: int, amount: float):
+        nonlocal cash
+        price = float(prices[t, asset])
+        trade = _sell_trade(t, price, amount, float(entry_prices[asset]))
+        trade["asset"] = int(asset)
+        trades.append(trade)
+        cash += amount * price
+        amounts[asset] -= amount
+        if amounts[asset] <= 0:
+            amounts[asset] = 0.0
+            entry_prices[asset] = 0.0
+
+    def buy_asset(t: int, asset: int, value: float):
+        nonlocal cash
+        price = float(prices[t, asset])
+        amount = value / price
+        trades.append({
+            "index": t,
+            "asset": int(asset),
+            "type": "buy",
+            "price": price,
+            "amount": amount,
+            "value": amount * price,
+            "profit_loss": None,
+            "profit_loss_percent": None,
+        })
+        cash -= amount * price
+        entry_prices[asset] = (
+            (amounts[asset] * entry_prices[asset] + amount * price) / (amounts[asset] + amount)
+        )
+        amounts[asset] += amount
+
+    for t in range(start, num_bars):
+        current_prices = prices[t]
+
+        # 売りシグナルの出た保有銘柄を売却
+        if sell is not None:
+            for asset in np.flatnonzero((amounts > 0) & sell[t]):
+                sell_asset(t, asset, float(amounts[asset]))
+
+        # 保有銘柄を目標配分に戻す（超過分を売ってから不足分を買う）
+        if rebalance_interval and t > start and (t - start) % rebalance_interval == 0:
+            held = np.flatnonzero(amounts > 0)
+            if held.size:
+                equity = cash + float(amounts @ current_prices)
+                target = equity / num_assets * trade_size_percent / 100
+                values = amounts[held] * current_prices[held]
+                for asset, value in zip(held[values > target], values[values > target]):
+                    sell_asset(t, asset, (float(value) - target) / float(current_prices[asset]))
+                for asset, value in zip(held[values < target], values[values < target]):
+                    shortfall = min(target - float(value), cash)
+                    if shortfall > 0:
+                        buy_asset(t, asset, shortfall)
+
+        # 買いシグナルの出た未保有銘柄を購入
+        if buy is not None and cash > 0:
+            candidates = np.flatnonzero((amounts == 0) & buy[t])
+            if candidates.size:
+                if sizing == "cash_split":
+                    per_asset = cash * trade_size_percent / 100 / candidates.size
+                else:
+                    equity = cash + float(amounts @ current_prices)
+                    per_asset = min(
+                        equity / num_assets * trade_size_percent / 100,
+                        cash / candidates.size
+                    )
+                if per_asset > 0:
+                    for asset in candidates:
+                        buy_asset(t, asset, per_asset)
+
+        # 資産曲線を記録
+        equity_values.append(cash + float(amounts @ current_prices))
+
+    # 最後に保有している銘柄を清算
+    for asset in np.flatnonzero(amounts > 0):
+        sell_asset(num_bars - 1, asset, float(amounts[asset]))
+
+    return trades, equity_values
+
+
+def portfolio_attribution(trades: List[dict], num_assets: int, initial_capital: float) -> List[dict]:
+    """銘柄ごとの取引回数・実現損益・総リターンへの寄与を集計"""
+    attribution = [
+        {"trades": 0, "winning_trades": 0, "losing_trades": 0, "profit_loss": 0.0}
+        for _ in range(num_assets)
+    ]
+    for trade in trades:
+        entry = attribution[trade["asset"]]
+        entry["trades"] += 1
+        if trade["type"] == "sell" and trade["profit_loss"] is not None:
+            entry["profit_loss"] += trade["profit_loss"]
+            if trade["profit_loss"] > 0:
+                entry["winning_trades"] += 1
+            else:
+                entry["losing_trades"] += 1
+
+    for entry in attribution:
+        closed = entry["winning_trades"] + entry["losing_trades"]
+        entry["win_rate"] = (entry["winning_trades"] / closed * 100) if closed else 0.0
+        entry["contribution_percent"] = (entry["profit_loss"] / initial_capital) * 100
+    return attribution
+
+
+def run_portfolio(
+    prices: "np.ndarray",
+    indicators: Dict[tuple, "np.ndarray"],
+    strategy: dict,
+    params: dict,
+    sizing: str = "equal_weight",
+    rebalance_interval: int = 0
+) -> dict:
+    """
+    ポートフォリオのシミュレーションと指標計算を行う
+
+    Returns:
+        {"trades", "equity_values", "metrics", "attribution"}
+    """
+    trades, equity_values = simulate_portfolio(
+        prices,
+        buy_mask(strategy["buy_signal"], indicators, params),
+        sell_mask(strategy["sell_signal"], indicators, params),
+        strategy["initial_capital"],
+        strategy["trade_size_percent"],
+        sizing,
+        rebalance_interval
+    )
+    return {
+        "trades": trades,
+        "equity_values": equity_values,
+        "metrics": calculate_metrics(trades, equity_values, strategy["initial_capital"]),
+        "attribution": portfolio_attribution(trades, prices.shape[1], strategy["initial_capital"]),
+    }
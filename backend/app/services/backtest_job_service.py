@@ -0,0 +1,441 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+from redis.exceptions import WatchError
+from app.core.config import settings
+from app.schemas.backtest import (
+    BacktestRequest,
+    BacktestSweepRequest,
+    WalkForwardRequest,
+    MonteCarloRequest
+)
+from app.services.backtest_service import backtest_service
+from app.services.cache_codec import cache_codec
+from app.services.redis_service import redis_service
+
+
+class JobQueueFullError(Exception):
+    """待機中のジョブが上限に達している"""
+
+
+class JobCancelledError(Exception):
+    """実行中のジョブがキャンセルされた"""
+
+
+class JobAbandonedError(Exception):
+    """実行中のジョブが生存通知の途絶えで既に終了扱いになっていた"""
+
+
+class BacktestJobService:
+    """
+    バックテストの非同期ジョブキュー
+
+    投入されたジョブはキューに積まれ、バックグラウンドのワーカーが
+    最大 BACKTEST_JOB_MAX_CONCURRENT 件まで同時に実行する。
+    Redisに接続できる場合はRedisのリストをキュー、キーを状態・結果の保存先とし
+    （複数ワーカープロセスで共有）、接続できない場合はプロセス内のキューで動作する。
+
+    Redis使用時の同時実行数は全プロセスの合計で、ワーカーはRedis上の実行枠
+    （期限付きのリース）を取得してからジョブを取り出す。実行中のジョブは生存通知を
+    定期的に書き込み、BACKTEST_JOB_HEARTBEAT_TIMEOUT 秒途絶えたジョブ（ワーカーの
+    プロセスが落ちた等）は状態の取得時に失敗として扱う。リースも同じ時間で失効する。
+    """
+
+    QUEUE_KEY = "backtest:jobs:queue"
+    JOB_KEY_PREFIX = "backtest:job:"
+    RESULT_KEY_PREFIX = "backtest:job:result:"
+    # キャンセル要求はジョブ本体とは別のキーに置く（進捗の保存で上書きされないように）
+    CANCEL_KEY_PREFIX = "backtest:job:cancel:"
+    HEARTBEAT_KEY_PREFIX = "backtest:job:heartbeat:"
+    # 全プロセス共通の実行枠（ZSET: ワーカー → リースの期限のミリ秒）
+    SLOTS_KEY = "backtest:jobs:slots"
+    SLOT_RETRY_INTERVAL = 0.5  # 実行枠が空く（Redisが復旧する）のを待つ間隔（秒）
+
+    # 期限切れのリースを除き、空きがあれば実行枠を取得する（取得済みなら期限を延長）
+    ACQUIRE_SLOT_SCRIPT = """
+    local clock = redis.call('time')
+    local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+    local lease = tonumber(ARGV[3])
+    redis.call('zremrangebyscore', KEYS[1], '-inf', now)
+    if redis.call('zscore', KEYS[1], ARGV[1]) or redis.call('zcard', KEYS[1]) < tonumber(ARGV[2]) then
+        redis.call('zadd', KEYS[1], now + lease, ARGV[1])
+        redis.call('pexpire', KEYS[1], lease)
+        return 1
+    end
+    return 0
+    """
+
+    # ジョブの種類 → (リクエストスキーマ, 実行メソッド名)
+    JOB_KINDS = {
+        "run": (BacktestRequest, "run_backtest"),
+        "sweep": (BacktestSweepRequest, "run_sweep"),
+        "walk_forward": (WalkForwardRequest, "run_walk_forward"),
+        "monte_carlo": (MonteCarloRequest, "run_monte_carlo"),
+    }
+    FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+    def __init__(self):
+        self.use_redis = False
+        self.instance_id = uuid.uuid4().hex  # 実行枠のリースの持ち主を区別する
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        # プロセス内フォールバック用
+        self._local_queue: Optional[asyncio.Queue] = None
+        self._local_queued: Set[str] = set()  # キューにある待機中のジョブ（キャンセル分は除く）
+        self._local_jobs: Dict[str, dict] = {}
+        self._local_results: Dict[str, dict] = {}
+        self._local_cancelled: Set[str] = set()
+
+    async def start(self):
+        """ワーカーを起動（Redisに接続できなければプロセス内キューを使用）"""
+        if self._workers:
+            return
+
+        self.use_redis = await redis_service.ping()
+        if not self.use_redis:
+            print("Backtest job queue: Redis unavailable, using in-process queue")
+            self._local_queue = asyncio.Queue()
+
+        self._workers = [
+            asyncio.create_task(self._worker(f"{self.instance_id}:{index}"))
+            for index in range(max(1, settings.BACKTEST_JOB_MAX_CONCURRENT))
+        ]
+
+    async def stop(self):
+        """ワーカーと実行中のジョブを停止"""
+        for task in list(self._running.values()) + self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._running.clear()
+
+    async def submit(self, kind: str, request) -> dict:
+        """
+        ジョブを投入
+
+        Args:
+            kind: ジョブの種類（run / sweep / walk_forward / monte_carlo）
+            request: kindに対応するリクエスト
+
+        Returns:
+            ジョブの状態
+        """
+        if not self._workers:
+            # ライフスパン外（スクリプト等）から呼ばれた場合は遅延起動
+            await self.start()
+
+        if await self._queue_length() >= settings.BACKTEST_JOB_MAX_QUEUED:
+            raise JobQueueFullError(
+                f"Too many queued jobs (max {settings.BACKTEST_JOB_MAX_QUEUED})"
+            )
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "cancel_requested": False,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "request": request.model_dump(mode="json"),
+        }
+        await self._save(job)
+        await self._enqueue(job["job_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """ジョブの状態を取得（キャンセル要求と、生存通知の途絶えた実行中ジョブを反映）"""
+        if self.use_redis:
+            job = await redis_service.get(f"{self.JOB_KEY_PREFIX}{job_id}")
+        else:
+            job = self._local_jobs.get(job_id)
+        if job and not job["cancel_requested"] and await self._cancel_requested(job_id):
+            job["cancel_requested"] = True
+        if (
+            job
+            and self.use_redis
+            and job["status"] == "running"
+            and not await redis_service.exists(f"{self.HEARTBEAT_KEY_PREFIX}{job_id}")
+        ):
+            job["status"] = "failed"
+            job["error"] = (
+                f"Worker stopped responding (no heartbeat for {settings.BACKTEST_JOB_HEARTBEAT_TIMEOUT}s)"
+            )
+            job["finished_at"] = time.time()
+            if not await self._save_unless_finished(job):
+                # ワーカーが直前に終了を保存していた
+                job = await redis_service.get(f"{self.JOB_KEY_PREFIX}{job_id}")
+        return job
+
+    async def get_result(self, job_id: str) -> Optional[dict]:
+        """完了したジョブの結果を取得"""
+        if self.use_redis:
+            return await redis_service.get(f"{self.RESULT_KEY_PREFIX}{job_id}")
+        return self._local_results.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        ジョブをキャンセル
+
+        待機中のジョブはキューから外し、実行中のジョブは次の進捗通知の時点で中断する
+        （このプロセスで実行中なら即座に中断）。キャンセル要求は別のキーに記録するため、
+        実行中のワーカーが進捗を保存しても失われない。
+        """
+        job = await self.get(job_id)
+        if not job or job["status"] in self.FINISHED_STATUSES:
+            return job
+
+        await self._request_cancel(job_id)
+        job["cancel_requested"] = True
+        if job["status"] == "queued":
+            job["status"] = "cancelled"
+            job["finished_at"] = time.time()
+            if self.use_redis:
+                await redis_service.remove_from_queue(self.QUEUE_KEY, job_id)
+            else:
+                # asyncio.Queueからは取り除けないため、取り出したワーカーが読み飛ばす
+                self._local_queued.discard(job_id)
+            await self._save(job)
+
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        return job
+
+    async def _request_cancel(self, job_id: str):
+        """キャンセル要求を記録"""
+        if self.use_redis:
+            await redis_service.set(f"{self.CANCEL_KEY_PREFIX}{job_id}", True, expire=settings.BACKTEST_JOB_TTL)
+        else:
+            self._local_cancelled.add(job_id)
+
+    async def _cancel_requested(self, job_id: str) -> bool:
+        """キャンセルが要求されているか"""
+        if self.use_redis:
+            return await redis_service.exists(f"{self.CANCEL_KEY_PREFIX}{job_id}")
+        return job_id in self._local_cancelled
+
+    async def _save(self, job: dict):
+        """ジョブの状態を保存"""
+        if self.use_redis:
+            await redis_service.set(
+                f"{self.JOB_KEY_PREFIX}{job['job_id']}", job, expire=settings.BACKTEST_JOB_TTL
+            )
+        else:
+            self._local_jobs[job["job_id"]] = job
+
+    async def _save_unless_finished(self, job: dict) -> bool:
+        """
+        ジョブの状態を保存（保存済みの状態が既に終了していれば上書きしない）
+
+        生存通知の途絶えで失敗扱いになったジョブを遅れて終わったワーカーが書き換えないよう、
+        Redis使用時はWATCHで保存済みの状態を確認してから書き込む。
+
+        Returns:
+            保存した場合はTrue
+        """
+        if not self.use_redis:
+            await self._save(job)
+            return True
+
+        key = f"{self.JOB_KEY_PREFIX}{job['job_id']}"
+        try:
+            async with redis_service.redis_client.pipeline(transaction=True) as pipe:
+                while True:
+                    try:
+                        await pipe.watch(key)
+                        stored = await pipe.get(key)
+                        if stored and cache_codec.decode(stored)["status"] in self.FINISHED_STATUSES:
+                            await pipe.unwatch()
+                            return False
+                        pipe.multi()
+                        pipe.setex(key, settings.BACKTEST_JOB_TTL, cache_codec.encode(job))
+                        await pipe.execute()
+                        return True
+                    except WatchError:
+                        continue  # 確認から書き込みまでの間に更新された
+        except Exception as e:
+            print(f"Backtest job save error: {e}")
+            return True
+
+    async def _save_result(self, job_id: str, result: dict):
+        """ジョブの結果を保存"""
+        if self.use_redis:
+            await redis_service.set(
+                f"{self.RESULT_KEY_PREFIX}{job_id}", result, expire=settings.BACKTEST_JOB_TTL
+            )
+        else:
+            self._local_results[job_id] = result
+
+    async def _enqueue(self, job_id: str):
+        """キューに追加"""
+        if self.use_redis:
+            await redis_service.push(self.QUEUE_KEY, job_id)
+        else:
+            self._prune_local_jobs()
+            self._local_queued.add(job_id)
+            self._local_queue.put_nowait(job_id)
+
+    async def _dequeue(self) -> Optional[str]:
+        """キューから取り出す（空ならNone、Redisのエラーは呼び出し元で待ってから再試行させるため送出）"""
+        if self.use_redis:
+            item = await redis_service.redis_client.brpop(self.QUEUE_KEY, timeout=1)
+            return json.loads(item[1]) if item else None
+        job_id = await self._local_queue.get()
+        self._local_queued.discard(job_id)
+        return job_id
+
+    async def _queue_length(self) -> int:
+        """待機中のジョブ数"""
+        if self.use_redis:
+            return await redis_service.queue_length(self.QUEUE_KEY)
+        return len(self._local_queued)
+
+    def _prune_local_jobs(self):
+        """保持期間を過ぎた完了済みジョブを破棄（プロセス内モードのみ）"""
+        expire_before = time.time() - settings.BACKTEST_JOB_TTL
+        for job_id, job in list(self._local_jobs.items()):
+            if job["status"] in self.FINISHED_STATUSES and job["finished_at"] < expire_before:
+                del self._local_jobs[job_id]
+                self._local_results.pop(job_id, None)
+                self._local_cancelled.discard(job_id)
+
+    async def _acquire_slot(self, slot: str) -> bool:
+        """
+        全プロセス共通の実行枠を取得・延長（Redis使用時のみ）
+
+        Returns:
+            取得できた場合はTrue（Redis未使用時は常にTrue、エラー時は制限を守るためFalse）
+        """
+        if not self.use_redis or not redis_service.redis_client:
+            return True
+
+        try:
+            return bool(await redis_service.redis_client.eval(
+                self.ACQUIRE_SLOT_SCRIPT,
+                1,
+                self.SLOTS_KEY,
+                slot,
+                max(1, settings.BACKTEST_JOB_MAX_CONCURRENT),
+                settings.BACKTEST_JOB_HEARTBEAT_TIMEOUT * 1000
+            ))
+        except Exception as e:
+            print(f"Backtest job slot error: {e}")
+            return False
+
+    async def _release_slot(self, slot: str):
+        """実行枠を返す"""
+        if not self.use_redis or not redis_service.redis_client:
+            return
+
+        try:
+            await redis_service.redis_client.zrem(self.SLOTS_KEY, slot)
+        except Exception as e:
+            print(f"Backtest job slot error: {e}")
+
+    async def _heartbeat(self, job_id: str, slot: str):
+        """実行中のジョブの生存通知を書き込み、実行枠のリースを延長"""
+        if not self.use_redis:
+            return
+        await redis_service.set(
+            f"{self.HEARTBEAT_KEY_PREFIX}{job_id}", time.time(), expire=settings.BACKTEST_JOB_HEARTBEAT_TIMEOUT
+        )
+        await self._acquire_slot(slot)
+
+    async def _keep_alive(self, job_id: str, slot: str):
+        """ジョブの実行中、生存通知を定期的に書き込む"""
+        while True:
+            await asyncio.sleep(settings.BACKTEST_JOB_HEARTBEAT_INTERVAL)
+            await self._heartbeat(job_id, slot)
+
+    async def _worker(self, slot: str):
+        """実行枠を取得してからキューのジョブを取り出し、1件ずつ実行"""
+        while True:
+            try:
+                if not await self._acquire_slot(slot):
+                    await asyncio.sleep(self.SLOT_RETRY_INTERVAL)
+                    continue
+
+                try:
+                    job_id = await self._dequeue()
+                    if not job_id:
+                        continue
+
+                    job = await self.get(job_id)
+                    if not job or job["status"] != "queued" or job["cancel_requested"]:
+                        continue  # キャンセル済み・期限切れ
+
+                    await self._execute(job, slot)
+                finally:
+                    await self._release_slot(slot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Backtest job worker error: {e}")
+                await asyncio.sleep(1)
+
+    async def _execute(self, job: dict, slot: str):
+        """ジョブを実行し、状態と結果を保存"""
+        job_id = job["job_id"]
+        schema, method_name = self.JOB_KINDS[job["kind"]]
+        method = getattr(backtest_service, method_name)
+
+        # 生存通知を先に書き込んでから実行中にする（取得時に途絶えたと誤判定しないように）
+        await self._heartbeat(job_id, slot)
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        await self._save(job)
+        if await self._cancel_requested(job_id):
+            # 取り出してから実行を始めるまでの間にキャンセルされた
+            job["status"] = "cancelled"
+            job["cancel_requested"] = True
+            job["finished_at"] = time.time()
+            await self._save(job)
+            return
+
+        async def report_progress(progress: float):
+            if await self._cancel_requested(job_id):
+                raise JobCancelledError()
+            job["progress"] = round(progress, 4)
+            if not await self._save_unless_finished(job):
+                raise JobAbandonedError()
+
+        task = asyncio.create_task(method(schema(**job["request"]), progress=report_progress))
+        keep_alive = asyncio.create_task(self._keep_alive(job_id, slot))
+        self._running[job_id] = task
+        try:
+            result = await task
+            await self._save_result(job_id, result.model_dump(mode="json"))
+            job["status"] = "completed"
+            job["progress"] = 1.0
+        except JobAbandonedError:
+            print(f"Backtest job {job_id} was already marked finished, abandoning")
+            return
+        except (asyncio.CancelledError, JobCancelledError):
+            if asyncio.current_task().cancelling():
+                # ワーカー自体の停止（待っていたジョブのタスクも同時にキャンセルされる）
+                task.cancel()
+                raise
+            job["status"] = "cancelled"
+            job["cancel_requested"] = True
+        except Exception as e:
+            print(f"Backtest job {job_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            keep_alive.cancel()
+            self._running.pop(job_id, None)
+
+        job["finished_at"] = time.time()
+        if not await self._save_unless_finished(job):
+            print(f"Backtest job {job_id} was already marked finished, keeping the stored status")
+        if self.use_redis:
+            await redis_service.delete(f"{self.HEARTBEAT_KEY_PREFIX}{job_id}")
+
+
+# グローバルインスタンス
+backtest_job_service = BacktestJobService()
@@ -0,0 +1,202 @@
+"""
+バックテスト結果のモンテカルロ分析
+
+1本の価格経路から得た取引・資産曲線を何千回も再標本化し、総リターン・
+最大ドローダウン・シャープレシオの分布と信頼区間を求める純粋な関数群。
+経路は1本ずつループせず、(試行, 時点) の行列としてバッチ単位でまとめて計算する。
+"""
+import math
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPyが無い環境ではモンテカルロ分析を使用しない
+    np = None
+
+# 再標本化の方法
+METHODS = ("trades", "block_bootstrap")
+
+# 分布として返すパーセンタイル
+PERCENTILES = (5, 25, 50, 75, 95)
+
+HISTOGRAM_BINS = 20
+
+
+def trade_returns(trades: List[dict], equity_values: Sequence[float], start: int) -> "np.ndarray":
+    """
+    決済済みの各取引による資金全体のリターンと、ポジションの損益率を取り出す
+
+    ポジションを持たない間は評価額が変わらないため、取引ごとの資金リターン
+    （売却時の評価額 / 購入時の評価額 - 1）の積は最終資金 / 初期資金と一致する。
+
+    Returns:
+        (取引数, 2) の配列 [資金リターン, 損益率(%)]
+    """
+    equity = np.asarray(equity_values, dtype=float)
+    rows = []
+    entry_index = None
+    for trade in trades:
+        if trade["type"] == "buy":
+            entry_index = trade["index"] - start
+        elif entry_index is not None:
+            exit_index = trade["index"] - start
+            rows.append((equity[exit_index] / equity[entry_index] - 1, trade["profit_loss_percent"]))
+            entry_index = None
+    return np.asarray(rows, dtype=float).reshape(-1, 2)
+
+
+def bar_returns(equity_values: Sequence[float], initial_capital: float) -> "np.ndarray":
+    """資産曲線の1本ごとのリターン（初期資金からの変化を含む）"""
+    equity = np.concatenate(([initial_capital], np.asarray(equity_values, dtype=float)))
+    return equity[1:] / equity[:-1] - 1
+
+
+def default_block_size(length: int) -> int:
+    """ブロック長の既定値（系列長の立方根、自己相関をある程度保つ）"""
+    return max(1, int(round(length ** (1 / 3))))
+
+
+def _max_drawdown(paths: "np.ndarray") -> "np.ndarray":
+    """各経路の最大ドローダウン（%、calculate_max_drawdownと同じ定義）"""
+    peaks = np.maximum.accumulate(paths, axis=1)
+    return ((paths - peaks) / peaks).min(axis=1) * 100
+
+
+def _sharpe(returns: "np.ndarray") -> "np.ndarray":
+    """各行のシャープレシオ（リスクフリーレート0、年率換算なし、計算できない行はNaN）"""
+    if returns.shape[1] < 2:
+        return np.full(returns.shape[0], np.nan)
+    std = returns.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, returns.mean(axis=1) / std, np.nan)
+
+
+def _resample_trades(
+    rng: "np.random.Generator",
+    samples: "np.ndarray",
+    count: int,
+    initial_capital: float
+) -> tuple:
+    """取引を復元抽出した経路の (総リターン%, 最大DD%, シャープ)"""
+    picks = samples[rng.integers(0, len(samples), size=(count, len(samples)))]
+    growth = np.cumprod(1 + picks[:, :, 0], axis=1)
+    paths = np.concatenate((np.ones((count, 1)), growth), axis=1) * initial_capital
+    # シャープレシオは従来と同じくポジションの損益率から計算
+    return (growth[:, -1] - 1) * 100, _max_drawdown(paths), _sharpe(picks[:, :, 1])
+
+
+def _block_bootstrap(
+    rng: "np.random.Generator",
+    returns: "np.ndarray",
+    count: int,
+    block_size: int,
+    initial_capital: float
+) -> tuple:
+    """
+    連続したブロック単位で復元抽出した経路の (総リターン%, 最大DD%, シャープ)
+
+    系列の末尾は先頭につなげて扱う（循環ブロックブートストラップ）。
+    端の時点も他と同じ確率で選ばれる。
+    """
+    length = len(returns)
+    blocks = math.ceil(length / block_size)
+    starts = rng.integers(0, length, size=(count, blocks))
+    indices = ((starts[:, :, None] + np.arange(block_size)) % length).reshape(count, -1)[:, :length]
+    picks = returns[indices]
+    growth = np.cumprod(1 + picks, axis=1)
+    paths = np.concatenate((np.ones((count, 1)), growth), axis=1) * initial_capital
+    return (growth[:, -1] - 1) * 100, _max_drawdown(paths), _sharpe(picks)
+
+
+def summarize(values: "np.ndarray", confidence_level: float) -> Optional[dict]:
+    """分布の要約（平均・標準偏差・パーセンタイル・信頼区間・ヒストグラム）"""
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return None
+
+    alpha = (1 - confidence_level) / 2
+    lower, upper = np.quantile(values, [alpha, 1 - alpha])
+    low, high = float(values.min()), float(values.max())
+    # 全試行がほぼ同じ値の場合は幅を持たせる（丸め誤差だけの範囲では階級を作れない）
+    span = (low - 0.5, high + 0.5) if high - low <= 1e-9 * max(1.0, abs(low)) else (low, high)
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS, range=span)
+    return {
+        "samples": int(values.size),
+        "mean": float(values.mean()),
+        "std": float(values.std(ddof=1)) if values.size > 1 else 0.0,
+        "min": low,
+        "max": high,
+        "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "ci_lower": float(lower),
+        "ci_upper": float(upper),
+        "histogram": {"bin_edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def run(
+    trades: List[dict],
+    equity_values: Sequence[float],
+    initial_capital: float,
+    start: int,
+    method: str,
+    simulations: int,
+    block_size: Optional[int],
+    confidence_level: float,
+    seed: int,
+    batch_size: int
+) -> dict:
+    """
+    モンテカルロ分析を実行
+
+    Args:
+        trades: backtest_engine.simulateの取引記録
+        equity_values: backtest_engine.simulateの資産曲線
+        initial_capital: 初期資金
+        start: シミュレーション開始インデックス（取引記録のindexの基準）
+        method: trades（取引リターンの復元抽出）/ block_bootstrap（1本ごとのリターンのブロック抽出）
+        simulations: 試行回数
+        block_size: ブロック長（Noneなら系列長から決める）
+        confidence_level: 信頼区間の水準（0.95など）
+        seed: 乱数シード（同じ入力・シードなら同じ結果）
+        batch_size: 1回にまとめて計算する試行数（メモリ使用量の上限）
+
+    Returns:
+        {"block_size", "total_return_percent", "max_drawdown", "sharpe_ratio", "probability_of_loss"}
+
+    Raises:
+        ValueError: batch_sizeが1未満、取引がない、未対応のmethodの場合
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be a positive integer, got {batch_size}")
+
+    if method == "trades":
+        samples = trade_returns(trades, equity_values, start)
+        if len(samples) == 0:
+            raise ValueError("No closed trades to resample")
+        block_size = None
+    elif method == "block_bootstrap":
+        samples = bar_returns(equity_values, initial_capital)
+        block_size = min(block_size or default_block_size(len(samples)), len(samples))
+    else:
+        raise ValueError(f"Unsupported method: {method}")
+
+    rng = np.random.default_rng(seed)
+    total_returns, drawdowns, sharpes = [], [], []
+    for offset in range(0, simulations, batch_size):
+        count = min(batch_size, simulations - offset)
+        if method == "trades":
+            batch = _resample_trades(rng, samples, count, initial_capital)
+        else:
+            batch = _block_bootstrap(rng, samples, count, block_size, initial_capital)
+        total_returns.append(batch[0])
+        drawdowns.append(batch[1])
+        sharpes.append(batch[2])
+
+    total_returns = np.concatenate(total_returns)
+    return {
+        "block_size": block_size,
+        "total_return_percent": summarize(total_returns, confidence_level),
+        "max_drawdown": summarize(np.concatenate(drawdowns), confidence_level),
+        "sharpe_ratio": summarize(np.concatenate(sharpes), confidence_level),
+        "probability_of_loss": float((total_returns < 0).mean()),
+    }
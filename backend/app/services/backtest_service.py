@@ -1,57 +1,130 @@
-from typing import List, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import functools
+import itertools
 import statistics
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+from app.core.config import settings
+
 from app.schemas.backtest import (
     BacktestRequest,
     BacktestResponse,
     BacktestStrategy,
     BacktestTrade,
-    BacktestMetrics
+    BacktestMetrics,
+    BacktestSweepRequest,
+    BacktestSweepResponse,
+    BacktestSweepResult,
+    ParameterRange,
+    PortfolioBacktestRequest,
+    PortfolioBacktestResponse,
+    PortfolioBacktestTrade,
+    AssetAttribution,
+    WalkForwardRequest,
+    WalkForwardResponse,
+    WalkForwardWindow,
+    MonteCarloRequest,
+    MonteCarloResponse
 )
 from app.services.crypto_service import crypto_service
 from app.services.analysis_service import analysis_service
+from app.services import backtest_engine, backtest_monte_carlo, numpy_indicators
+from app.services.backtest_cache import backtest_cache, request_key, series_fingerprint
+from app.services.compute_pool import compute_pool
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPyが無い環境ではポートフォリオバックテストを使用しない
+    np = None
+
+# 進捗（0.0〜1.0）を受け取るコールバック
+ProgressCallback = Callable[[float], Awaitable[None]]
 
 
 class BacktestService:
     """バックテストサービス"""
 
+    # スイープ可能なパラメータ（整数パラメータはintに丸める）
+    INT_PARAMETERS = {"rsi_period", "macd_fast", "macd_slow", "macd_signal_period", "bb_period"}
+    SWEEP_PARAMETERS = tuple(backtest_engine.DEFAULT_PARAMETERS) + ("trade_size_percent",)
+    SORTABLE_METRICS = {
+        "total_return_percent",
+        "total_return",
+        "win_rate",
+        "sharpe_ratio",
+        "max_drawdown",
+        "avg_profit_per_trade",
+    }
+
     def __init__(self):
         self.analysis = analysis_service
 
-    async def run_backtest(self, request: BacktestRequest) -> BacktestResponse:
-        """バックテストを実行"""
-        # 過去データを取得
-        chart_data = await crypto_service.get_chart_data(request.symbol, request.period_days)
-        if not chart_data or len(chart_data.prices) < 30:
+    async def run_backtest(
+        self,
+        request: BacktestRequest,
+        progress: Optional[ProgressCallback] = None
+    ) -> BacktestResponse:
+        """
+        バックテストを実行
+
+        Args:
+            request: バックテストリクエスト
+            progress: 進捗の通知先（非同期ジョブ用）
+        """
+        error = backtest_engine.validate_parameters(request.strategy.model_dump())
+        if error:
+            raise ValueError(error)
+
+        # 過去データを取得（列指向アーカイブのビュー、またはリスト）
+        series = await crypto_service.get_price_series(request.symbol, request.period_days)
+        if not series or len(series[1]) < 30:
             raise ValueError(f"Insufficient data for backtesting {request.symbol}")
 
-        prices = [p.price for p in chart_data.prices]
-        timestamps = [p.timestamp for p in chart_data.prices]
+        timestamps, prices = series
+
+        # 同じリクエスト・同じ価格データの結果はキャッシュから返す
+        cache_key = None
+        if settings.BACKTEST_CACHE_ENABLED:
+            cache_key = request_key(request, series_fingerprint(timestamps, prices))
+            cached = await backtest_cache.get(cache_key)
+            if cached:
+                return cached.model_copy(update={"symbol": request.symbol, "strategy": request.strategy})
 
-        # バックテスト実行
-        trades, equity_curve = self._simulate_trades(
+        params = request.strategy.model_dump()
+        if progress:
+            await progress(0.2)
+
+        # 指標系列を計算し、シミュレーションと指標計算は計算プールで実行
+        prices = self.analysis.prepare_prices(prices)
+        indicators = await asyncio.to_thread(
+            self._compute_indicators, prices, request.strategy, [params]
+        )
+        if progress:
+            await progress(0.4)
+        result = await compute_pool.run(
+            backtest_engine.run,
             prices,
-            timestamps,
-            request.strategy
+            indicators,
+            self._strategy_payload(request.strategy),
+            params
         )
 
-        # パフォーマンス指標を計算
-        metrics = self._calculate_metrics(
-            trades,
-            equity_curve,
-            request.strategy.initial_capital
+        trades, equity_curve = self._build_results(
+            result["trades"], result["equity_values"], timestamps
         )
+        metrics = BacktestMetrics(**result["metrics"])
 
         # 最終資金
         final_capital = equity_curve[-1]["value"] if equity_curve else request.strategy.initial_capital
 
         # 日時をdatetimeに変換
-        start_date = datetime.fromtimestamp(timestamps[0] / 1000)
-        end_date = datetime.fromtimestamp(timestamps[-1] / 1000)
+        start_date = datetime.fromtimestamp(int(timestamps[0]) / 1000)
+        end_date = datetime.fromtimestamp(int(timestamps[-1]) / 1000)
 
-        return BacktestResponse(
+        response = BacktestResponse(
             symbol=request.symbol,
-            name=chart_data.name,
+            name=crypto_service.get_coin_name(request.symbol),
             strategy=request.strategy,
             start_date=start_date,
             end_date=end_date,
@@ -61,248 +134,553 @@ class BacktestService:
             metrics=metrics,
             equity_curve=equity_curve
         )
+        if cache_key:
+            await backtest_cache.set(cache_key, response)
+        return response
 
-    def _simulate_trades(
-        self,
-        prices: List[float],
-        timestamps: List[int],
-        strategy: BacktestStrategy
-    ) -> Tuple[List[BacktestTrade], List[dict]]:
-        """取引をシミュレート"""
-        trades = []
-        equity_curve = []
-        cash = strategy.initial_capital
-        position = 0.0  # 保有数量
-        position_entry_price = 0.0
-        trade_id = 0
-
-        # 各時点でシグナルを評価
-        for i in range(30, len(prices)):  # 最初の30日は指標計算に必要
-            price_window = prices[:i+1]
-            current_price = prices[i]
-            current_timestamp = timestamps[i]
-
-            # テクニカル指標を計算
-            rsi = self.analysis.calculate_rsi(price_window)
-            macd = self.analysis.calculate_macd(price_window)
-            bollinger = self.analysis.calculate_bollinger_bands(price_window)
-
-            # 買いシグナル評価
-            buy_signal = self._evaluate_buy_signal(strategy.buy_signal, rsi, macd, bollinger, current_price)
-
-            # 売りシグナル評価
-            sell_signal = self._evaluate_sell_signal(strategy.sell_signal, rsi, macd, bollinger, current_price)
-
-            # ポジションなし & 買いシグナル → 買い
-            if position == 0 and buy_signal and cash > 0:
-                trade_amount = (cash * strategy.trade_size_percent / 100) / current_price
-                trade_value = trade_amount * current_price
-
-                if trade_value > 0:
-                    trade_id += 1
-                    trades.append(BacktestTrade(
-                        trade_id=trade_id,
-                        type="buy",
-                        timestamp=datetime.fromtimestamp(current_timestamp / 1000),
-                        price=current_price,
-                        amount=trade_amount,
-                        value=trade_value
-                    ))
-
-                    cash -= trade_value
-                    position = trade_amount
-                    position_entry_price = current_price
-
-            # ポジションあり & 売りシグナル → 売り
-            elif position > 0 and sell_signal:
-                trade_value = position * current_price
-                profit_loss = trade_value - (position * position_entry_price)
-                profit_loss_percent = (profit_loss / (position * position_entry_price)) * 100
-
-                trade_id += 1
-                trades.append(BacktestTrade(
-                    trade_id=trade_id,
-                    type="sell",
-                    timestamp=datetime.fromtimestamp(current_timestamp / 1000),
-                    price=current_price,
-                    amount=position,
-                    value=trade_value,
-                    profit_loss=profit_loss,
-                    profit_loss_percent=profit_loss_percent
-                ))
-
-                cash += trade_value
-                position = 0.0
-                position_entry_price = 0.0
-
-            # 資産曲線を記録
-            total_value = cash + (position * current_price)
-            equity_curve.append({
-                "timestamp": current_timestamp,
-                "value": total_value
-            })
-
-        # 最後にポジションを持っていたら清算
-        if position > 0:
-            final_price = prices[-1]
-            final_timestamp = timestamps[-1]
-            trade_value = position * final_price
-            profit_loss = trade_value - (position * position_entry_price)
-            profit_loss_percent = (profit_loss / (position * position_entry_price)) * 100
-
-            trade_id += 1
-            trades.append(BacktestTrade(
-                trade_id=trade_id,
-                type="sell",
-                timestamp=datetime.fromtimestamp(final_timestamp / 1000),
-                price=final_price,
-                amount=position,
-                value=trade_value,
-                profit_loss=profit_loss,
-                profit_loss_percent=profit_loss_percent
-            ))
-
-        return trades, equity_curve
-
-    def _evaluate_buy_signal(self, signal: str, rsi: float, macd, bollinger, price: float) -> bool:
-        """買いシグナルを評価"""
-        if signal == "rsi_oversold":
-            return rsi < 30
-        elif signal == "macd_golden_cross":
-            return macd.signal == "buy"
-        elif signal == "bb_lower_breach":
-            return bollinger.current_position == "below_lower"
-        return False
-
-    def _evaluate_sell_signal(self, signal: str, rsi: float, macd, bollinger, price: float) -> bool:
-        """売りシグナルを評価"""
-        if signal == "rsi_overbought":
-            return rsi > 70
-        elif signal == "macd_dead_cross":
-            return macd.signal == "sell"
-        elif signal == "bb_upper_breach":
-            return bollinger.current_position == "above_upper"
-        return False
-
-    def _calculate_metrics(
+    async def run_sweep(
         self,
-        trades: List[BacktestTrade],
-        equity_curve: List[dict],
-        initial_capital: float
-    ) -> BacktestMetrics:
-        """パフォーマンス指標を計算"""
-        if not trades:
-            return BacktestMetrics(
-                total_trades=0,
-                winning_trades=0,
-                losing_trades=0,
-                win_rate=0.0,
-                total_return=0.0,
-                total_return_percent=0.0,
-                max_drawdown=0.0,
-                sharpe_ratio=None,
-                avg_profit_per_trade=0.0,
-                avg_profit_per_winning_trade=0.0,
-                avg_loss_per_losing_trade=0.0
-            )
-
-        # 売り取引のみを抽出（利益計算のため）
-        sell_trades = [t for t in trades if t.type == "sell" and t.profit_loss is not None]
-
-        if not sell_trades:
-            return BacktestMetrics(
-                total_trades=len(trades),
-                winning_trades=0,
-                losing_trades=0,
-                win_rate=0.0,
-                total_return=0.0,
-                total_return_percent=0.0,
-                max_drawdown=0.0,
-                sharpe_ratio=None,
-                avg_profit_per_trade=0.0,
-                avg_profit_per_winning_trade=0.0,
-                avg_loss_per_losing_trade=0.0
-            )
+        request: BacktestSweepRequest,
+        progress: Optional[ProgressCallback] = None
+    ) -> BacktestSweepResponse:
+        """
+        パラメータスイープ（グリッドサーチ）を実行
+
+        価格系列は1回だけ取得し、指標系列はパラメータの組み合わせ間で共有する
+        （例: RSI閾値だけを変える組み合わせは同じRSI系列を使う）。
+        組み合わせはチャンクに分けて計算プールに分散して評価する。
+
+        Args:
+            request: スイープリクエスト
+            progress: 進捗の通知先（非同期ジョブ用）
+        """
+        started = time.perf_counter()
+        if request.sort_by not in self.SORTABLE_METRICS:
+            raise ValueError(f"Unsupported sort_by: {request.sort_by}")
+
+        param_sets, skipped = self._parameter_sets(request.strategy, request.parameters)
+
+        series = await crypto_service.get_price_series(request.symbol, request.period_days)
+        if not series or len(series[1]) < 30:
+            raise ValueError(f"Insufficient data for backtesting {request.symbol}")
+        timestamps, prices = series
+        if progress:
+            await progress(0.1)
+
+        strategy = self._strategy_payload(request.strategy)
+        prices = self.analysis.prepare_prices(prices)
+        indicators = await asyncio.to_thread(
+            self._compute_indicators, prices, request.strategy, param_sets
+        )
+        if progress:
+            await progress(0.2)
 
-        # 勝ち・負けトレード
-        winning_trades = [t for t in sell_trades if t.profit_loss > 0]
-        losing_trades = [t for t in sell_trades if t.profit_loss <= 0]
+        results = await self._evaluate_grid(prices, indicators, strategy, param_sets, progress)
 
-        total_trades = len(sell_trades)
-        num_winning = len(winning_trades)
-        num_losing = len(losing_trades)
-        win_rate = (num_winning / total_trades * 100) if total_trades > 0 else 0.0
+        # sort_byの降順（Noneは最下位）
+        results.sort(key=lambda r: backtest_engine.rank_key(r["metrics"][request.sort_by]), reverse=True)
 
-        # トータルリターン
-        total_return = sum(t.profit_loss for t in sell_trades)
-        total_return_percent = (total_return / initial_capital) * 100
+        return BacktestSweepResponse(
+            symbol=request.symbol,
+            name=crypto_service.get_coin_name(request.symbol),
+            strategy=request.strategy,
+            start_date=datetime.fromtimestamp(int(timestamps[0]) / 1000),
+            end_date=datetime.fromtimestamp(int(timestamps[-1]) / 1000),
+            total_combinations=len(param_sets),
+            skipped_combinations=skipped,
+            sort_by=request.sort_by,
+            elapsed_seconds=time.perf_counter() - started,
+            results=[
+                BacktestSweepResult(
+                    rank=rank,
+                    parameters=result["parameters"],
+                    final_capital=result["final_capital"],
+                    metrics=BacktestMetrics(**result["metrics"])
+                )
+                for rank, result in enumerate(results[:request.top_n], start=1)
+            ]
+        )
 
-        # 平均利益・損失
-        avg_profit_per_trade = total_return / total_trades if total_trades > 0 else 0.0
-        avg_profit_per_winning = (
-            sum(t.profit_loss for t in winning_trades) / num_winning
-            if num_winning > 0 else 0.0
+    async def run_portfolio_backtest(self, request: PortfolioBacktestRequest) -> PortfolioBacktestResponse:
+        """
+        複数銘柄のポートフォリオでバックテストを実行
+
+        各銘柄の価格系列を共通のタイムスタンプに揃えた (時点, 銘柄) 行列にし、
+        指標計算とシグナル判定を銘柄方向にベクトル化して行う。現金は全銘柄で共有する。
+        """
+        if np is None:
+            raise ValueError("Portfolio backtest requires NumPy")
+        if request.position_sizing not in backtest_engine.POSITION_SIZING_METHODS:
+            raise ValueError(f"Unsupported position_sizing: {request.position_sizing}")
+
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in request.symbols))
+        if len(symbols) > settings.BACKTEST_PORTFOLIO_MAX_SYMBOLS:
+            raise ValueError(f"Too many symbols (max {settings.BACKTEST_PORTFOLIO_MAX_SYMBOLS})")
+
+        params = request.strategy.model_dump()
+        error = backtest_engine.validate_parameters(params)
+        if error:
+            raise ValueError(error)
+
+        # 全銘柄の価格系列を並行取得
+        series_list = await asyncio.gather(*(
+            crypto_service.get_price_series(symbol, request.period_days) for symbol in symbols
+        ))
+        missing = [symbol for symbol, series in zip(symbols, series_list) if not series]
+        if missing:
+            raise ValueError(f"No price data for {', '.join(missing)}")
+
+        timestamps, prices = self._align_series(series_list)
+        if len(timestamps) < 30:
+            raise ValueError("Insufficient overlapping data for portfolio backtesting")
+
+        indicators = await asyncio.to_thread(
+            self._compute_indicators, prices, request.strategy, [params], True
         )
-        avg_loss_per_losing = (
-            sum(t.profit_loss for t in losing_trades) / num_losing
-            if num_losing > 0 else 0.0
+        result = await compute_pool.run(
+            backtest_engine.run_portfolio,
+            prices,
+            indicators,
+            self._strategy_payload(request.strategy),
+            params,
+            request.position_sizing,
+            request.rebalance_interval
         )
 
-        # 最大ドローダウン
-        max_drawdown = self._calculate_max_drawdown(equity_curve)
-
-        # シャープレシオ
-        sharpe_ratio = self._calculate_sharpe_ratio(sell_trades) if len(sell_trades) > 1 else None
-
-        return BacktestMetrics(
-            total_trades=total_trades,
-            winning_trades=num_winning,
-            losing_trades=num_losing,
-            win_rate=win_rate,
-            total_return=total_return,
-            total_return_percent=total_return_percent,
-            max_drawdown=max_drawdown,
-            sharpe_ratio=sharpe_ratio,
-            avg_profit_per_trade=avg_profit_per_trade,
-            avg_profit_per_winning_trade=avg_profit_per_winning,
-            avg_loss_per_losing_trade=avg_loss_per_losing
+        trades = [
+            PortfolioBacktestTrade(
+                trade_id=trade_id,
+                symbol=symbols[trade["asset"]],
+                type=trade["type"],
+                timestamp=datetime.fromtimestamp(int(timestamps[trade["index"]]) / 1000),
+                price=trade["price"],
+                amount=trade["amount"],
+                value=trade["value"],
+                profit_loss=trade["profit_loss"],
+                profit_loss_percent=trade["profit_loss_percent"]
+            )
+            for trade_id, trade in enumerate(result["trades"], start=1)
+        ]
+        equity_values = result["equity_values"]
+        equity_curve = [
+            {"timestamp": int(timestamps[backtest_engine.WARMUP_BARS + k]), "value": value}
+            for k, value in enumerate(equity_values)
+        ]
+
+        return PortfolioBacktestResponse(
+            symbols=symbols,
+            strategy=request.strategy,
+            position_sizing=request.position_sizing,
+            rebalance_interval=request.rebalance_interval,
+            start_date=datetime.fromtimestamp(int(timestamps[0]) / 1000),
+            end_date=datetime.fromtimestamp(int(timestamps[-1]) / 1000),
+            initial_capital=request.strategy.initial_capital,
+            final_capital=equity_values[-1] if equity_values else request.strategy.initial_capital,
+            trades=trades,
+            metrics=BacktestMetrics(**result["metrics"]),
+            attribution=[
+                AssetAttribution(symbol=symbol, name=crypto_service.get_coin_name(symbol), **entry)
+                for symbol, entry in zip(symbols, result["attribution"])
+            ],
+            equity_curve=equity_curve
         )
 
-    def _calculate_max_drawdown(self, equity_curve: List[dict]) -> float:
-        """最大ドローダウンを計算"""
-        if not equity_curve:
-            return 0.0
+    def _align_series(
+        self,
+        series_list: List[Tuple[Sequence[int], Sequence[float]]]
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        複数銘柄の価格系列を全銘柄に共通するタイムスタンプで揃える
+
+        Returns:
+            (共通タイムスタンプ列, (時点, 銘柄) の価格行列)
+        """
+        ts_arrays = [np.asarray(ts, dtype=np.int64) for ts, _ in series_list]
+        common = functools.reduce(np.intersect1d, ts_arrays)
+        columns = [
+            numpy_indicators.as_array(prices)[np.searchsorted(ts, common)]
+            for ts, (_, prices) in zip(ts_arrays, series_list)
+        ]
+        return common, np.column_stack(columns)
+
+    async def run_walk_forward(
+        self,
+        request: WalkForwardRequest,
+        progress: Optional[ProgressCallback] = None
+    ) -> WalkForwardResponse:
+        """
+        ウォークフォワード分析を実行
+
+        履歴をインサンプル/アウトオブサンプルのウィンドウに分け、ウィンドウごとに
+        インサンプルでパラメータを最適化してアウトオブサンプルで評価する。
+        指標系列は全期間で1回だけ計算して全ウィンドウで共有し（i番目の値は
+        prices[:i+1]だけで決まるため先読みにならない）、ウィンドウは計算プールで並列評価する。
+
+        Args:
+            request: ウォークフォワード分析リクエスト
+            progress: 進捗の通知先（非同期ジョブ用）
+        """
+        started = time.perf_counter()
+        if request.optimize_by not in self.SORTABLE_METRICS:
+            raise ValueError(f"Unsupported optimize_by: {request.optimize_by}")
+        step = request.step_bars or request.out_of_sample_bars
+        if step < request.out_of_sample_bars:
+            raise ValueError("step_bars must not be shorter than out_of_sample_bars")
+
+        param_sets, _ = self._parameter_sets(request.strategy, request.parameters)
+
+        series = await crypto_service.get_price_series(request.symbol, request.period_days)
+        if not series or len(series[1]) < 30:
+            raise ValueError(f"Insufficient data for backtesting {request.symbol}")
+        timestamps, prices = series
 
-        peak = equity_curve[0]["value"]
-        max_dd = 0.0
+        windows = self._walk_forward_windows(
+            len(prices), request.in_sample_bars, request.out_of_sample_bars, step
+        )
+        if not windows:
+            raise ValueError(
+                f"Not enough data for a {request.in_sample_bars}+{request.out_of_sample_bars} bar window "
+                f"({len(prices)} bars)"
+            )
+        if progress:
+            await progress(0.1)
 
-        for point in equity_curve:
-            value = point["value"]
-            if value > peak:
-                peak = value
-            drawdown = ((value - peak) / peak) * 100
-            if drawdown < max_dd:
-                max_dd = drawdown
+        strategy = self._strategy_payload(request.strategy)
+        prices = self.analysis.prepare_prices(prices)
+        indicators = await asyncio.to_thread(
+            self._compute_indicators, prices, request.strategy, param_sets
+        )
+        if progress:
+            await progress(0.2)
+
+        evaluated = 0
+
+        # 価格列・指標系列・組み合わせはウィンドウごとに送らず、ワーカーごとに1回だけ渡す
+        async with compute_pool.share((prices, indicators, strategy, param_sets)) as shared:
+            async def evaluate_window(in_sample: Tuple[int, int], out_of_sample: Tuple[int, int]) -> dict:
+                nonlocal evaluated
+                result = await compute_pool.run_shared(
+                    backtest_engine.walk_forward_window,
+                    shared,
+                    in_sample,
+                    out_of_sample,
+                    request.optimize_by
+                )
+                evaluated += 1
+                if progress:
+                    await progress(0.2 + 0.8 * evaluated / len(windows))
+                return result
+
+            results = await asyncio.gather(*(evaluate_window(*window) for window in windows))
+
+        # アウトオブサンプル区間の資産曲線を複利でつなぐ
+        initial_capital = request.strategy.initial_capital
+        capital = initial_capital
+        equity_curve = []
+        for (_, (oos_start, _)), result in zip(windows, results):
+            scale = capital / initial_capital
+            for k, value in enumerate(result["out_of_sample_equity"]):
+                equity_curve.append({"timestamp": int(timestamps[oos_start + k]), "value": value * scale})
+            capital = equity_curve[-1]["value"]
+
+        # 1本あたりの平均リターンの比（アウトオブサンプル / インサンプル）
+        in_sample_rate = statistics.mean(
+            r["in_sample_metrics"]["total_return_percent"] for r in results
+        ) / request.in_sample_bars
+        out_of_sample_rate = statistics.mean(
+            r["out_of_sample_metrics"]["total_return_percent"] for r in results
+        ) / request.out_of_sample_bars
+
+        def to_datetime(index: int) -> datetime:
+            return datetime.fromtimestamp(int(timestamps[index]) / 1000)
+
+        return WalkForwardResponse(
+            symbol=request.symbol,
+            name=crypto_service.get_coin_name(request.symbol),
+            strategy=request.strategy,
+            optimize_by=request.optimize_by,
+            total_combinations=len(param_sets),
+            windows=[
+                WalkForwardWindow(
+                    index=index,
+                    in_sample_start=to_datetime(is_start),
+                    in_sample_end=to_datetime(is_end - 1),
+                    out_of_sample_start=to_datetime(oos_start),
+                    out_of_sample_end=to_datetime(oos_end - 1),
+                    parameters=result["parameters"],
+                    in_sample_metrics=BacktestMetrics(**result["in_sample_metrics"]),
+                    out_of_sample_metrics=BacktestMetrics(**result["out_of_sample_metrics"])
+                )
+                for index, (((is_start, is_end), (oos_start, oos_end)), result)
+                in enumerate(zip(windows, results), start=1)
+            ],
+            profitable_windows=sum(
+                1 for r in results if r["out_of_sample_metrics"]["total_return_percent"] > 0
+            ),
+            out_of_sample_return_percent=(capital / initial_capital - 1) * 100,
+            walk_forward_efficiency=(out_of_sample_rate / in_sample_rate) if in_sample_rate > 0 else None,
+            equity_curve=equity_curve,
+            elapsed_seconds=time.perf_counter() - started
+        )
 
-        return max_dd
+    async def run_monte_carlo(
+        self,
+        request: MonteCarloRequest,
+        progress: Optional[ProgressCallback] = None
+    ) -> MonteCarloResponse:
+        """
+        モンテカルロ分析を実行
+
+        実際の価格経路でバックテストした取引・資産曲線を再標本化し、
+        総リターン・最大ドローダウン・シャープレシオの分布と信頼区間を求める。
+
+        Args:
+            request: モンテカルロ分析リクエスト
+            progress: 進捗の通知先（非同期ジョブ用）
+        """
+        started = time.perf_counter()
+        if np is None:
+            raise ValueError("Monte Carlo analysis requires NumPy")
+        if request.method not in backtest_monte_carlo.METHODS:
+            raise ValueError(f"Unsupported method: {request.method}")
+        if request.simulations > settings.BACKTEST_MONTE_CARLO_MAX_SIMULATIONS:
+            raise ValueError(
+                f"Too many simulations (max {settings.BACKTEST_MONTE_CARLO_MAX_SIMULATIONS})"
+            )
 
-    def _calculate_sharpe_ratio(self, sell_trades: List[BacktestTrade]) -> float:
-        """シャープレシオを計算"""
-        if len(sell_trades) < 2:
-            return 0.0
+        params = request.strategy.model_dump()
+        error = backtest_engine.validate_parameters(params)
+        if error:
+            raise ValueError(error)
 
-        returns = [t.profit_loss_percent for t in sell_trades if t.profit_loss_percent is not None]
+        series = await crypto_service.get_price_series(request.symbol, request.period_days)
+        if not series or len(series[1]) < 30:
+            raise ValueError(f"Insufficient data for backtesting {request.symbol}")
+        _, prices = series
+        if progress:
+            await progress(0.2)
 
-        if not returns:
-            return 0.0
+        prices = self.analysis.prepare_prices(prices)
+        indicators = await asyncio.to_thread(
+            self._compute_indicators, prices, request.strategy, [params]
+        )
+        result = await compute_pool.run(
+            backtest_engine.run,
+            prices,
+            indicators,
+            self._strategy_payload(request.strategy),
+            params
+        )
+        if progress:
+            await progress(0.4)
+
+        distributions = await compute_pool.run(
+            backtest_monte_carlo.run,
+            result["trades"],
+            result["equity_values"],
+            request.strategy.initial_capital,
+            backtest_engine.WARMUP_BARS,
+            request.method,
+            request.simulations,
+            request.block_size,
+            request.confidence_level,
+            request.seed,
+            settings.BACKTEST_MONTE_CARLO_BATCH_SIZE
+        )
 
-        avg_return = statistics.mean(returns)
-        std_return = statistics.stdev(returns) if len(returns) > 1 else 1.0
+        return MonteCarloResponse(
+            symbol=request.symbol,
+            name=crypto_service.get_coin_name(request.symbol),
+            strategy=request.strategy,
+            method=request.method,
+            simulations=request.simulations,
+            confidence_level=request.confidence_level,
+            seed=request.seed,
+            observed=BacktestMetrics(**result["metrics"]),
+            elapsed_seconds=time.perf_counter() - started,
+            **distributions
+        )
 
-        # リスクフリーレートは0と仮定
-        sharpe = avg_return / std_return if std_return > 0 else 0.0
+    def _walk_forward_windows(
+        self,
+        length: int,
+        in_sample_bars: int,
+        out_of_sample_bars: int,
+        step_bars: int
+    ) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """ウィンドウの区間 ((インサンプル開始, 終了), (アウトオブサンプル開始, 終了)) を作成"""
+        windows = []
+        start = backtest_engine.WARMUP_BARS
+        while start + in_sample_bars + out_of_sample_bars <= length:
+            split = start + in_sample_bars
+            windows.append(((start, split), (split, split + out_of_sample_bars)))
+            start += step_bars
+        return windows
+
+    def _parameter_sets(
+        self,
+        strategy: BacktestStrategy,
+        parameters: Dict[str, ParameterRange]
+    ) -> Tuple[List[dict], int]:
+        """
+        パラメータ範囲の全組み合わせを展開（スイープしないパラメータは戦略の値）
+
+        Returns:
+            (有効な組み合わせのリスト, 不正なため除外した組み合わせ数)
+        """
+        grid = self._expand_grid(parameters)
+        total = 1
+        for _, values in grid:
+            total *= len(values)
+        if total > settings.BACKTEST_SWEEP_MAX_COMBINATIONS:
+            raise ValueError(
+                f"Too many combinations: {total} (max {settings.BACKTEST_SWEEP_MAX_COMBINATIONS})"
+            )
 
-        return sharpe
+        base = strategy.model_dump()
+        names = [name for name, _ in grid]
+        param_sets = []
+        skipped = 0
+        for combo in itertools.product(*(values for _, values in grid)):
+            params = {name: base[name] for name in self.SWEEP_PARAMETERS}
+            params.update(zip(names, combo))
+            if backtest_engine.validate_parameters(params):
+                skipped += 1
+                continue
+            param_sets.append(params)
+        if not param_sets:
+            raise ValueError("No valid parameter combinations")
+        return param_sets, skipped
+
+    def _expand_grid(self, parameters: Dict[str, ParameterRange]) -> List[Tuple[str, list]]:
+        """パラメータ範囲を値のリストに展開"""
+        grid = []
+        for name, spec in parameters.items():
+            if name not in self.SWEEP_PARAMETERS:
+                raise ValueError(f"Unsupported sweep parameter: {name}")
+
+            if spec.values is not None:
+                values = list(spec.values)
+            elif spec.start is not None and spec.stop is not None and spec.step is not None:
+                count = int((spec.stop - spec.start) / spec.step + 1e-9) + 1
+                values = [round(spec.start + k * spec.step, 10) for k in range(max(count, 0))]
+            else:
+                raise ValueError(f"Parameter {name} needs values or start/stop/step")
+
+            if name in self.INT_PARAMETERS:
+                values = [int(round(v)) for v in values]
+            # 重複を除いて順序を保つ
+            values = list(dict.fromkeys(values))
+            if not values:
+                raise ValueError(f"Parameter {name} has no values")
+            grid.append((name, values))
+        return grid
+
+    def _compute_indicators(
+        self,
+        prices: Sequence[float],
+        strategy: BacktestStrategy,
+        param_sets: List[dict],
+        vectorized: bool = False
+    ) -> Dict[tuple, Sequence]:
+        """
+        組み合わせ全体で必要な指標系列を、重複なく1回ずつ計算
+
+        vectorized=Trueの場合は (時点, 銘柄) の価格行列をNumPyバックエンドで一括計算する。
+        """
+        kinds = {
+            backtest_engine.SIGNAL_INDICATORS.get(strategy.buy_signal),
+            backtest_engine.SIGNAL_INDICATORS.get(strategy.sell_signal),
+        }
+        indicators = {}
+        for params in param_sets:
+            for kind in kinds:
+                if kind is None:
+                    continue
+                key = backtest_engine.indicator_key(kind, params)
+                if key not in indicators:
+                    indicators[key] = self._indicator_series(prices, key, vectorized)
+        return indicators
+
+    def _indicator_series(self, prices: Sequence[float], key: tuple, vectorized: bool = False) -> Sequence:
+        """indicator_keyに対応する系列（シグナル判定に使う値）を計算"""
+        if vectorized:
+            if key[0] == "rsi":
+                return numpy_indicators.rsi_series(prices, key[1])
+            if key[0] == "macd":
+                return numpy_indicators.macd_series(prices, key[1], key[2], key[3])["macd_signal"]
+            return numpy_indicators.bollinger_series(prices, key[1], key[2])["bb_position"]
+
+        if key[0] == "rsi":
+            return self.analysis.calculate_rsi_series(prices, key[1])
+        if key[0] == "macd":
+            return self.analysis.calculate_macd_series(prices, key[1], key[2], key[3])["macd_signal"]
+        return self.analysis.calculate_bollinger_series(prices, key[1], key[2])["bb_position"]
+
+    async def _evaluate_grid(
+        self,
+        prices: Sequence[float],
+        indicators: Dict[tuple, Sequence],
+        strategy: dict,
+        param_sets: List[dict],
+        progress: Optional[ProgressCallback] = None
+    ) -> List[dict]:
+        """組み合わせをチャンクに分けて計算プールで並列評価"""
+        chunk_size = max(1, settings.BACKTEST_SWEEP_CHUNK_SIZE)
+        evaluated = 0
+
+        # 価格列・指標系列はチャンクごとに送らず、ワーカーごとに1回だけ渡す
+        async with compute_pool.share((prices, indicators)) as shared:
+            async def evaluate_chunk(chunk: List[dict]) -> List[dict]:
+                nonlocal evaluated
+                results = await compute_pool.run_shared(
+                    backtest_engine.evaluate_chunk, shared, strategy, chunk
+                )
+                evaluated += len(chunk)
+                if progress:
+                    await progress(0.2 + 0.8 * evaluated / len(param_sets))
+                return results
+
+            chunk_results = await asyncio.gather(*(
+                evaluate_chunk(param_sets[i:i + chunk_size])
+                for i in range(0, len(param_sets), chunk_size)
+            ))
+        return [result for chunk in chunk_results for result in chunk]
+
+    def _strategy_payload(self, strategy: BacktestStrategy) -> dict:
+        """計算プールに渡す戦略情報（Pydanticモデルではなく軽量な辞書）"""
+        return {
+            "buy_signal": strategy.buy_signal,
+            "sell_signal": strategy.sell_signal,
+            "initial_capital": strategy.initial_capital,
+            "trade_size_percent": strategy.trade_size_percent,
+        }
+
+    def _build_results(
+        self,
+        raw_trades: List[dict],
+        equity_values: List[float],
+        timestamps: Sequence[int]
+    ) -> Tuple[List[BacktestTrade], List[dict]]:
+        """計算結果を取引履歴と資産曲線（タイムスタンプ付き）に変換"""
+        trades = [
+            BacktestTrade(
+                trade_id=trade_id,
+                type=trade["type"],
+                timestamp=datetime.fromtimestamp(int(timestamps[trade["index"]]) / 1000),
+                price=trade["price"],
+                amount=trade["amount"],
+                value=trade["value"],
+                profit_loss=trade["profit_loss"],
+                profit_loss_percent=trade["profit_loss_percent"]
+            )
+            for trade_id, trade in enumerate(raw_trades, start=1)
+        ]
+        equity_curve = [
+            {"timestamp": int(timestamps[backtest_engine.WARMUP_BARS + k]), "value": value}
+            for k, value in enumerate(equity_values)
+        ]
+        return trades, equity_curve
 
 
 # グローバルインスタンス
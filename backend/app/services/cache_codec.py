@@ -0,0 +1,193 @@
+"""
+キャッシュ値のシリアライズと圧縮（コーデック）
+
+保存形式は「ヘッダー5バイト + 本体」。ヘッダーはマジックバイト2バイト・形式バージョン・
+シリアライザID・圧縮IDで、読み込み時は書き込んだワーカーの設定に関係なく
+ヘッダーに従ってデコードする。ヘッダーのない値は従来のJSON文字列として読むため、
+コーデック導入前に書き込まれたエントリもロールアウト中にそのまま読める。
+
+orjson・zstandard（requirements.txtに含む）と msgpack・lz4（任意）は、
+インストールされていなければ標準ライブラリの json・圧縮なしで続行する。
+"""
+import json
+import zlib
+from typing import Any, Callable, Dict, Tuple, Union
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjsonが無い環境では標準のjsonを使用
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpackが無い環境ではmsgpack形式を使用しない
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandardが無い環境ではzstd圧縮を使用しない
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - lz4が無い環境ではlz4圧縮を使用しない
+    lz4_frame = None
+
+MAGIC = b"\x00\xcc"
+# 形式を変えたら上げる（読めない版のエントリはキャッシュミスとして扱われる）
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+
+def _msgpack_default(value: Any) -> Any:
+    """msgpackで扱えない値の変換（json.dumps(default=str) と同じく文字列にする）"""
+    if hasattr(value, "item"):  # NumPyのスカラー
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_encode(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+def _json_decode(data: bytes) -> Any:
+    # JSONとして同じ内容なので、orjsonがあれば読み込みはorjsonで行う
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _orjson_encode(value: Any) -> bytes:
+    return orjson.dumps(
+        value, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+def _msgpack_encode(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_decode(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# 名前 → (ID, エンコード, デコード)。IDは保存形式の一部なので変えないこと
+SERIALIZERS: Dict[str, Tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    "json": (0, _json_encode, _json_decode),
+}
+if orjson:
+    SERIALIZERS["orjson"] = (1, _orjson_encode, _json_decode)
+if msgpack:
+    SERIALIZERS["msgpack"] = (2, _msgpack_encode, _msgpack_decode)
+
+# 名前 → (ID, 圧縮, 展開)
+COMPRESSORS: Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (0, bytes, bytes),
+    "zlib": (1, zlib.compress, zlib.decompress),
+}
+if zstandard:
+    COMPRESSORS["zstd"] = (
+        2,
+        lambda data: zstandard.ZstdCompressor().compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+if lz4_frame:
+    COMPRESSORS["lz4"] = (3, lz4_frame.compress, lz4_frame.decompress)
+
+_DECODERS = {serializer_id: decode for serializer_id, _, decode in SERIALIZERS.values()}
+_DECOMPRESSORS = {compressor_id: decompress for compressor_id, _, decompress in COMPRESSORS.values()}
+
+
+class CacheCodec:
+    """
+    キャッシュ値のエンコード・デコード
+
+    min_compress_bytes 以上の値だけを圧縮し、圧縮しても小さくならない値はそのまま保存する。
+    指定したシリアライザ・圧縮方式がインストールされていなければ json / none で続行する。
+    """
+
+    def __init__(self, serializer: str = "json", compression: str = "none", min_compress_bytes: int = 2048):
+        if serializer not in SERIALIZERS:
+            print(f"Cache serializer '{serializer}' is not available, falling back to json")
+            serializer = "json"
+        if compression not in COMPRESSORS:
+            print(f"Cache compression '{compression}' is not available, falling back to none")
+            compression = "none"
+
+        self.serializer = serializer
+        self.compression = compression
+        self.min_compress_bytes = min_compress_bytes
+        self._serializer_id, self._encode, _ = SERIALIZERS[serializer]
+        self._compressor_id, self._compress, _ = COMPRESSORS[compression]
+        self.encoded = 0
+        self.compressed = 0
+        self.decoded = 0
+        self.legacy_decoded = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def encode(self, value: Any) -> bytes:
+        """値を保存形式のバイト列に変換"""
+        body = self._encode(value)
+        self.encoded += 1
+        self.raw_bytes += len(body)
+
+        compressor_id = 0
+        if self._compressor_id and len(body) >= self.min_compress_bytes:
+            packed = self._compress(body)
+            if len(packed) < len(body):
+                body = packed
+                compressor_id = self._compressor_id
+                self.compressed += 1
+
+        data = MAGIC + bytes((FORMAT_VERSION, self._serializer_id, compressor_id)) + body
+        self.stored_bytes += len(data)
+        return data
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """
+        保存形式のバイト列から値を復元
+
+        Raises:
+            ValueError: 未対応の形式バージョン・シリアライザ・圧縮方式の場合
+        """
+        self.decoded += 1
+        if isinstance(data, str) or not data.startswith(MAGIC):
+            # コーデック導入前のJSON文字列
+            self.legacy_decoded += 1
+            return json.loads(data)
+
+        version, serializer_id, compressor_id = data[len(MAGIC):HEADER_SIZE]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported cache format version: {version}")
+        decode = _DECODERS.get(serializer_id)
+        decompress = _DECOMPRESSORS.get(compressor_id)
+        if decode is None or decompress is None:
+            raise ValueError(f"Unsupported cache codec: serializer={serializer_id}, compression={compressor_id}")
+
+        body = data[HEADER_SIZE:]
+        return decode(decompress(body) if compressor_id else body)
+
+    def get_stats(self) -> dict:
+        """使用中のコーデックと、エンコード・デコードの件数、圧縮率を取得"""
+        return {
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "min_compress_bytes": self.min_compress_bytes,
+            "encoded": self.encoded,
+            "compressed": self.compressed,
+            "decoded": self.decoded,
+            "legacy_decoded": self.legacy_decoded,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "compression_ratio": (self.stored_bytes / self.raw_bytes) if self.raw_bytes else 1.0,
+        }
+
+
+# グローバルインスタンス
+cache_codec = CacheCodec(
+    serializer=settings.CACHE_SERIALIZER,
+    compression=settings.CACHE_COMPRESSION,
+    min_compress_bytes=settings.CACHE_COMPRESSION_MIN_BYTES
+)
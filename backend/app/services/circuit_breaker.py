@@ -0,0 +1,132 @@
+import time
+from typing import Optional
+from app.core.config import settings
+from app.services.rate_limiter import UpstreamUnavailableError
+
+# サーキットの状態（closed: 通常 / open: 呼び出しを止める / half_open: 復旧を試す）
+STATES = ("closed", "open", "half_open")
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """上流APIの障害でサーキットが開いており呼び出さなかった"""
+
+
+class CircuitBreaker:
+    """
+    上流API呼び出しのサーキットブレーカー
+
+    failure_threshold 回続けて失敗（5xx・通信エラー・タイムアウト）すると開き、
+    recovery_timeout 秒の間は上流APIを呼ばずに CircuitOpenError を返す。
+    その後は半開状態になり、最大 half_open_max_calls 件の試行が成功すれば閉じ、
+    失敗すれば再び開く。状態はプロセスごとに持つ。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_timeout: float,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0  # 半開状態で実行中の試行数
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self.last_failure: Optional[float] = None
+        self.last_state_change = time.time()
+
+    def retry_after(self) -> float:
+        """半開状態になるまでの秒数"""
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def before_call(self) -> bool:
+        """
+        呼び出してよいか判定（開いていればCircuitOpenError）
+
+        Returns:
+            半開状態の試行ならTrue（結果はrecord_*・releaseに同じ値を渡す）
+        """
+        if self.state == "open":
+            if self.retry_after() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit for {self.name} is open", retry_after=self.retry_after())
+            self._transition("half_open")
+
+        if self.state == "half_open":
+            if self._probes >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(
+                    f"Circuit for {self.name} is half-open", retry_after=self.recovery_timeout
+                )
+            self._probes += 1
+            return True
+        return False
+
+    def record_success(self, probe: bool = False):
+        """上流APIが応答した（4xxを含む）"""
+        self.successes += 1
+        self.consecutive_failures = 0
+        if probe:
+            self._probes = max(0, self._probes - 1)
+        if self.state == "half_open" and probe:
+            self._transition("closed")
+
+    def record_failure(self, probe: bool = False):
+        """上流APIが応答しなかった（5xx・通信エラー・タイムアウト）"""
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = time.time()
+        if probe:
+            self._probes = max(0, self._probes - 1)
+        if (self.state == "half_open" and probe) or (
+            self.state == "closed" and self.consecutive_failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            self._transition("open")
+
+    def release(self, probe: bool = False):
+        """上流APIの状態と関係なく中断した呼び出し（予算待ちのタイムアウト・キャンセル）"""
+        if probe:
+            self._probes = max(0, self._probes - 1)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            print(f"Circuit breaker {self.name}: {self.state} -> {state}")
+            self.state = state
+            self.last_state_change = time.time()
+            self._probes = 0
+
+    def get_stats(self) -> dict:
+        """状態と成功・失敗・拒否の件数を取得"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "retry_after": self.retry_after() if self.state == "open" else 0.0,
+            "half_open_in_flight": self._probes,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "opened": self.opened,
+            "last_failure": self.last_failure,
+            "last_state_change": self.last_state_change,
+        }
+
+
+# グローバルインスタンス
+coingecko_breaker = CircuitBreaker(
+    "coingecko",
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+    half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS
+)
@@ -0,0 +1,208 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Callable, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+# 共有データの一時ファイルの置き場所（Linuxでは共有メモリ上）
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# ワーカーが保持する共有データの件数（同時に実行中のスイープ等の数）
+SHARED_CACHE_SIZE = 4
+
+# ワーカープロセス内で読み込み済みの共有データ（キー → データ）
+_shared_cache: "OrderedDict[str, Any]" = OrderedDict()
+
+
+class SharedData(NamedTuple):
+    """ComputePool.shareで登録した共有データのハンドル"""
+    key: str
+    path: Optional[str] = None  # プロセスプール: データをpickleした一時ファイル
+    data: Any = None  # スレッドプール: データへの参照
+
+
+def load_shared(shared: SharedData) -> Any:
+    """ワーカー側で共有データを取得（プロセスごとに最初の1回だけファイルから読み込む）"""
+    if shared.path is None:
+        return shared.data
+    data = _shared_cache.get(shared.key)
+    if data is None:
+        with open(shared.path, "rb") as f:
+            data = pickle.load(f)
+        _shared_cache[shared.key] = data
+        while len(_shared_cache) > SHARED_CACHE_SIZE:
+            _shared_cache.popitem(last=False)
+    else:
+        _shared_cache.move_to_end(shared.key)
+    return data
+
+
+def _write_shared(data: Any) -> Tuple[str, int]:
+    """共有データをpickleして一時ファイルに書き込み、(パス, バイト数) を返す"""
+    fd, path = tempfile.mkstemp(prefix="compute-shared-", suffix=".pkl", dir=SHARED_DIR)
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path, f.tell()
+
+
+def _timed_call(func: Callable, args: tuple) -> Tuple[Any, float]:
+    """ワーカー側で関数を実行し、(結果, 実行時間) を返す"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def _call_with_shared(func: Callable, shared: SharedData, args: tuple) -> Any:
+    """共有データ（タプル）を先頭の引数に展開して関数を実行"""
+    return func(*load_shared(shared), *args)
+
+
+class ComputePool:
+    """
+    CPU負荷の高い処理（バックテストのシミュレーション等）の実行プール
+
+    イベントループをブロックしないよう、処理をプロセスプール（既定）または
+    スレッドプールで実行する。プロセスプールに渡す関数は副作用のない
+    モジュールレベル関数とし、引数・戻り値は数値配列や辞書などの軽量な値にする。
+    多数の処理で同じ大きな引数（価格列・指標系列）を使う場合は share と run_shared で
+    ワーカーへ1回だけ渡す。
+    """
+
+    def __init__(self, kind: str = "process", workers: int = 0):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._peak_queued = 0
+        self._total_exec_time = 0.0
+        self._max_exec_time = 0.0
+        self._total_wait_time = 0.0
+        self._shared_payloads = 0
+        self._shared_bytes = 0
+
+    def start(self):
+        """プールを作成"""
+        if self._executor:
+            return
+
+        if self.kind == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="compute"
+            )
+        else:
+            # fork はイベントループやコネクションの状態を引き継ぐため spawn を使う
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self):
+        """プールを停止（実行中の処理は完了を待ち、待機中の処理は取り消す）"""
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def pending(self) -> int:
+        """投入済みで未完了の処理数"""
+        return self._submitted - self._completed - self._failed
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        関数をプールで実行して結果を待つ
+
+        Args:
+            func: 実行する関数（プロセスプールではpickle可能なモジュールレベル関数）
+            *args: 関数の引数
+
+        Returns:
+            関数の戻り値
+        """
+        if not self._executor:
+            # ライフスパン外（スクリプト等）から呼ばれた場合は遅延作成
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        self._submitted += 1
+        self._peak_queued = max(self._peak_queued, self.pending - self.workers)
+        started = time.perf_counter()
+        try:
+            result, exec_time = await loop.run_in_executor(self._executor, _timed_call, func, args)
+        except BrokenProcessPool as e:
+            # ワーカーが異常終了した場合は次回の呼び出しでプールを作り直す
+            print(f"Compute pool broken, restarting: {e}")
+            self._failed += 1
+            self._executor = None
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+
+        self._completed += 1
+        self._total_exec_time += exec_time
+        self._max_exec_time = max(self._max_exec_time, exec_time)
+        self._total_wait_time += max(0.0, time.perf_counter() - started - exec_time)
+        return result
+
+    @asynccontextmanager
+    async def share(self, data: tuple) -> AsyncIterator[SharedData]:
+        """
+        複数の処理で使う引数を登録し、run_sharedに渡すハンドルを返す
+
+        プロセスプールではデータを1回だけpickleして一時ファイル（共有メモリ上）に書き、
+        各ワーカーは最初に使うときに1回だけ読み込んで保持する。処理ごとに再送しない。
+        スレッドプールでは参照をそのまま渡す。ブロックを抜けると一時ファイルを削除する。
+
+        Args:
+            data: 関数の先頭に展開して渡す引数のタプル
+        """
+        if self.kind == "thread":
+            yield SharedData(uuid.uuid4().hex, data=data)
+            return
+
+        path, size = await asyncio.to_thread(_write_shared, data)
+        self._shared_payloads += 1
+        self._shared_bytes += size
+        try:
+            yield SharedData(uuid.uuid4().hex, path=path)
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+
+    async def run_shared(self, func: Callable, shared: SharedData, *args) -> Any:
+        """shareで登録した引数を先頭に付けて関数をプールで実行"""
+        return await self.run(_call_with_shared, func, shared, args)
+
+    def get_stats(self) -> dict:
+        """キューの深さと実行時間を取得"""
+        pending = self.pending
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "running": min(pending, self.workers),
+            "queued": max(0, pending - self.workers),
+            "peak_queued": max(0, self._peak_queued),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_exec_ms": (self._total_exec_time / self._completed * 1000) if self._completed else 0.0,
+            "max_exec_ms": self._max_exec_time * 1000,
+            "avg_wait_ms": (self._total_wait_time / self._completed * 1000) if self._completed else 0.0,
+            "shared_payloads": self._shared_payloads,
+            "shared_bytes": self._shared_bytes,
+        }
+
+
+# グローバルインスタンス
+compute_pool = ComputePool(kind=settings.COMPUTE_POOL_KIND, workers=settings.COMPUTE_POOL_WORKERS)
@@ -1,15 +1,33 @@
 import httpx
-from typing import Optional, List
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Dict, Any, Awaitable, Callable, Sequence, Tuple
 from datetime import datetime
+from app.core.config import settings
 from app.schemas.crypto import CryptoPriceResponse, ChartDataResponse, ChartDataPoint
+from app.services.circuit_breaker import coingecko_breaker
+from app.services.http_client import http_client_service
+from app.services.price_archive import price_archive
+from app.services.price_history_service import price_history_service
+from app.services.rate_limiter import (
+    UpstreamRateLimitError,
+    UpstreamUnavailableError,
+    coingecko_limiter,
+    request_priority
+)
 from app.services.redis_service import redis_service
+from app.services.single_flight import single_flight
 
 
 class CryptoService:
     """仮想通貨価格取得サービス"""
 
     COINGECKO_API_BASE = "https://api.coingecko.com/api/v3"
-    CACHE_EXPIRE_SECONDS = 60  # 1分間キャッシュ
+
+    # 最後に取得できたデータ（上流APIの障害中に古い値として返す）
+    LAST_KNOWN_GOOD_PREFIX = "crypto:lkg:"
 
     # 主要な仮想通貨のマッピング
     COIN_ID_MAP = {
@@ -25,6 +43,250 @@ class CryptoService:
         "MATIC": "matic-network",
     }
 
+    # 通貨名（簡易的に設定、本来は別APIで取得すべき）
+    COIN_NAME_MAP = {
+        "BTC": "Bitcoin",
+        "ETH": "Ethereum",
+        "BNB": "Binance Coin",
+        "XRP": "Ripple",
+        "ADA": "Cardano",
+        "SOL": "Solana",
+        "DOT": "Polkadot",
+        "DOGE": "Dogecoin",
+        "AVAX": "Avalanche",
+        "MATIC": "Polygon",
+    }
+
+    def __init__(self):
+        self._background_tasks = set()
+        self.stale_hits = 0
+        self.background_refreshes = 0
+        self.last_known_good_hits = 0
+
+    def _wrap(self, data: Any) -> dict:
+        """キャッシュ保存用に取得時刻を付与"""
+        return {"data": data, "cached_at": time.time()}
+
+    def _unwrap(self, cached: Any) -> Tuple[Optional[Any], float]:
+        """キャッシュ値から (データ, 経過秒数) を取り出す"""
+        if not cached:
+            return None, 0.0
+        if isinstance(cached, dict) and "cached_at" in cached and "data" in cached:
+            return cached["data"], time.time() - cached["cached_at"]
+        # 取得時刻のない旧形式は期限切れ扱い（返しつつ再取得する）
+        return cached, float("inf")
+
+    def _annotate(self, data: Any, age: float, is_stale: bool = False) -> Any:
+        """キャッシュから返す値にデータの経過秒数と古い値かどうかを付与"""
+        if isinstance(data, list):
+            return [self._annotate(item, age, is_stale) for item in data]
+        return {
+            **data,
+            "is_stale": is_stale,
+            "data_age_seconds": round(age, 3) if age != float("inf") else None,
+        }
+
+    def _last_known_good_key(self, cache_key: str) -> str:
+        return f"{self.LAST_KNOWN_GOOD_PREFIX}{cache_key}"
+
+    async def _get_last_known_good(self, cache_key: str) -> Optional[Any]:
+        """最後に取得できたデータを古い値として取得"""
+        data, age = self._unwrap(await redis_service.get(self._last_known_good_key(cache_key)))
+        if not data:
+            return None
+        self.last_known_good_hits += 1
+        return self._annotate(data, age, is_stale=True)
+
+    def _run_in_background(self, coro: Awaitable):
+        """バックグラウンドで再取得を実行（上流APIはbackground優先度で呼び出す）"""
+        async def run():
+            request_priority.set("background")
+            try:
+                await coro
+            except Exception as e:
+                print(f"Background refresh error: {e}")
+
+        self.background_refreshes += 1
+        task = asyncio.ensure_future(run())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _request(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> httpx.Response:
+        """
+        CoinGecko APIへのGETリクエスト（レート制限・リトライ付き）
+
+        呼び出し前にサーキットブレーカーの状態を確認し、共有のトークンバケットから予算を取得する。
+        429・5xx・通信エラーは指数バックオフ（ジッター付き）でリトライし、
+        Retry-Afterが返された場合はその時間だけ全呼び出しを止めてから再試行する。
+        5xx・通信エラー・タイムアウトはサーキットブレーカーの失敗として数える。
+
+        Raises:
+            UpstreamRateLimitError: リトライしてもレート制限が解除されない場合
+            CircuitOpenError: 障害が続いてサーキットが開いている場合（上流APIを待たずに失敗）
+        """
+        for attempt in range(settings.COINGECKO_MAX_RETRIES + 1):
+            last_attempt = attempt == settings.COINGECKO_MAX_RETRIES
+            probe = coingecko_breaker.before_call()
+            try:
+                await coingecko_limiter.acquire(timeout=settings.COINGECKO_RATE_LIMIT_MAX_WAIT)
+                response = await http_client_service.get(url, params=params, timeout=timeout)
+            except httpx.TransportError:
+                coingecko_breaker.record_failure(probe)
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt))
+                continue
+            except BaseException:
+                # 予算待ちのタイムアウト・キャンセルは上流APIの状態として数えない
+                coingecko_breaker.release(probe)
+                raise
+
+            if response.status_code >= 500:
+                coingecko_breaker.record_failure(probe)
+                if not last_attempt:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    continue
+                return response
+
+            coingecko_breaker.record_success(probe)
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                if retry_after is not None:
+                    await coingecko_limiter.block(retry_after)
+                if last_attempt or (retry_after or 0) > settings.COINGECKO_RETRY_MAX_DELAY:
+                    raise UpstreamRateLimitError("CoinGecko rate limit exceeded", retry_after=retry_after)
+                # Retry-Afterがあれば予算側で待つ
+                if retry_after is None:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                continue
+
+            return response
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """指数バックオフの待ち時間（フルジッター）"""
+        return random.uniform(
+            0, min(settings.COINGECKO_RETRY_MAX_DELAY, settings.COINGECKO_RETRY_BASE_DELAY * (2 ** attempt))
+        )
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        """Retry-Afterヘッダー（秒数またはHTTP日付）を秒数に変換"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def get_cache_stats(self) -> dict:
+        """stale-while-revalidateと障害時の古い値の返却の統計を取得"""
+        return {
+            "stale_hits": self.stale_hits,
+            "background_refreshes": self.background_refreshes,
+            "background_in_flight": len(self._background_tasks),
+            "last_known_good_hits": self.last_known_good_hits,
+        }
+
+    def get_coin_name(self, symbol: str) -> str:
+        """通貨名を取得"""
+        return self.COIN_NAME_MAP.get(symbol.upper(), symbol.upper())
+
+    def _build_price_response(self, symbol: str, coin_data: dict) -> CryptoPriceResponse:
+        """CoinGecko /coins/markets の1要素をレスポンスに変換"""
+        return CryptoPriceResponse(
+            symbol=symbol,
+            name=coin_data.get("name", ""),
+            current_price=coin_data.get("current_price", 0.0),
+            price_change_24h=coin_data.get("price_change_24h"),
+            price_change_percentage_24h=coin_data.get("price_change_percentage_24h"),
+            market_cap=coin_data.get("market_cap"),
+            total_volume=coin_data.get("total_volume"),
+            high_24h=coin_data.get("high_24h"),
+            low_24h=coin_data.get("low_24h"),
+            last_updated=datetime.fromisoformat(
+                coin_data.get("last_updated", datetime.now().isoformat()).replace("Z", "+00:00")
+            )
+        )
+
+    async def _get_cached(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[Optional[Any]]],
+        soft_ttl: int,
+        hard_ttl: int
+    ) -> Optional[Any]:
+        """
+        stale-while-revalidate方式でキャッシュから値を取得
+
+        - soft_ttl以内: キャッシュをそのまま返す
+        - soft_ttl〜hard_ttl: 古い値を即座に返し、バックグラウンドで再取得
+        - hard_ttl超過（キャッシュなし）: 上流APIから同期的に取得
+        - 上流APIから取得できない（障害・サーキットが開いている）: 最後に取得できたデータを
+          is_stale=True で返す
+
+        上流APIからの取得はsingle-flightでキー単位に1回にまとめる。
+        キャッシュから返す値には data_age_seconds（取得からの経過秒数）を付与し、
+        サーキットが閉じていない間にsoft TTLを過ぎた値も is_stale=True とする。
+
+        Args:
+            cache_key: キャッシュキー
+            fetch: 上流APIから取得する処理（失敗時はNone）
+            soft_ttl: 再取得を始めるまでの秒数
+            hard_ttl: キャッシュを保持する秒数
+
+        Returns:
+            キャッシュまたは上流APIから取得した値
+        """
+        data, age = self._unwrap(await redis_service.get(cache_key))
+        if data:
+            single_flight.record_hit()
+            if age >= soft_ttl:
+                self.stale_hits += 1
+                self._run_in_background(self._refresh_cached(cache_key, fetch, hard_ttl))
+            return self._annotate(data, age, is_stale=age >= soft_ttl and coingecko_breaker.state != "closed")
+
+        error = None
+        try:
+            data = await self._refresh_cached(cache_key, fetch, hard_ttl)
+        except UpstreamUnavailableError as e:
+            error = e
+        if data:
+            return data
+
+        # 上流APIの障害中は最後に取得できたデータを返す
+        data = await self._get_last_known_good(cache_key)
+        if data:
+            return data
+        if error:
+            raise error
+        return None
+
+    async def _refresh_cached(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[Optional[Any]]],
+        hard_ttl: int
+    ) -> Optional[Any]:
+        """上流APIから取得してキャッシュを更新（single-flightでキー単位に1回にまとめる）"""
+        async def load() -> Optional[Any]:
+            data = await fetch()
+            if data:
+                wrapped = self._wrap(data)
+                async with redis_service.pipeline() as pipe:
+                    pipe.set(cache_key, wrapped, expire=hard_ttl)
+                    pipe.set(self._last_known_good_key(cache_key), wrapped, expire=settings.LAST_KNOWN_GOOD_TTL)
+            return data
+
+        async def read_cache() -> Optional[Any]:
+            data, _ = self._unwrap(await redis_service.get(cache_key))
+            return data
+
+        return await single_flight.do(cache_key, load, read_cache)
+
     async def get_price(self, symbol: str) -> Optional[CryptoPriceResponse]:
         """
         指定された通貨の価格を取得
@@ -35,61 +297,43 @@ class CryptoService:
         Returns:
             CryptoPriceResponse or None
         """
-        # キャッシュから取得を試みる
-        cache_key = f"crypto:price:{symbol.upper()}"
-        cached_data = await redis_service.get(cache_key)
-
-        if cached_data:
-            return CryptoPriceResponse(**cached_data)
-
-        # CoinGecko APIから取得
-        coin_id = self.COIN_ID_MAP.get(symbol.upper())
-        if not coin_id:
+        symbol = symbol.upper()
+        if symbol not in self.COIN_ID_MAP:
             return None
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.COINGECKO_API_BASE}/coins/markets",
-                    params={
-                        "vs_currency": "usd",
-                        "ids": coin_id,
-                        "order": "market_cap_desc",
-                        "sparkline": "false"
-                    },
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if not data or len(data) == 0:
-                    return None
-
-                coin_data = data[0]
-                price_response = CryptoPriceResponse(
-                    symbol=symbol.upper(),
-                    name=coin_data.get("name", ""),
-                    current_price=coin_data.get("current_price", 0.0),
-                    price_change_24h=coin_data.get("price_change_24h"),
-                    price_change_percentage_24h=coin_data.get("price_change_percentage_24h"),
-                    market_cap=coin_data.get("market_cap"),
-                    total_volume=coin_data.get("total_volume"),
-                    high_24h=coin_data.get("high_24h"),
-                    low_24h=coin_data.get("low_24h"),
-                    last_updated=datetime.fromisoformat(
-                        coin_data.get("last_updated", datetime.now().isoformat()).replace("Z", "+00:00")
-                    )
-                )
-
-                # キャッシュに保存
-                await redis_service.set(
-                    cache_key,
-                    price_response.model_dump(),
-                    expire=self.CACHE_EXPIRE_SECONDS
-                )
+        data = await self._get_cached(
+            f"crypto:price:{symbol}",
+            lambda: self._fetch_price(symbol),
+            settings.PRICE_CACHE_SOFT_TTL,
+            settings.PRICE_CACHE_HARD_TTL
+        )
+        return CryptoPriceResponse(**data) if data else None
 
-                return price_response
+    async def _fetch_price(self, symbol: str) -> Optional[dict]:
+        """CoinGecko APIから価格を取得"""
+        coin_id = self.COIN_ID_MAP[symbol]
 
+        try:
+            response = await self._request(
+                f"{self.COINGECKO_API_BASE}/coins/markets",
+                params={
+                    "vs_currency": "usd",
+                    "ids": coin_id,
+                    "order": "market_cap_desc",
+                    "sparkline": "false"
+                },
+                timeout=settings.COINGECKO_MARKETS_TIMEOUT
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            if not data or len(data) == 0:
+                return None
+
+            return self._build_price_response(symbol, data[0]).model_dump()
+
+        except UpstreamUnavailableError:
+            raise
         except httpx.HTTPError as e:
             print(f"CoinGecko API error: {e}")
             return None
@@ -107,82 +351,209 @@ class CryptoService:
         Returns:
             CryptoPriceResponseのリスト
         """
-        results = []
-        for symbol in symbols:
-            price = await self.get_price(symbol)
-            if price:
-                results.append(price)
+        prices = await self.get_prices_map(symbols)
+        return [prices[symbol.upper()] for symbol in symbols if symbol.upper() in prices]
+
+    async def get_prices_map(self, symbols: List[str]) -> Dict[str, CryptoPriceResponse]:
+        """
+        複数の通貨の価格を一括取得
+
+        Redisは1回のMGET、キャッシュミス分はCoinGeckoへの1回のリクエスト
+        （idsをカンマ区切りで指定）、書き戻しは1回のパイプラインで行う。
+        上流APIからの取得はsingle-flightで通貨単位にまとめ、他のリクエストが取得中の通貨は
+        その結果を待つ。
+        soft TTLを過ぎた値は返しつつバックグラウンドで再取得する。
+        上流APIから取得できなかった通貨は最後に取得できたデータを is_stale=True で返す。
+
+        Args:
+            symbols: 通貨シンボルのリスト
+
+        Returns:
+            シンボル（大文字）→ CryptoPriceResponse の辞書（取得できなかった通貨は含まない）
+        """
+        unique_symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        if not unique_symbols:
+            return {}
+
+        # キャッシュから一括取得
+        cached_values = await redis_service.mget(
+            [f"crypto:price:{symbol}" for symbol in unique_symbols]
+        )
+
+        results = {}
+        missing = []
+        stale = []
+        for symbol, cached in zip(unique_symbols, cached_values):
+            cached_data, age = self._unwrap(cached)
+            if cached_data:
+                single_flight.record_hit()
+                is_stale = age >= settings.PRICE_CACHE_SOFT_TTL
+                results[symbol] = CryptoPriceResponse(
+                    **self._annotate(cached_data, age, is_stale=is_stale and coingecko_breaker.state != "closed")
+                )
+                if is_stale:
+                    stale.append(symbol)
+            elif symbol in self.COIN_ID_MAP:
+                missing.append(symbol)
+
+        # 古い値は返しつつバックグラウンドでまとめて再取得（再取得中の通貨は重ねて取得しない）
+        if stale:
+            self.stale_hits += len(stale)
+            self._run_in_background(self._fetch_prices_coalesced(stale))
+
+        if missing:
+            error = None
+            try:
+                results.update(await self._fetch_prices_coalesced(missing))
+            except UpstreamUnavailableError as e:
+                error = e
+
+            # 上流APIの障害中は最後に取得できたデータを返す
+            unresolved = [symbol for symbol in missing if symbol not in results]
+            if unresolved:
+                fallback_values = await redis_service.mget(
+                    [self._last_known_good_key(f"crypto:price:{symbol}") for symbol in unresolved]
+                )
+                for symbol, cached in zip(unresolved, fallback_values):
+                    cached_data, age = self._unwrap(cached)
+                    if cached_data:
+                        self.last_known_good_hits += 1
+                        results[symbol] = CryptoPriceResponse(**self._annotate(cached_data, age, is_stale=True))
+            if error and not results:
+                raise error
+
         return results
 
-    async def get_top_coins(self, limit: int = 10) -> List[CryptoPriceResponse]:
+    async def refresh_prices(self, symbols: List[str]) -> Dict[str, CryptoPriceResponse]:
         """
-        時価総額トップの通貨を取得
+        複数の通貨の価格をキャッシュの状態に関係なく再取得（事前ウォームアップ用）
+
+        ユーザーのリクエストと同じsingle-flightを通し、取得中の通貨はその結果を待つ。
 
         Args:
-            limit: 取得する通貨数
+            symbols: 通貨シンボルのリスト
 
         Returns:
-            CryptoPriceResponseのリスト
+            シンボル（大文字）→ CryptoPriceResponse の辞書
+        """
+        targets = [symbol for symbol in dict.fromkeys(s.upper() for s in symbols) if symbol in self.COIN_ID_MAP]
+        if not targets:
+            return {}
+        return await self._fetch_prices_coalesced(targets)
+
+    async def _fetch_prices_coalesced(self, symbols: List[str]) -> Dict[str, CryptoPriceResponse]:
         """
-        cache_key = f"crypto:top:{limit}"
-        cached_data = await redis_service.get(cache_key)
+        複数通貨の価格を上流APIから取得（single-flightで通貨単位に1回にまとめる）
+
+        取得中の通貨（get_priceの取得を含む）はその結果を待ち、残りだけを1回のリクエストで取得する。
+        """
+        cache_keys = {f"crypto:price:{symbol}": symbol for symbol in symbols}
+
+        async def load(keys: List[str]) -> Dict[str, dict]:
+            prices = await self._fetch_prices_batch([cache_keys[key] for key in keys])
+            return {f"crypto:price:{symbol}": price.model_dump() for symbol, price in prices.items()}
 
-        if cached_data:
-            return [CryptoPriceResponse(**item) for item in cached_data]
+        async def read_cache(key: str) -> Optional[Any]:
+            data, _ = self._unwrap(await redis_service.get(key))
+            return data
+
+        values = await single_flight.do_many(list(cache_keys), load, read_cache)
+        return {cache_keys[key]: CryptoPriceResponse(**data) for key, data in values.items() if data}
+
+    async def _fetch_prices_batch(self, symbols: List[str]) -> Dict[str, CryptoPriceResponse]:
+        """複数通貨の価格をCoinGecko APIから1回で取得し、キャッシュに一括保存"""
+        coin_ids = {self.COIN_ID_MAP[symbol]: symbol for symbol in symbols}
+        results = {}
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.COINGECKO_API_BASE}/coins/markets",
-                    params={
-                        "vs_currency": "usd",
-                        "order": "market_cap_desc",
-                        "per_page": limit,
-                        "page": 1,
-                        "sparkline": "false"
-                    },
-                    timeout=10.0
+            response = await self._request(
+                f"{self.COINGECKO_API_BASE}/coins/markets",
+                params={
+                    "vs_currency": "usd",
+                    "ids": ",".join(coin_ids),
+                    "order": "market_cap_desc",
+                    "per_page": len(coin_ids),
+                    "page": 1,
+                    "sparkline": "false"
+                },
+                timeout=settings.COINGECKO_MARKETS_TIMEOUT
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            fetched = {}
+            for coin_data in data or []:
+                symbol = coin_ids.get(coin_data.get("id"))
+                if symbol:
+                    price_response = self._build_price_response(symbol, coin_data)
+                    results[symbol] = price_response
+                    fetched[f"crypto:price:{symbol}"] = self._wrap(price_response.model_dump())
+
+            # キャッシュと最後に取得できたデータを1往復で保存
+            async with redis_service.pipeline() as pipe:
+                pipe.mset_with_ttl(fetched, expire=settings.PRICE_CACHE_HARD_TTL)
+                pipe.mset_with_ttl(
+                    {self._last_known_good_key(key): value for key, value in fetched.items()},
+                    expire=settings.LAST_KNOWN_GOOD_TTL
                 )
-                response.raise_for_status()
-                data = response.json()
-
-                results = []
-                for coin_data in data:
-                    # シンボルを探す
-                    symbol = coin_data.get("symbol", "").upper()
-
-                    price_response = CryptoPriceResponse(
-                        symbol=symbol,
-                        name=coin_data.get("name", ""),
-                        current_price=coin_data.get("current_price", 0.0),
-                        price_change_24h=coin_data.get("price_change_24h"),
-                        price_change_percentage_24h=coin_data.get("price_change_percentage_24h"),
-                        market_cap=coin_data.get("market_cap"),
-                        total_volume=coin_data.get("total_volume"),
-                        high_24h=coin_data.get("high_24h"),
-                        low_24h=coin_data.get("low_24h"),
-                        last_updated=datetime.fromisoformat(
-                            coin_data.get("last_updated", datetime.now().isoformat()).replace("Z", "+00:00")
-                        )
-                    )
-                    results.append(price_response)
-
-                # キャッシュに保存
-                await redis_service.set(
-                    cache_key,
-                    [r.model_dump() for r in results],
-                    expire=self.CACHE_EXPIRE_SECONDS
-                )
-
-                return results
 
+        except UpstreamUnavailableError:
+            raise
         except httpx.HTTPError as e:
             print(f"CoinGecko API error: {e}")
-            return []
         except Exception as e:
             print(f"Unexpected error: {e}")
-            return []
 
+        return results
+
+    async def get_top_coins(self, limit: int = 10) -> List[CryptoPriceResponse]:
+        """
+        時価総額トップの通貨を取得
+
+        Args:
+            limit: 取得する通貨数
+
+        Returns:
+            CryptoPriceResponseのリスト
+        """
+        data = await self._get_cached(
+            f"crypto:top:{limit}",
+            lambda: self._fetch_top_coins(limit),
+            settings.PRICE_CACHE_SOFT_TTL,
+            settings.PRICE_CACHE_HARD_TTL
+        )
+        return [CryptoPriceResponse(**item) for item in data or []]
+
+    async def _fetch_top_coins(self, limit: int) -> Optional[List[dict]]:
+        """CoinGecko APIから時価総額トップの通貨を取得"""
+        try:
+            response = await self._request(
+                f"{self.COINGECKO_API_BASE}/coins/markets",
+                params={
+                    "vs_currency": "usd",
+                    "order": "market_cap_desc",
+                    "per_page": limit,
+                    "page": 1,
+                    "sparkline": "false"
+                },
+                timeout=settings.COINGECKO_MARKETS_TIMEOUT
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            return [
+                self._build_price_response(coin_data.get("symbol", "").upper(), coin_data).model_dump()
+                for coin_data in data
+            ]
+
+        except UpstreamUnavailableError:
+            raise
+        except httpx.HTTPError as e:
+            print(f"CoinGecko API error: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            return None
 
     async def get_chart_data(
         self,
@@ -199,80 +570,149 @@ class CryptoService:
         Returns:
             ChartDataResponse or None
         """
-        # キャッシュから取得を試みる
-        cache_key = f"crypto:chart:{symbol.upper()}:{days}"
-        cached_data = await redis_service.get(cache_key)
+        symbol = symbol.upper()
+        if symbol not in self.COIN_ID_MAP:
+            return None
 
-        if cached_data:
-            return ChartDataResponse(**cached_data)
+        data = await self._get_cached(
+            f"crypto:chart:{symbol}:{days}",
+            lambda: self._fetch_chart_data(symbol, days),
+            settings.CHART_CACHE_SOFT_TTL,
+            settings.CHART_CACHE_HARD_TTL
+        )
+        return ChartDataResponse(**data) if data else None
 
-        # CoinGecko APIから取得
-        coin_id = self.COIN_ID_MAP.get(symbol.upper())
-        if not coin_id:
+    async def refresh_chart_data(self, symbol: str, days: int = 7) -> Optional[ChartDataResponse]:
+        """
+        チャートデータをキャッシュの状態に関係なく再取得（事前ウォームアップ用）
+
+        Args:
+            symbol: 通貨シンボル（例: BTC, ETH）
+            days: 取得する日数
+
+        Returns:
+            ChartDataResponse or None
+        """
+        symbol = symbol.upper()
+        if symbol not in self.COIN_ID_MAP:
             return None
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.COINGECKO_API_BASE}/coins/{coin_id}/market_chart",
-                    params={
-                        "vs_currency": "usd",
-                        "days": days,
-                        "interval": "daily" if days > 1 else "hourly"
-                    },
-                    timeout=15.0
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if not data or "prices" not in data:
-                    return None
-
-                # 価格データを変換
-                price_points = [
-                    ChartDataPoint(
-                        timestamp=int(price[0]),
-                        price=float(price[1])
-                    )
-                    for price in data["prices"]
-                ]
-
-                # 通貨名を取得
-                coin_name = symbol.upper()
-                for coin_map_symbol, coin_map_id in self.COIN_ID_MAP.items():
-                    if coin_map_id == coin_id:
-                        # 簡易的に名前を設定（本来は別APIで取得すべき）
-                        name_map = {
-                            "BTC": "Bitcoin",
-                            "ETH": "Ethereum",
-                            "BNB": "Binance Coin",
-                            "XRP": "Ripple",
-                            "ADA": "Cardano",
-                            "SOL": "Solana",
-                            "DOT": "Polkadot",
-                            "DOGE": "Dogecoin",
-                            "AVAX": "Avalanche",
-                            "MATIC": "Polygon",
-                        }
-                        coin_name = name_map.get(coin_map_symbol, coin_map_symbol)
-                        break
-
-                chart_response = ChartDataResponse(
-                    symbol=symbol.upper(),
-                    name=coin_name,
-                    prices=price_points,
-                    total_points=len(price_points)
-                )
+        data = await self._refresh_cached(
+            f"crypto:chart:{symbol}:{days}",
+            lambda: self._fetch_chart_data(symbol, days),
+            settings.CHART_CACHE_HARD_TTL
+        )
+        return ChartDataResponse(**data) if data else None
 
-                # キャッシュに保存（チャートデータは5分間キャッシュ）
-                await redis_service.set(
-                    cache_key,
-                    chart_response.model_dump(),
-                    expire=300  # 5分
+    async def _fetch_chart_data(self, symbol: str, days: int) -> Optional[dict]:
+        """
+        チャートデータを取得
+
+        価格履歴ストアが有効なら差分同期した履歴から切り出し、
+        ストアが使えない場合はCoinGecko APIから直接取得する。
+        """
+        points = None
+        if settings.PRICE_HISTORY_ENABLED:
+            try:
+                points = await price_history_service.get_history(symbol, days, self._fetch_market_chart)
+            except UpstreamUnavailableError:
+                raise
+            except Exception as e:
+                print(f"Price history store error: {e}")
+
+        if not points:
+            points = await self._fetch_market_chart(
+                symbol, days, price_history_service.interval_for_days(days)
+            )
+        if not points:
+            return None
+
+        # 価格データを変換
+        price_points = [
+            ChartDataPoint(
+                timestamp=int(price[0]),
+                price=float(price[1])
+            )
+            for price in points
+        ]
+
+        chart_response = ChartDataResponse(
+            symbol=symbol,
+            name=self.get_coin_name(symbol),
+            prices=price_points,
+            total_points=len(price_points)
+        )
+        return chart_response.model_dump()
+
+    async def get_price_series(
+        self,
+        symbol: str,
+        days: int
+    ) -> Optional[Tuple[Sequence[int], Sequence[float]]]:
+        """
+        バックテスト・分析用の価格系列を取得
+
+        列指向アーカイブが使えれば履歴を差分同期した上でメモリマップのビューを返す
+        （上流APIの障害中は同期済みの範囲だけを返す）。
+        使えない場合はチャートデータからリストを作る。
+
+        Args:
+            symbol: 通貨シンボル（例: BTC, ETH）
+            days: 取得する日数
+
+        Returns:
+            (タイムスタンプ列, 価格列) or None
+        """
+        symbol = symbol.upper()
+        if symbol not in self.COIN_ID_MAP:
+            return None
+
+        if settings.PRICE_HISTORY_ENABLED and price_archive.available:
+            try:
+                interval, start = await price_history_service.sync(symbol, days, self._fetch_market_chart)
+                series = price_archive.read(symbol, interval, start)
+                if series and len(series[0]) > 0:
+                    return series
+            except UpstreamUnavailableError:
+                series = price_archive.read(
+                    symbol,
+                    price_history_service.interval_for_days(days),
+                    price_history_service.window_start(days)
                 )
+                if series and len(series[0]) > 0:
+                    return series
+            except Exception as e:
+                print(f"Price archive error: {e}")
 
-                return chart_response
+        chart_data = await self.get_chart_data(symbol, days)
+        if not chart_data:
+            return None
+        return [p.timestamp for p in chart_data.prices], [p.price for p in chart_data.prices]
+
+    async def _fetch_market_chart(self, symbol: str, days: int, interval: str) -> Optional[List[List[float]]]:
+        """CoinGecko APIから価格推移（[timestamp, price]のリスト）を取得"""
+        coin_id = self.COIN_ID_MAP[symbol]
 
+        try:
+            response = await self._request(
+                f"{self.COINGECKO_API_BASE}/coins/{coin_id}/market_chart",
+                params={
+                    "vs_currency": "usd",
+                    "days": days,
+                    "interval": interval
+                },
+                timeout=settings.COINGECKO_CHART_TIMEOUT
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            if not data or "prices" not in data:
+                return None
+
+            return data["prices"]
+
+        except UpstreamUnavailableError:
+            raise
         except httpx.HTTPError as e:
             print(f"CoinGecko API error: {e}")
             return None
@@ -0,0 +1,127 @@
+import httpx
+import time
+from typing import Optional, Any
+from app.core.config import settings
+
+
+class HttpClientService:
+    """外部API向けの共有HTTPクライアント（コネクションプール・Keep-Alive）"""
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.http2_enabled = False
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._total_requests = 0
+        self._total_errors = 0
+        self._total_time = 0.0
+
+    async def connect(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        共有クライアントを作成
+
+        Args:
+            transport: テスト用のトランスポート（httpx.MockTransportなど）
+        """
+        if self.client:
+            return
+
+        http2 = settings.HTTP2_ENABLED
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+                http2 = False
+
+        self.http2_enabled = http2
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.HTTP_DEFAULT_TIMEOUT,
+                connect=settings.HTTP_CONNECT_TIMEOUT,
+            ),
+            http2=http2,
+            transport=transport,
+        )
+
+    async def disconnect(self):
+        """共有クライアントを閉じる"""
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    async def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> httpx.Response:
+        """
+        GETリクエストを送信
+
+        Args:
+            url: リクエストURL
+            params: クエリパラメータ
+            timeout: このリクエストの読み取りタイムアウト（秒）
+
+        Returns:
+            httpx.Response
+        """
+        if not self.client:
+            # ライフスパン外（スクリプト等）から呼ばれた場合は遅延作成
+            await self.connect()
+
+        request_timeout: Any = httpx.USE_CLIENT_DEFAULT
+        if timeout is not None:
+            request_timeout = httpx.Timeout(timeout, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+        self._in_flight += 1
+        self._total_requests += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        started = time.perf_counter()
+        try:
+            return await self.client.get(url, params=params, timeout=request_timeout)
+        except httpx.HTTPError:
+            self._total_errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._total_time += time.perf_counter() - started
+
+    def _pool_connections(self) -> Optional[list]:
+        """httpcoreのコネクション一覧を取得（内部APIのため取得できない場合はNone）"""
+        try:
+            return list(self.client._transport._pool.connections)
+        except AttributeError:
+            return None
+
+    def get_stats(self) -> dict:
+        """コネクションプールの利用状況を取得"""
+        stats = {
+            "connected": self.client is not None,
+            "http2": self.http2_enabled,
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "total_requests": self._total_requests,
+            "total_errors": self._total_errors,
+            "avg_latency_ms": (self._total_time / self._total_requests * 1000) if self._total_requests else 0.0,
+            "pool_connections": None,
+            "pool_idle_connections": None,
+            "pool_utilization": None,
+        }
+
+        if self.client:
+            connections = self._pool_connections()
+            if connections is not None:
+                idle = sum(1 for c in connections if c.is_idle())
+                stats["pool_connections"] = len(connections)
+                stats["pool_idle_connections"] = idle
+                stats["pool_utilization"] = (len(connections) - idle) / settings.HTTP_MAX_CONNECTIONS
+
+        return stats
+
+
+# グローバルインスタンス
+http_client_service = HttpClientService()
@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class SizedLRUCache:
+    """
+    サイズ上限付きのLRUキャッシュ（プロセス内）
+
+    エントリごとにバイト数を記録し、合計が max_bytes を超えたら
+    最も長く参照されていないエントリから破棄する。
+    1件で max_bytes を超える値は保存しない。
+    ttl を指定したエントリは期限を過ぎると参照時に破棄する（ミスとして数える）。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """値を取得（参照したエントリは最新扱いにする）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[2] is not None and entry[2] <= time.monotonic():
+            self.delete(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, size: int, ttl: Optional[float] = None) -> bool:
+        """
+        値を保存
+
+        Args:
+            key: キー
+            value: 値
+            size: 値のバイト数（シリアライズ後の長さなど）
+            ttl: 保持する秒数（Noneなら期限なし）
+
+        Returns:
+            保存した場合True（上限より大きい値はFalse）
+        """
+        self.delete(key)
+        if size > self.max_bytes:
+            return False
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, size, expires_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+        return True
+
+    def delete(self, key: Hashable):
+        """値を削除"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self):
+        """全エントリを削除"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """件数・使用バイト数・ヒット率を取得"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
@@ -0,0 +1,180 @@
+"""
+NumPy版テクニカル指標バックエンド
+
+AnalysisServiceの純Python実装（リファレンス実装）と同じ定義で、
+float64配列を受け取り配列を返す。すべての関数は先頭軸（時間軸）に沿って
+計算するため、(時点, 銘柄) の2次元配列もそのまま扱える。
+"""
+from typing import Tuple
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # pragma: no cover - NumPyが無い環境では純Python実装を使用
+    np = None
+    sliding_window_view = None
+
+NUMPY_AVAILABLE = np is not None
+
+
+def as_array(prices) -> "np.ndarray":
+    """価格列をfloat64配列に変換（既にfloat64配列ならコピーしない）"""
+    return np.asarray(prices, dtype=np.float64)
+
+
+def ema(values: "np.ndarray", period: int) -> "np.ndarray":
+    """EMA（指数移動平均）を計算（最初の値はSMA、長さは n - period + 1）"""
+    values = as_array(values)
+    n = values.shape[0]
+    if n < period:
+        return np.empty((0,) + values.shape[1:])
+
+    multiplier = 2 / (period + 1)
+    out = np.empty((n - period + 1,) + values.shape[1:])
+    out[0] = values[:period].sum(axis=0) / period
+
+    if values.ndim == 1:
+        # 1次元は漸化式をPythonのfloatで回した方が速い
+        prev = float(out[0])
+        ema_values = [prev]
+        for price in values[period:].tolist():
+            prev = (price - prev) * multiplier + prev
+            ema_values.append(prev)
+        return np.array(ema_values)
+
+    # 多次元は時間方向にループし、銘柄方向はベクトル演算
+    for k in range(1, out.shape[0]):
+        out[k] = (values[period + k - 1] - out[k - 1]) * multiplier + out[k - 1]
+    return out
+
+
+def rsi_series(prices: "np.ndarray", period: int = 14) -> "np.ndarray":
+    """RSIの系列を計算（i番目の値はprices[:i+1]に対するRSI）"""
+    prices = as_array(prices)
+    n = prices.shape[0]
+    rsi = np.full(prices.shape, 50.0)  # データ不足の場合は中立値
+    if n < period + 1:
+        return rsi
+
+    deltas = np.diff(prices, axis=0)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+
+    # windows[k] = deltas[k:k+period] → prices[:k+period+1]のRSI
+    avg_gain = sliding_window_view(gains, period, axis=0).sum(axis=-1) / period
+    avg_loss = sliding_window_view(losses, period, axis=0).sum(axis=-1) / period
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi[period:] = np.where(avg_loss == 0, 100.0, values)
+    return rsi
+
+
+def macd_series(prices: "np.ndarray", fast: int = 12, slow: int = 26, signal_period: int = 9) -> dict:
+    """MACDの系列を計算（AnalysisService.calculate_macd_seriesと同じ定義）"""
+    prices = as_array(prices)
+    n = prices.shape[0]
+    macd_line = np.zeros(prices.shape)
+    signal_line = np.zeros(prices.shape)
+    histogram = np.zeros(prices.shape)
+    macd_signal = np.full(prices.shape, "neutral", dtype="<U7")
+
+    # MACDライン・シグナルラインの最初の値が出る時点
+    macd_start = slow - 1
+    signal_start = macd_start + signal_period - 1
+
+    if n >= slow:
+        ema_fast = ema(prices, fast)
+        ema_slow = ema(prices, slow)
+        macd_values = ema_fast[:ema_slow.shape[0]] - ema_slow
+        signal_values = ema(macd_values, signal_period)
+
+        macd_line[macd_start:] = macd_values
+        histogram[macd_start:] = macd_values
+
+        if signal_values.shape[0] > 0:
+            signal_line[signal_start:] = signal_values
+            histogram[signal_start:] = macd_values[signal_period - 1:] - signal_values
+
+        if signal_values.shape[0] > 1:
+            current = histogram[signal_start + 1:]
+            prev = macd_values[signal_period - 1:-1] - signal_values[:-1]
+            macd_signal[signal_start + 1:] = np.select(
+                [(prev < 0) & (current > 0), (prev > 0) & (current < 0)],
+                ["buy", "sell"],
+                "neutral"
+            )
+
+    return {
+        "macd_line": macd_line,
+        "signal_line": signal_line,
+        "histogram": histogram,
+        "macd_signal": macd_signal,
+    }
+
+
+def bollinger_series(prices: "np.ndarray", period: int = 20, std_dev: float = 2) -> dict:
+    """ボリンジャーバンドの系列を計算（AnalysisService.calculate_bollinger_seriesと同じ定義）"""
+    prices = as_array(prices)
+    n = prices.shape[0]
+    upper = np.empty(prices.shape)
+    middle = np.empty(prices.shape)
+    lower = np.empty(prices.shape)
+    position = np.full(prices.shape, "middle", dtype="<U11")
+
+    # データ不足の区間は累積平均
+    head = min(n, period - 1)
+    if head > 0:
+        counts = np.arange(1, head + 1).reshape((head,) + (1,) * (prices.ndim - 1))
+        head_mean = np.cumsum(prices[:head], axis=0) / counts
+        upper[:head] = head_mean
+        middle[:head] = head_mean
+        lower[:head] = head_mean
+
+    if n >= period:
+        # 累積和による分散計算は価格水準が高いと桁落ちするため、窓ビューで計算
+        windows = sliding_window_view(prices, period, axis=0)
+        middle_band = windows.sum(axis=-1) / period
+        variance = ((windows - middle_band[..., None]) ** 2).sum(axis=-1) / period
+        std = np.sqrt(variance)
+
+        middle[period - 1:] = middle_band
+        upper[period - 1:] = middle_band + std * std_dev
+        lower[period - 1:] = middle_band - std * std_dev
+
+        current = prices[period - 1:]
+        position[period - 1:] = np.select(
+            [current > upper[period - 1:], current > middle_band, current > lower[period - 1:]],
+            ["above_upper", "upper_half", "lower_half"],
+            "below_lower"
+        )
+
+    return {
+        "upper_band": upper,
+        "middle_band": middle,
+        "lower_band": lower,
+        "bb_position": position,
+    }
+
+
+def volatility(prices: "np.ndarray") -> float:
+    """ボラティリティ（価格変動率の標本標準偏差）を計算"""
+    prices = as_array(prices)
+    if prices.shape[0] < 3:
+        return 0.0
+    returns = np.diff(prices) / prices[:-1] * 100
+    return float(returns.std(ddof=1))
+
+
+def trend_slope(prices: "np.ndarray") -> Tuple[float, float]:
+    """線形回帰の傾きを閉形式で計算し、(傾き, 平均価格) を返す"""
+    prices = as_array(prices)
+    n = prices.shape[0]
+    y_mean = float(prices.mean())
+    if n < 2:
+        return 0.0, y_mean
+
+    x = np.arange(n) - (n - 1) / 2
+    denominator = n * (n * n - 1) / 12  # Σ(i - x̄)²
+    slope = float(np.dot(x, prices - y_mean)) / denominator
+    return slope, y_mean
@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from typing import List, Optional
 from app.models.portfolio import Portfolio
+from app.schemas.crypto import CryptoPriceResponse
 from app.schemas.portfolio import PortfolioCreate, PortfolioUpdate, PortfolioWithMetrics
 from app.services.crypto_service import crypto_service
 
@@ -78,19 +79,24 @@ class PortfolioService:
     async def get_portfolio_with_metrics(
         self,
         db: AsyncSession,
-        portfolio_id: int
+        portfolio_id: int,
+        current_price_data: Optional[CryptoPriceResponse] = None
     ) -> Optional[PortfolioWithMetrics]:
-        """メトリクス付きでポートフォリオを取得"""
+        """メトリクス付きでポートフォリオを取得（価格を取得済みなら渡す）"""
         portfolio = await self.get_portfolio(db, portfolio_id)
         if not portfolio:
             return None
 
         # 現在価格を取得
-        current_price_data = await crypto_service.get_price(portfolio.symbol)
+        if current_price_data is None:
+            current_price_data = await crypto_service.get_price(portfolio.symbol)
         if not current_price_data:
             return None
 
-        current_price = current_price_data.current_price
+        return self.build_metrics(portfolio, current_price_data.current_price)
+
+    def build_metrics(self, portfolio: Portfolio, current_price: float) -> PortfolioWithMetrics:
+        """取得済みのポートフォリオと現在価格からメトリクスを計算（DB・価格の再取得なし）"""
         current_value = portfolio.amount * current_price
         purchase_value = portfolio.amount * portfolio.purchase_price
         profit_loss = current_value - purchase_value
@@ -119,15 +125,25 @@ class PortfolioService:
         skip: int = 0,
         limit: int = 100
     ) -> List[PortfolioWithMetrics]:
-        """メトリクス付きですべてのポートフォリオを取得"""
+        """
+        メトリクス付きでポートフォリオを取得
+
+        ページ分の行は1回のクエリ、現在価格は通貨の種類ごとに1回の一括取得
+        （get_prices_map）で取得し、メトリクスはメモリ上で計算する。
+        現在価格を取得できなかった通貨の行は含めない。
+        """
         portfolios = await self.get_portfolios(db, skip, limit)
-        result = []
+        if not portfolios:
+            return []
 
-        for portfolio in portfolios:
-            metrics = await self.get_portfolio_with_metrics(db, portfolio.id)
-            if metrics:
-                result.append(metrics)
+        # 現在価格を一括取得
+        prices = await crypto_service.get_prices_map([p.symbol for p in portfolios])
 
+        result = []
+        for portfolio in portfolios:
+            price_data = prices.get(portfolio.symbol.upper())
+            if price_data:
+                result.append(self.build_metrics(portfolio, price_data.current_price))
         return result
 
 
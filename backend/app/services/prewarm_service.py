@@ -0,0 +1,228 @@
+import asyncio
+import functools
+import heapq
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.services.analysis_service import analysis_service
+from app.services.crypto_service import crypto_service
+from app.services.rate_limiter import request_priority
+from app.services.redis_service import redis_service
+
+
+class PrewarmService:
+    """
+    主要通貨のキャッシュを事前に更新するバックグラウンドスケジューラ
+
+    価格・チャート・投資推奨をキーごとに soft TTL より少し早い間隔で再取得し、
+    ユーザーのリクエストが上流API（CoinGecko）を同期的に待たないようにする。
+    実行間隔には揺らぎ（jitter）を加えて取得が同じ時刻に集中しないようにする。
+    上流APIへの呼び出しは共有のレート制限（coingecko_limiter）のbackground枠を使うため、
+    COINGECKO_RATE_LIMIT_BACKEND=redis なら全ワーカーで1つの予算に収まる。
+    複数ワーカーで動かす場合も、各キーは実行間隔ごとにRedisのロックを取得できた
+    1プロセスだけが更新する。
+    """
+
+    LOCK_PREFIX = "lock:prewarm:"
+
+    def __init__(self, concurrency: int, jitter: float):
+        self.concurrency = max(1, concurrency)
+        self.jitter = jitter
+        self._jobs: Dict[str, dict] = {}
+        self._schedule: List[Tuple[float, str]] = []  # (予定時刻, キー) のヒープ
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.skipped = 0
+
+    def tracked_symbols(self) -> List[str]:
+        """事前更新の対象通貨（未設定なら対応している全通貨）"""
+        symbols = [symbol.upper() for symbol in settings.PREWARM_SYMBOLS] or list(crypto_service.COIN_ID_MAP)
+        return [symbol for symbol in dict.fromkeys(symbols) if symbol in crypto_service.COIN_ID_MAP]
+
+    def add(self, key: str, refresh: Callable[[], Awaitable[Any]], interval: float):
+        """
+        定期更新するキーを登録
+
+        Args:
+            key: 統計表示用のキー
+            refresh: 再取得処理（Noneや空の結果は失敗として数える）
+            interval: 実行間隔（秒、jitterで前後する）
+        """
+        self._jobs[key] = {
+            "refresh": refresh,
+            "interval": interval,
+            "last_refresh": None,
+            "last_duration_ms": None,
+            "lag_ms": None,
+            "max_lag_ms": 0.0,
+            "runs": 0,
+            "skipped": 0,
+            "failures": 0,
+            "last_error": None,
+            "due": None,
+        }
+        # 起動直後の取得が一斉に始まらないよう、最初の実行時刻もばらつかせる
+        self._push(key, time.monotonic() + random.uniform(0, interval * self.jitter))
+
+    def start(self):
+        """対象キーを登録してスケジューラを起動"""
+        if self._scheduler:
+            return
+
+        symbols = self.tracked_symbols()
+        ratio = settings.PREWARM_REFRESH_RATIO
+        self.add(
+            "price",
+            functools.partial(crypto_service.refresh_prices, symbols),
+            settings.PRICE_CACHE_SOFT_TTL * ratio
+        )
+        for symbol in symbols:
+            for days in settings.PREWARM_CHART_DAYS:
+                self.add(
+                    f"chart:{symbol}:{days}",
+                    functools.partial(crypto_service.refresh_chart_data, symbol, days),
+                    settings.CHART_CACHE_SOFT_TTL * ratio
+                )
+            self.add(
+                f"analysis:{symbol}",
+                functools.partial(analysis_service.analyze_coin, symbol),
+                settings.CHART_CACHE_SOFT_TTL * ratio
+            )
+
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._scheduler = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """スケジューラと実行中の更新を停止"""
+        tasks = list(self._running)
+        if self._scheduler:
+            tasks.append(self._scheduler)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduler = None
+        self._running.clear()
+        self._jobs.clear()
+        self._schedule.clear()
+
+    def _push(self, key: str, due: float):
+        """次回の実行予定を登録"""
+        self._jobs[key]["due"] = due
+        heapq.heappush(self._schedule, (due, key))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _next_interval(self, interval: float) -> float:
+        """jitterを加えた次回までの間隔"""
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _run(self):
+        """予定時刻になったキーから順に更新を開始"""
+        while True:
+            if not self._schedule:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, key = self._schedule[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._schedule)
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._execute(key, due))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _claim(self, key: str, interval: float) -> Optional[str]:
+        """
+        今回の実行間隔でこのキーを更新する権利を取得
+
+        ロックは更新後も解放せず、次回の最短の予定時刻まで保持して他のワーカーの更新を止める。
+
+        Returns:
+            取得できた場合はロックのトークン、他のワーカーが更新済みならNone
+        """
+        return await redis_service.acquire_lock(f"{self.LOCK_PREFIX}{key}", interval * (1 - self.jitter))
+
+    async def _execute(self, key: str, due: float):
+        """1キーを更新して統計を記録し、次回を予約"""
+        job = self._jobs[key]
+        token = await self._claim(key, job["interval"])
+        if not token:
+            # 他のワーカーがこの間隔で更新済み
+            self._semaphore.release()
+            self.skipped += 1
+            job["skipped"] += 1
+            self._push(key, time.monotonic() + self._next_interval(job["interval"]))
+            return
+
+        started = time.monotonic()
+        lag_ms = (started - due) * 1000
+        job["lag_ms"] = lag_ms
+        job["max_lag_ms"] = max(job["max_lag_ms"], lag_ms)
+        # ユーザーのリクエストが上流APIの予算を優先して使えるようにする
+        request_priority.set("background")
+        try:
+            result = await job["refresh"]()
+            if not result:
+                raise ValueError("No data returned")
+            job["last_refresh"] = time.time()
+            job["last_error"] = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Prewarm {key} error: {e}")
+            job["failures"] += 1
+            job["last_error"] = str(e)
+            # 失敗した場合は他のワーカーが次の予定時刻に更新できるよう解放
+            await redis_service.release_lock(f"{self.LOCK_PREFIX}{key}", token)
+        finally:
+            self._semaphore.release()
+
+        job["runs"] += 1
+        job["last_duration_ms"] = (time.monotonic() - started) * 1000
+        self._push(key, time.monotonic() + self._next_interval(job["interval"]))
+
+    def get_stats(self) -> dict:
+        """キーごとの最終更新時刻・経過時間・遅延と、他のワーカーに任せた回数を取得"""
+        now = time.time()
+        monotonic_now = time.monotonic()
+        return {
+            "running": self._scheduler is not None,
+            "skipped": self.skipped,
+            "in_flight": len(self._running),
+            "jobs": {
+                key: {
+                    "interval_seconds": job["interval"],
+                    "last_refresh": job["last_refresh"],
+                    "age_seconds": (now - job["last_refresh"]) if job["last_refresh"] else None,
+                    "next_refresh_in": max(0.0, job["due"] - monotonic_now) if job["due"] else None,
+                    "lag_ms": job["lag_ms"],
+                    "max_lag_ms": job["max_lag_ms"],
+                    "last_duration_ms": job["last_duration_ms"],
+                    "runs": job["runs"],
+                    "skipped": job["skipped"],
+                    "failures": job["failures"],
+                    "last_error": job["last_error"],
+                }
+                for key, job in self._jobs.items()
+            },
+        }
+
+
+# グローバルインスタンス
+prewarm_service = PrewarmService(
+    concurrency=settings.PREWARM_CONCURRENCY,
+    jitter=settings.PREWARM_JITTER
+)
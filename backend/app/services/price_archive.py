@@ -0,0 +1,106 @@
+import os
+from typing import Dict, Optional, Sequence, Tuple
+from app.core.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPyが無い環境ではアーカイブを使用しない
+    np = None
+
+
+class PriceArchive:
+    """
+    列指向の価格アーカイブ（メモリマップ）
+
+    通貨・粒度ごとに int64 のタイムスタンプ列と float64 の価格列を
+    別々のバイナリファイルに保存し、np.memmapで読み込む。
+    読み出しはファイル上のビューをそのまま返すため、長期間の履歴でも
+    コピーやオブジェクト生成なしに扱える。
+    """
+
+    TIMESTAMP_SUFFIX = "timestamps.i64"
+    PRICE_SUFFIX = "prices.f64"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # パス → (更新時刻, タイムスタンプ列, 価格列)
+        self._maps: Dict[str, Tuple[int, "np.ndarray", "np.ndarray"]] = {}
+
+    @property
+    def available(self) -> bool:
+        """アーカイブを使用できるか（NumPy必須）"""
+        return np is not None and settings.PRICE_ARCHIVE_ENABLED
+
+    def _paths(self, symbol: str, interval: str) -> Tuple[str, str]:
+        """タイムスタンプ列・価格列のファイルパス"""
+        base = os.path.join(self.directory, f"{symbol.upper()}_{interval}")
+        return f"{base}.{self.TIMESTAMP_SUFFIX}", f"{base}.{self.PRICE_SUFFIX}"
+
+    def write(self, symbol: str, interval: str, timestamps: Sequence[int], prices: Sequence[float]):
+        """
+        系列全体を書き出す（一時ファイルに書いてから置き換えるため読み取り中でも安全）
+
+        Args:
+            symbol: 通貨シンボル
+            interval: 粒度（daily / hourly）
+            timestamps: UNIXタイムスタンプ（ミリ秒、昇順）
+            prices: 価格
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        ts_path, price_path = self._paths(symbol, interval)
+
+        # 価格列を先に置き換え、タイムスタンプ列の更新時刻で世代を判定する
+        for path, values, dtype in (
+            (price_path, prices, np.float64),
+            (ts_path, timestamps, np.int64),
+        ):
+            tmp_path = f"{path}.tmp"
+            np.asarray(values, dtype=dtype).tofile(tmp_path)
+            os.replace(tmp_path, path)
+
+        self._maps.pop(ts_path, None)
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: Optional[int] = None
+    ) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+        """
+        系列を読み込む
+
+        Args:
+            symbol: 通貨シンボル
+            interval: 粒度（daily / hourly）
+            start_ms: この時刻以降だけを返す（Noneなら全期間）
+
+        Returns:
+            (タイムスタンプ列, 価格列) の読み取り専用ビュー。アーカイブがなければNone
+        """
+        ts_path, price_path = self._paths(symbol, interval)
+        try:
+            mtime = os.stat(ts_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        cached = self._maps.get(ts_path)
+        if cached and cached[0] == mtime:
+            timestamps, prices = cached[1], cached[2]
+        else:
+            if os.path.getsize(ts_path) == 0:
+                return None
+            timestamps = np.memmap(ts_path, dtype=np.int64, mode="r")
+            prices = np.memmap(price_path, dtype=np.float64, mode="r")
+            if timestamps.shape != prices.shape:
+                # 書き込み途中の世代の組み合わせ
+                return None
+            self._maps[ts_path] = (mtime, timestamps, prices)
+
+        if start_ms is not None:
+            offset = int(np.searchsorted(timestamps, start_ms, side="left"))
+            return timestamps[offset:], prices[offset:]
+        return timestamps, prices
+
+
+# グローバルインスタンス
+price_archive = PriceArchive(settings.PRICE_ARCHIVE_DIR)
@@ -0,0 +1,206 @@
+import asyncio
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.price_history import PriceHistory
+from app.services.price_archive import price_archive
+
+# (symbol, days, interval) → [[timestamp_ms, price], ...]
+MarketChartFetcher = Callable[[str, int, str], Awaitable[Optional[List[List[float]]]]]
+
+
+class PriceHistoryService:
+    """
+    価格履歴の永続ストア
+
+    通貨・粒度ごとに履歴を1本だけ保持し、上流APIからは最後に保存した時刻以降の
+    差分だけを取得する。任意の日数のチャートは保存済み履歴の切り出しで返す。
+    """
+
+    DAY_MS = 86400000
+    INTERVAL_MS = {"daily": DAY_MS, "hourly": 3600000}
+    INSERT_BATCH_SIZE = 1000
+
+    def __init__(self):
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # (symbol, interval) → (最終確認時刻, 保存済み先頭時刻)
+        self._checked: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        # (symbol, interval) → 上流APIにある最古の時刻（上場が要求範囲より新しい通貨）
+        self._earliest: Dict[Tuple[str, str], int] = {}
+
+    def interval_for_days(self, days: int) -> str:
+        """取得日数に対応する粒度"""
+        return "daily" if days > 1 else "hourly"
+
+    def window_start(self, days: int, now_ms: Optional[int] = None) -> int:
+        """days日分の切り出し開始時刻（粒度の境界に切り捨て）"""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        step = self.INTERVAL_MS[self.interval_for_days(days)]
+        return (now_ms - days * self.DAY_MS) // step * step
+
+    async def get_history(
+        self,
+        symbol: str,
+        days: int,
+        fetch_market_chart: MarketChartFetcher
+    ) -> List[Tuple[int, float]]:
+        """
+        保存済み履歴を同期してから直近days日分を返す
+
+        Args:
+            symbol: 通貨シンボル
+            days: 取得する日数
+            fetch_market_chart: 上流APIからの取得処理
+
+        Returns:
+            (timestamp, price) のリスト（時刻昇順）
+        """
+        interval, start = await self.sync(symbol, days, fetch_market_chart)
+        return await self.read_range(symbol.upper(), interval, start)
+
+    async def sync(
+        self,
+        symbol: str,
+        days: int,
+        fetch_market_chart: MarketChartFetcher
+    ) -> Tuple[str, int]:
+        """
+        直近days日分が揃うよう保存済み履歴を同期し、列指向アーカイブも更新
+
+        Returns:
+            (粒度, 切り出し開始時刻)
+        """
+        symbol = symbol.upper()
+        interval = self.interval_for_days(days)
+        start = self.window_start(days)
+
+        lock = self._locks.setdefault((symbol, interval), asyncio.Lock())
+        async with lock:
+            stored = await self._sync(symbol, interval, days, start, fetch_market_chart)
+            if price_archive.available and (stored or price_archive.read(symbol, interval) is None):
+                await self._write_archive(symbol, interval)
+
+        return interval, start
+
+    async def _write_archive(self, symbol: str, interval: str):
+        """保存済み履歴全体を列指向アーカイブに書き出す"""
+        rows = await self.read_range(symbol, interval, 0)
+        if rows:
+            price_archive.write(
+                symbol,
+                interval,
+                [ts for ts, _ in rows],
+                [price for _, price in rows]
+            )
+
+    async def read_range(self, symbol: str, interval: str, start_ms: int) -> List[Tuple[int, float]]:
+        """保存済み履歴をstart_ms以降で切り出す"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(PriceHistory.timestamp, PriceHistory.price)
+                .where(
+                    PriceHistory.symbol == symbol,
+                    PriceHistory.interval == interval,
+                    PriceHistory.timestamp >= start_ms
+                )
+                .order_by(PriceHistory.timestamp)
+            )
+            return [(int(ts), float(price)) for ts, price in result.all()]
+
+    async def _sync(
+        self,
+        symbol: str,
+        interval: str,
+        days: int,
+        start_ms: int,
+        fetch_market_chart: MarketChartFetcher
+    ) -> int:
+        """不足分（先頭の欠落または末尾の差分）を上流APIから取得して保存"""
+        now_ms = int(time.time() * 1000)
+        step = self.INTERVAL_MS[interval]
+        # 上流APIにそれより前の履歴がない場合は、その時刻から揃っていれば足りる
+        head_ms = max(start_ms, self._earliest.get((symbol, interval), start_ms))
+
+        # 直近に確認済みで範囲も足りていればDBを見ない
+        checked = self._checked.get((symbol, interval))
+        if (
+            checked
+            and time.monotonic() - checked[0] < settings.PRICE_HISTORY_SYNC_INTERVAL
+            and checked[1] <= head_ms + step
+        ):
+            return 0
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(func.min(PriceHistory.timestamp), func.max(PriceHistory.timestamp))
+                .where(PriceHistory.symbol == symbol, PriceHistory.interval == interval)
+            )
+            first_ts, last_ts = result.one()
+
+        if first_ts is None or first_ts > head_ms + step:
+            # 要求範囲の先頭が欠けている: 全範囲を取得
+            fetch_days = days
+            full_range = True
+        elif now_ms - last_ts >= settings.PRICE_HISTORY_SYNC_INTERVAL * 1000:
+            # 末尾の差分のみ取得（日境界から取り直すため1日分の余裕を持たせる）
+            fetch_days = min(days, math.ceil((now_ms - last_ts) / self.DAY_MS) + 1)
+            full_range = False
+        else:
+            self._checked[(symbol, interval)] = (time.monotonic(), first_ts)
+            return 0
+
+        points = await fetch_market_chart(symbol, fetch_days, interval)
+        if not points:
+            return 0
+
+        stored = await self._store(symbol, interval, points)
+        fetched_first_ts = int(points[0][0])
+        if full_range and fetched_first_ts > start_ms + step:
+            # 全範囲を要求しても先頭が欠けている: 上流APIにある最古の点として記録
+            self._earliest[(symbol, interval)] = fetched_first_ts
+        self._checked[(symbol, interval)] = (
+            time.monotonic(),
+            fetched_first_ts if first_ts is None else min(first_ts, fetched_first_ts)
+        )
+        return stored
+
+    async def _store(self, symbol: str, interval: str, points: List[List[float]]) -> int:
+        """
+        取得した区間で保存済み履歴を置き換える
+
+        最新点（取得時点の価格）は次回同期で日足・時間足の点に置き換わるため、
+        取得区間の先頭以降の既存行は削除してから挿入する。
+        """
+        prices_by_ts = {int(ts): float(price) for ts, price in points}
+        rows = [
+            {"symbol": symbol, "interval": interval, "timestamp": ts, "price": prices_by_ts[ts]}
+            for ts in sorted(prices_by_ts)
+        ]
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(PriceHistory).where(
+                    PriceHistory.symbol == symbol,
+                    PriceHistory.interval == interval,
+                    PriceHistory.timestamp >= rows[0]["timestamp"]
+                )
+            )
+            for i in range(0, len(rows), self.INSERT_BATCH_SIZE):
+                statement = insert(PriceHistory).values(rows[i:i + self.INSERT_BATCH_SIZE])
+                await db.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=["symbol", "interval", "timestamp"],
+                        set_={"price": statement.excluded.price}
+                    )
+                )
+            await db.commit()
+
+        return len(rows)
+
+
+# グローバルインスタンス
+price_history_service = PriceHistoryService()
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Optional, Tuple
+from app.core.config import settings
+from app.services.redis_service import redis_service
+
+# 上流APIを呼び出す処理の優先度（interactive: ユーザーのリクエスト / background: 事前更新・再取得）
+PRIORITIES = ("interactive", "background")
+request_priority: ContextVar[str] = ContextVar("request_priority", default="interactive")
+
+
+class UpstreamUnavailableError(Exception):
+    """上流APIを呼び出せず取得できなかった（retry_after秒後に再試行できる見込み）"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamRateLimitError(UpstreamUnavailableError):
+    """上流APIのレート制限により取得できなかった"""
+
+
+class TokenBucketLimiter:
+    """
+    上流API呼び出しのトークンバケット
+
+    1分あたり rate_per_minute 回（最大 capacity 回まで連続）の予算を共有する。
+    待機中の呼び出しは優先度ごとのキューに入り、interactive が常に先に割り当てられる。
+    background は予算に reserve 分の余裕があるときだけ使える。
+    redis=True の場合はRedis上のバケット（Luaスクリプトで原子的に更新）を全ワーカーで共有し、
+    Redisが使えないときはプロセス内のバケットで続行する。
+    """
+
+    KEY_PREFIX = "ratelimit:"
+
+    # 戻り値は待つべき秒数（0なら取得できた）。浮動小数点を保つため文字列で返す
+    TAKE_SCRIPT = """
+    local blocked = redis.call('pttl', KEYS[2])
+    if blocked > 0 then
+        return tostring(blocked / 1000)
+    end
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local reserve = tonumber(ARGV[3])
+    local clock = redis.call('time')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('hmget', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 + reserve then
+        tokens = tokens - 1
+    else
+        wait = (1 + reserve - tokens) / rate
+    end
+    redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('pexpire', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+    return tostring(wait)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float,
+        capacity: float,
+        background_reserve: float = 0.0,
+        redis: bool = False
+    ):
+        self.name = name
+        self.rate = max(rate_per_minute, 1e-6) / 60  # 1秒あたり
+        self.capacity = max(1.0, capacity)
+        self.background_reserve = background_reserve
+        self.redis = redis
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters: Tuple[Deque[asyncio.Future], ...] = tuple(deque() for _ in PRIORITIES)
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._arrived: Optional[asyncio.Event] = None
+        self.granted = {priority: 0 for priority in PRIORITIES}
+        self.waited = {priority: 0 for priority in PRIORITIES}
+        self.timeouts = 0
+        self.blocks = 0
+
+    @property
+    def _bucket_key(self) -> str:
+        return f"{self.KEY_PREFIX}{self.name}"
+
+    @property
+    def _block_key(self) -> str:
+        return f"{self.KEY_PREFIX}{self.name}:blocked"
+
+    async def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        1回分の予算を取得（足りなければ待つ）
+
+        Args:
+            priority: interactive / background（省略時はコンテキストの優先度）
+            timeout: 最大待機秒数（超えたらUpstreamRateLimitError）
+        """
+        priority = priority or request_priority.get()
+        lane = PRIORITIES.index(priority) if priority in PRIORITIES else 0
+
+        # 待機中の呼び出しがなければその場で取得を試みる
+        if not any(self._waiters) and await self._take(lane) == 0:
+            self.granted[PRIORITIES[lane]] += 1
+            return
+
+        self.waited[PRIORITIES[lane]] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        if self._arrived is None:
+            self._arrived = asyncio.Event()
+        self._arrived.set()
+        if not self._dispatcher or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise UpstreamRateLimitError(f"Rate limit budget for {self.name} exhausted", retry_after=timeout)
+        finally:
+            if not future.done():
+                future.cancel()
+                try:
+                    self._waiters[lane].remove(future)
+                except ValueError:
+                    pass
+
+        self.granted[PRIORITIES[lane]] += 1
+
+    async def block(self, seconds: float):
+        """上流APIから待機を指示された場合（Retry-After）に全呼び出しを止める"""
+        if seconds <= 0:
+            return
+        self.blocks += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        if self.redis and redis_service.redis_client:
+            try:
+                await redis_service.redis_client.set(self._block_key, "1", px=int(seconds * 1000))
+            except Exception as e:
+                print(f"Rate limiter Redis error: {e}")
+
+    async def _dispatch(self):
+        """待機中の呼び出しに優先度順で予算を割り当てる"""
+        while True:
+            lane = next((i for i, waiters in enumerate(self._waiters) if waiters), None)
+            if lane is None:
+                return
+
+            wait = await self._take(lane)
+            if wait > 0:
+                # 待っている間に優先度の高い呼び出しが来たら割り当てをやり直す
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # 取得した予算はキャンセルされていない最初の待機者に渡す
+            while self._waiters[lane]:
+                future = self._waiters[lane].popleft()
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                self._refund()
+
+    async def _take(self, lane: int) -> float:
+        """予算を1回分取得し、足りなければ待つべき秒数を返す"""
+        reserve = self.background_reserve if lane > 0 else 0.0
+        if self.redis and redis_service.redis_client:
+            try:
+                wait = await redis_service.redis_client.eval(
+                    self.TAKE_SCRIPT, 2, self._bucket_key, self._block_key,
+                    self.rate, self.capacity, reserve
+                )
+                return float(wait)
+            except Exception as e:
+                print(f"Rate limiter Redis error: {e}")
+
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1 + reserve:
+            self._tokens -= 1
+            return 0.0
+        return (1 + reserve - self._tokens) / self.rate
+
+    def _refund(self):
+        """使われなかった予算を戻す（プロセス内のバケットのみ）"""
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+    def get_stats(self) -> dict:
+        """取得・待機・タイムアウトの件数と残り予算を取得"""
+        now = time.monotonic()
+        return {
+            "backend": "redis" if self.redis else "local",
+            "rate_per_minute": self.rate * 60,
+            "capacity": self.capacity,
+            "tokens": min(self.capacity, self._tokens + (now - self._updated) * self.rate),
+            "blocked_for": max(0.0, self._blocked_until - now),
+            "waiting": {priority: len(waiters) for priority, waiters in zip(PRIORITIES, self._waiters)},
+            "granted": dict(self.granted),
+            "waited": dict(self.waited),
+            "timeouts": self.timeouts,
+            "blocks": self.blocks,
+        }
+
+
+# グローバルインスタンス
+coingecko_limiter = TokenBucketLimiter(
+    "coingecko",
+    rate_per_minute=settings.COINGECKO_RATE_LIMIT_PER_MINUTE,
+    capacity=settings.COINGECKO_RATE_LIMIT_BURST,
+    background_reserve=settings.COINGECKO_BACKGROUND_RESERVE,
+    redis=settings.COINGECKO_RATE_LIMIT_BACKEND == "redis"
+)
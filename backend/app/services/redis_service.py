@@ -1,37 +1,175 @@
 import redis.asyncio as redis
+import asyncio
 import json
-from typing import Optional, Any
+import uuid
+from typing import Optional, Any, List, Dict, Tuple
 from app.core.config import settings
+from app.services.cache_codec import cache_codec
+from app.services.lru_cache import SizedLRUCache
 
 
 class RedisService:
-    """Redisキャッシングサービス"""
+    """
+    Redisキャッシングサービス
+
+    LOCAL_CACHE_PREFIXES に一致するキーは、プロセス内のTTL付きLRU（ローカル層）を
+    Redisの前段に置き、ネットワーク往復とJSONのデコードを省く。
+    書き込み・削除したキーはRedisのPub/Subで他のワーカーに通知して
+    ローカル層から消す（購読が切れている間はローカル層を使わない）。
+    ローカル層の値は呼び出し側で共有されるため変更しないこと。
+
+    キャッシュ値は cache_codec でシリアライズ・圧縮したバイト列で保存する
+    （キューの要素はJSON文字列のまま）。
+    """
+
+    # ローカル層の無効化を通知するチャンネル
+    INVALIDATION_CHANNEL = "cache:invalidate"
+
+    # 自分が取得したロックだけを解放する
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
 
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
+        self.instance_id = uuid.uuid4().hex  # 自分が送った無効化通知を区別する
+        self.local = SizedLRUCache(settings.LOCAL_CACHE_MAX_BYTES)
+        self.local_prefixes = tuple(settings.LOCAL_CACHE_PREFIXES) if settings.LOCAL_CACHE_ENABLED else ()
+        self._subscriber: Optional[asyncio.Task] = None
+        self._subscribed = False
+        self._invalidation_seq = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.invalidations_received = 0
 
     async def connect(self):
-        """Redisに接続"""
+        """Redisに接続（ローカル層が有効なら無効化通知の購読を開始）"""
         self.redis_client = await redis.from_url(
             settings.REDIS_URL,
             encoding="utf-8",
-            decode_responses=True
+            decode_responses=False  # 値はcache_codecのバイト列
         )
+        if self.local_prefixes and not self._subscriber:
+            self._subscriber = asyncio.create_task(self._listen_invalidations())
 
     async def disconnect(self):
         """Redis接続を切断"""
+        if self._subscriber:
+            self._subscriber.cancel()
+            await asyncio.gather(self._subscriber, return_exceptions=True)
+            self._subscriber = None
         if self.redis_client:
             await self.redis_client.close()
 
+    def _local_enabled(self, key: str) -> bool:
+        """ローカル層を使うキーか（無効化通知を購読できている間のみ）"""
+        return self._subscribed and key.startswith(self.local_prefixes)
+
+    def _set_local(self, key: str, encoded: bytes, ttl_ms: Optional[int] = None):
+        """
+        ローカル層に保存（RedisのTTLとLOCAL_CACHE_TTLの短い方まで保持）
+
+        Redisから読んだ場合と同じ値になるよう、保存したバイト列をデコードして持つ。
+        """
+        ttl = settings.LOCAL_CACHE_TTL
+        if ttl_ms is not None and ttl_ms >= 0:
+            ttl = min(ttl, ttl_ms / 1000)
+        self.local.set(key, cache_codec.decode(encoded), len(encoded), ttl=ttl)
+
+    async def _listen_invalidations(self):
+        """他のワーカーが書き込んだキーをローカル層から削除"""
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                # 購読していなかった間の通知は届かないため、それまでの値は捨てる
+                self.local.clear()
+                self._subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload["origin"] == self.instance_id:
+                        continue
+                    self._invalidation_seq += 1
+                    self.invalidations_received += 1
+                    for key in payload["keys"]:
+                        self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis SUBSCRIBE error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._subscribed = False
+                self.local.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _invalidation_message(self, keys: List[str]) -> str:
+        return json.dumps({"origin": self.instance_id, "keys": keys})
+
+    def get_cache_stats(self) -> dict:
+        """ローカル層・Redis層それぞれのヒット率と無効化通知の受信件数を取得"""
+        lookups = self.redis_hits + self.redis_misses
+        return {
+            "local": {
+                **self.local.get_stats(),
+                "enabled": bool(self.local_prefixes),
+                "subscribed": self._subscribed,
+                "prefixes": list(self.local_prefixes),
+                "invalidations_received": self.invalidations_received,
+            },
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "hit_rate": (self.redis_hits / lookups) if lookups else 0.0,
+            },
+        }
+
+    async def ping(self) -> bool:
+        """Redisに到達できるか確認"""
+        if not self.redis_client:
+            return False
+
+        try:
+            return bool(await self.redis_client.ping())
+        except Exception as e:
+            print(f"Redis PING error: {e}")
+            return False
+
     async def get(self, key: str) -> Optional[Any]:
-        """キャッシュから値を取得"""
+        """キャッシュから値を取得（ローカル層 → Redisの順）"""
         if not self.redis_client:
             return None
 
+        use_local = self._local_enabled(key)
+        if use_local:
+            cached = self.local.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            value = await self.redis_client.get(key)
+            if not use_local:
+                value = await self.redis_client.get(key)
+            else:
+                # ローカル層の期限をRedisのTTLに合わせるため、PTTLも同じ往復で取得
+                seq = self._invalidation_seq
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    value, ttl_ms = await pipe.get(key).pttl(key).execute()
+                # 読み込み中に無効化通知が届いた場合は古い値の可能性があるため保存しない
+                if value and seq == self._invalidation_seq:
+                    self._set_local(key, value, ttl_ms)
+
             if value:
-                return json.loads(value)
+                self.redis_hits += 1
+                return cache_codec.decode(value)
+            self.redis_misses += 1
             return None
         except Exception as e:
             print(f"Redis GET error: {e}")
@@ -43,28 +181,301 @@ class RedisService:
             return False
 
         try:
-            await self.redis_client.setex(
-                key,
-                expire,
-                json.dumps(value, default=str)
-            )
+            encoded = cache_codec.encode(value)
+            if not key.startswith(self.local_prefixes):
+                await self.redis_client.setex(key, expire, encoded)
+                return True
+
+            # 書き込みと他のワーカーへの無効化通知を1往復で送る
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, expire, encoded)
+                pipe.publish(self.INVALIDATION_CHANNEL, self._invalidation_message([key]))
+                await pipe.execute()
+            if self._subscribed:
+                self._set_local(key, encoded, expire * 1000)
             return True
         except Exception as e:
+            self.local.delete(key)
             print(f"Redis SET error: {e}")
             return False
 
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """複数のキーを1回のMGETで取得（キーと同じ順序で返す、ローカル層にあるキーは除く）"""
+        async with self.pipeline() as pipe:
+            result = pipe.mget(keys)
+        return result.value
+
+    async def mset_with_ttl(self, mapping: Dict[str, Any], expire: int = 60):
+        """複数のキーにTTL付きで値を設定（パイプラインで1往復、無効化通知もまとめて送る）"""
+        if not mapping:
+            return False
+
+        pipe = self.pipeline()
+        pipe.mset_with_ttl(mapping, expire=expire)
+        return await pipe.execute()
+
     async def delete(self, key: str):
         """キャッシュから値を削除"""
+        return await self.delete_many([key])
+
+    async def delete_many(self, keys: List[str]):
+        """複数のキーを1回のDELで削除（無効化通知もまとめて送る）"""
+        if not keys:
+            return False
+
+        pipe = self.pipeline()
+        pipe.delete(*keys)
+        return await pipe.execute()
+
+    def pipeline(self) -> "RedisPipeline":
+        """
+        複数の操作を1往復にまとめるパイプラインを作成
+
+        使い方:
+            async with redis_service.pipeline() as pipe:
+                price = pipe.get("crypto:price:BTC")
+                pipe.set("crypto:price:ETH", value, expire=600)
+            price.value  # ブロックを抜けた時点で値が入る
+        """
+        return RedisPipeline(self)
+
+    async def exists(self, key: str) -> bool:
+        """キーが存在するか確認"""
         if not self.redis_client:
             return False
 
         try:
-            await self.redis_client.delete(key)
+            return bool(await self.redis_client.exists(key))
+        except Exception as e:
+            print(f"Redis EXISTS error: {e}")
+            return False
+
+    async def push(self, queue: str, value: Any) -> bool:
+        """キューの末尾に値を追加（LPUSH、取り出しはpopでFIFO）"""
+        if not self.redis_client:
+            return False
+
+        try:
+            await self.redis_client.lpush(queue, json.dumps(value, default=str))
             return True
         except Exception as e:
-            print(f"Redis DELETE error: {e}")
+            print(f"Redis LPUSH error: {e}")
             return False
 
+    async def pop(self, queue: str, timeout: int = 1) -> Optional[Any]:
+        """キューの先頭から値を取り出す（BRPOP、timeout秒待っても空ならNone）"""
+        if not self.redis_client:
+            return None
+
+        try:
+            item = await self.redis_client.brpop(queue, timeout=timeout)
+            return json.loads(item[1]) if item else None
+        except Exception as e:
+            print(f"Redis BRPOP error: {e}")
+            return None
+
+    async def queue_length(self, queue: str) -> int:
+        """キューの長さ（LLEN）"""
+        if not self.redis_client:
+            return 0
+
+        try:
+            return await self.redis_client.llen(queue)
+        except Exception as e:
+            print(f"Redis LLEN error: {e}")
+            return 0
+
+    async def remove_from_queue(self, queue: str, value: Any) -> bool:
+        """キューから値を取り除く（LREM）"""
+        if not self.redis_client:
+            return False
+
+        try:
+            return bool(await self.redis_client.lrem(queue, 0, json.dumps(value, default=str)))
+        except Exception as e:
+            print(f"Redis LREM error: {e}")
+            return False
+
+    async def acquire_lock(self, name: str, timeout: float) -> Optional[str]:
+        """
+        分散ロックを取得（SET NX PX）
+
+        Returns:
+            取得できた場合は解放用トークン、他で保持中ならNone
+            （Redis未接続・エラー時はロックなしで続行できるようトークンを返す）
+        """
+        token = uuid.uuid4().hex
+        if not self.redis_client:
+            return token
+
+        try:
+            acquired = await self.redis_client.set(name, token, nx=True, px=int(timeout * 1000))
+            return token if acquired else None
+        except Exception as e:
+            print(f"Redis LOCK error: {e}")
+            return token
+
+    async def release_lock(self, name: str, token: str):
+        """分散ロックを解放"""
+        if not self.redis_client:
+            return False
+
+        try:
+            await self.redis_client.eval(self.RELEASE_LOCK_SCRIPT, 1, name, token)
+            return True
+        except Exception as e:
+            print(f"Redis UNLOCK error: {e}")
+            return False
+
+
+class PipelineResult:
+    """パイプラインで実行した読み込みの結果（実行後に value が入る）"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any = None):
+        self.value = value
+
+
+class RedisPipeline:
+    """
+    RedisServiceの操作をまとめて1往復で実行するパイプライン
+
+    get / mget はローカル層にあるキーをRedisに問い合わせず、
+    書き込み・削除したキーの無効化通知は1件のメッセージにまとめて同じ往復で送る。
+    エラー時は他のメソッドと同じくログを出して続行する（読み込みの結果はNoneのまま）。
+    """
+
+    def __init__(self, service: RedisService):
+        self._service = service
+        self._commands: List[Tuple[str, tuple, Optional[PipelineResult]]] = []
+
+    async def __aenter__(self) -> "RedisPipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.execute()
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def get(self, key: str) -> PipelineResult:
+        """値を取得"""
+        result = PipelineResult()
+        self._commands.append(("get", (key,), result))
+        return result
+
+    def mget(self, keys: List[str]) -> PipelineResult:
+        """複数のキーの値を取得（キーと同じ順序のリスト）"""
+        result = PipelineResult([None] * len(keys))
+        self._commands.append(("mget", (list(keys),), result))
+        return result
+
+    def set(self, key: str, value: Any, expire: int = 60):
+        """TTL付きで値を設定"""
+        self._commands.append(("set", (key, value, expire), None))
+
+    def mset_with_ttl(self, mapping: Dict[str, Any], expire: int = 60):
+        """複数のキーにTTL付きで値を設定"""
+        for key, value in mapping.items():
+            self.set(key, value, expire)
+
+    def delete(self, *keys: str):
+        """値を削除"""
+        if keys:
+            self._commands.append(("delete", keys, None))
+
+    async def execute(self) -> bool:
+        """積んだ操作を1往復で実行"""
+        commands, self._commands = self._commands, []
+        service = self._service
+        if not commands:
+            return True
+        if not service.redis_client:
+            return False
+
+        seq = service._invalidation_seq
+        finishers = []  # (返信の数, 返信を受け取る処理)
+        invalidated: List[str] = []
+        written: List[Tuple[str, bytes, int]] = []
+        try:
+            async with service.redis_client.pipeline(transaction=False) as pipe:
+                for op, args, result in commands:
+                    if op in ("get", "mget"):
+                        finishers.append(self._queue_read(pipe, op, args[0], result, seq))
+                    elif op == "set":
+                        key, value, expire = args
+                        encoded = cache_codec.encode(value)
+                        pipe.setex(key, expire, encoded)
+                        finishers.append((1, None))
+                        if key.startswith(service.local_prefixes):
+                            invalidated.append(key)
+                            written.append((key, encoded, expire * 1000))
+                    else:
+                        pipe.delete(*args)
+                        finishers.append((1, None))
+                        for key in args:
+                            service.local.delete(key)
+                        invalidated.extend(key for key in args if key.startswith(service.local_prefixes))
+
+                if invalidated:
+                    pipe.publish(service.INVALIDATION_CHANNEL, service._invalidation_message(invalidated))
+                replies = await pipe.execute()
+        except Exception as e:
+            for key, _, _ in written:
+                service.local.delete(key)
+            print(f"Redis PIPELINE error: {e}")
+            return False
+
+        offset = 0
+        for count, finish in finishers:
+            if finish:
+                finish(replies[offset:offset + count])
+            offset += count
+        if service._subscribed:
+            for key, encoded, ttl_ms in written:
+                service._set_local(key, encoded, ttl_ms)
+        return True
+
+    def _queue_read(self, pipe, op: str, keys, result: PipelineResult, seq: int):
+        """読み込みをパイプラインに積み、(返信の数, 結果を埋める処理) を返す"""
+        service = self._service
+        single = op == "get"
+        keys = [keys] if single else keys
+        values: List[Optional[Any]] = [None] * len(keys)
+        remote: List[Tuple[int, str]] = []
+        for i, key in enumerate(keys):
+            cached = service.local.get(key) if service._local_enabled(key) else None
+            if cached is not None:
+                values[i] = cached
+            else:
+                remote.append((i, key))
+        result.value = values[0] if single else values
+        if not remote:
+            return 0, None
+
+        # ローカル層の期限をRedisのTTLに合わせるため、PTTLも同じ往復で取得
+        local_keys = [key for _, key in remote if service._local_enabled(key)]
+        pipe.mget([key for _, key in remote])
+        for key in local_keys:
+            pipe.pttl(key)
+
+        def finish(replies: list):
+            ttl_by_key = dict(zip(local_keys, replies[1:]))
+            for (i, key), value in zip(remote, replies[0]):
+                if not value:
+                    service.redis_misses += 1
+                    continue
+                service.redis_hits += 1
+                values[i] = cache_codec.decode(value)
+                # 読み込み中に無効化通知が届いた場合は古い値の可能性があるため保存しない
+                if key in ttl_by_key and seq == service._invalidation_seq:
+                    service._set_local(key, value, ttl_by_key[key])
+            result.value = values[0] if single else values
+
+        return 1 + len(local_keys), finish
+
 
 # グローバルインスタンス
 redis_service = RedisService()
@@ -0,0 +1,216 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.services.redis_service import redis_service
+
+
+class SingleFlight:
+    """
+    キャッシュミス時のリクエスト集約（single-flight）
+
+    同じキーに対する同時リクエストは最初の1件だけが取得処理を実行し、
+    残りは同じ結果を待つ。distributed=Trueの場合はRedisロックを使い、
+    複数ワーカー間でも取得処理を1回にまとめる。
+    """
+
+    LOCK_PREFIX = "lock:singleflight:"
+    LOCK_POLL_INTERVAL = 0.05  # 秒
+
+    def __init__(self, distributed: bool = False, lock_timeout: float = 15.0):
+        self.distributed = distributed
+        self.lock_timeout = lock_timeout
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+
+    def record_hit(self):
+        """キャッシュヒットを記録"""
+        self.hits += 1
+
+    async def do(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        read_cache: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        キー単位で取得処理を1回にまとめて実行
+
+        Args:
+            key: キャッシュキー
+            fetch: 取得処理（結果のキャッシュ保存まで行う）
+            read_cache: 他ワーカーの取得完了を確認するためのキャッシュ読み取り（分散モード用）
+
+        Returns:
+            取得処理の結果
+        """
+        task = self._inflight.get(key)
+        if task:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            if self.distributed and read_cache is not None:
+                task = asyncio.ensure_future(self._fetch_with_lock(key, fetch, read_cache))
+            else:
+                task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+
+        # 呼び出し元がキャンセルされても共有タスクは継続させる
+        return await asyncio.shield(task)
+
+    async def do_many(
+        self,
+        keys: List[str],
+        fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        read_cache: Optional[Callable[[str], Awaitable[Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        複数キーの取得処理をまとめて実行
+
+        取得中のキーはその結果を待ち、取得中でないキーだけを1回の取得処理に渡す。
+        各キーは単一キーの do() と同じ登録を使うため、do() との間でも集約される。
+
+        Args:
+            keys: キャッシュキーのリスト
+            fetch: キーのリストを受け取り、キー → 結果の辞書を返す取得処理（結果のキャッシュ保存まで行う）
+            read_cache: 他ワーカーの取得完了を確認するためのキー単位のキャッシュ読み取り（分散モード用）
+
+        Returns:
+            キー → 結果の辞書（取得できなかったキーはNone）
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        pending = []
+        for key in dict.fromkeys(keys):
+            task = self._inflight.get(key)
+            if task:
+                self.coalesced += 1
+                tasks[key] = task
+            else:
+                self.misses += 1
+                pending.append(key)
+
+        if pending:
+            if self.distributed and read_cache is not None:
+                batch = asyncio.ensure_future(self._fetch_many_with_lock(pending, fetch, read_cache))
+            else:
+                batch = asyncio.ensure_future(fetch(pending))
+            for key in pending:
+                task = asyncio.ensure_future(self._pick(batch, key))
+                self._inflight[key] = task
+                task.add_done_callback(lambda t, key=key: self._on_done(key, t))
+                tasks[key] = task
+
+        # 呼び出し元がキャンセルされても共有タスクは継続させる
+        values = await asyncio.gather(*(asyncio.shield(task) for task in tasks.values()), return_exceptions=True)
+        for value in values:
+            if isinstance(value, BaseException):
+                raise value
+        return dict(zip(tasks, values))
+
+    @staticmethod
+    async def _pick(batch: asyncio.Future, key: str) -> Any:
+        """まとめた取得処理の結果から1キー分を取り出す"""
+        return (await asyncio.shield(batch)).get(key)
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        """完了したタスクを登録から外す"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 待機者がいない場合の未取得例外の警告を抑止
+
+    async def _fetch_with_lock(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        read_cache: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Redisロックを取得できたワーカーだけが取得処理を実行"""
+        lock_name = f"{self.LOCK_PREFIX}{key}"
+        token = await redis_service.acquire_lock(lock_name, self.lock_timeout)
+        if token:
+            try:
+                return await fetch()
+            finally:
+                await redis_service.release_lock(lock_name, token)
+
+        # 他ワーカーが取得中: キャッシュに書き込まれるまで待つ
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            cached = await read_cache()
+            if cached:
+                self.remote_coalesced += 1
+                return cached
+            if not await redis_service.exists(lock_name):
+                break
+
+        # ロック保持者が失敗した場合は自分で取得
+        return await fetch()
+
+    async def _fetch_many_with_lock(
+        self,
+        keys: List[str],
+        fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        read_cache: Callable[[str], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """Redisロックを取得できたキーだけを取得し、他ワーカーが取得中のキーはキャッシュへの書き込みを待つ"""
+        tokens = {}
+        for key in keys:
+            token = await redis_service.acquire_lock(f"{self.LOCK_PREFIX}{key}", self.lock_timeout)
+            if token:
+                tokens[key] = token
+
+        results: Dict[str, Any] = {}
+        if tokens:
+            try:
+                results.update(await fetch(list(tokens)))
+            finally:
+                for key, token in tokens.items():
+                    await redis_service.release_lock(f"{self.LOCK_PREFIX}{key}", token)
+
+        waiting = [key for key in keys if key not in tokens]
+        unresolved = []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        while waiting and loop.time() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            for key in list(waiting):
+                cached = await read_cache(key)
+                if cached:
+                    self.remote_coalesced += 1
+                    results[key] = cached
+                    waiting.remove(key)
+                elif not await redis_service.exists(f"{self.LOCK_PREFIX}{key}"):
+                    unresolved.append(key)
+                    waiting.remove(key)
+
+        # ロック保持者が失敗した（または待ちきれなかった）キーは自分で取得
+        unresolved.extend(waiting)
+        if unresolved:
+            results.update(await fetch(unresolved))
+        return results
+
+    def get_stats(self) -> dict:
+        """ヒット・ミス・集約件数を取得"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "distributed": self.distributed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "remote_coalesced": self.remote_coalesced,
+            "in_flight": len(self._inflight),
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+# グローバルインスタンス
+single_flight = SingleFlight(
+    distributed=settings.SINGLE_FLIGHT_DISTRIBUTED,
+    lock_timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+)
@@ -0,0 +1,337 @@
+"""
+逐次更新（ストリーミング）版テクニカル指標
+
+価格を1つ受け取るごとに最新の指標値を返す状態オブジェクト。履歴全体を再計算せず、
+1回の update は履歴の長さに依存しない（RSI・ボリンジャーバンドは期間分の窓だけを見る）。
+各値は AnalysisService の系列計算（calculate_*_series）のi番目の値と
+浮動小数点の誤差の範囲（相対・絶対とも1e-9以内）で一致する。NumPyバックエンドとは
+合計を求める順序が異なるため、MACD・ボリンジャーバンドの最後の桁が一致しないことがある。
+
+状態は to_dict() でJSONにできる辞書になり、from_dict() で復元できるため、
+Redisに保存して別プロセス・次のティックで計算を続けられる。
+"""
+from collections import deque
+from typing import Dict, Optional, Sequence, Type
+
+
+class StreamingEMA:
+    """EMA（指数移動平均、最初の値はSMA）"""
+
+    __slots__ = ("period", "multiplier", "count", "total", "value")
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.count = 0
+        self.total = 0.0  # SMA計算用（期間分そろうまで）
+        self.value: Optional[float] = None
+
+    def update(self, price: float) -> Optional[float]:
+        """価格を追加して最新のEMAを返す（期間分そろうまではNone）"""
+        self.count += 1
+        if self.value is not None:
+            self.value = (price - self.value) * self.multiplier + self.value
+        elif self.count < self.period:
+            self.total += price
+        else:
+            self.total += price
+            self.value = self.total / self.period
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "ema",
+            "period": self.period,
+            "count": self.count,
+            "total": self.total,
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingEMA":
+        indicator = cls(data["period"])
+        indicator.count = data["count"]
+        indicator.total = data["total"]
+        indicator.value = data["value"]
+        return indicator
+
+
+class StreamingRSI:
+    """RSI（直近period本の単純平均による相対力指数）"""
+
+    __slots__ = ("period", "last_price", "gains", "losses", "value")
+
+    def __init__(self, period: int = 14):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        self.period = period
+        self.last_price: Optional[float] = None
+        self.gains: deque = deque(maxlen=period)
+        self.losses: deque = deque(maxlen=period)
+        self.value = 50.0
+
+    def update(self, price: float) -> float:
+        """価格を追加して最新のRSIを返す（データ不足の間は中立値50）"""
+        if self.last_price is not None:
+            delta = price - self.last_price
+            self.gains.append(delta if delta > 0 else 0)
+            self.losses.append(-delta if delta < 0 else 0)
+        self.last_price = price
+
+        if len(self.gains) < self.period:
+            return self.value
+
+        avg_gain = sum(self.gains) / self.period
+        avg_loss = sum(self.losses) / self.period
+        if avg_loss == 0:
+            self.value = 100.0
+        else:
+            rs = avg_gain / avg_loss
+            self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "rsi",
+            "period": self.period,
+            "last_price": self.last_price,
+            "gains": list(self.gains),
+            "losses": list(self.losses),
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingRSI":
+        indicator = cls(data["period"])
+        indicator.last_price = data["last_price"]
+        indicator.gains.extend(data["gains"])
+        indicator.losses.extend(data["losses"])
+        indicator.value = data["value"]
+        return indicator
+
+
+class StreamingMACD:
+    """
+    MACD（短期EMA - 長期EMA、シグナルラインはMACDラインのEMA）
+
+    既存実装と同じく、MACDラインは短期EMAと長期EMAを系列の先頭から対応させて
+    引いたもの（短期EMAは slow - fast 本前の値）になる。その値を再現するため
+    短期EMAの直近 slow - fast + 1 本を保持する。
+    """
+
+    __slots__ = ("fast", "slow", "signal_period", "fast_ema", "slow_ema", "signal_ema",
+                 "fast_history", "prev_histogram", "value")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal_period: int = 9):
+        if fast > slow:
+            raise ValueError("macd_fast must be <= macd_slow")
+        self.fast = fast
+        self.slow = slow
+        self.signal_period = signal_period
+        self.fast_ema = StreamingEMA(fast)
+        self.slow_ema = StreamingEMA(slow)
+        self.signal_ema = StreamingEMA(signal_period)
+        self.fast_history: deque = deque(maxlen=slow - fast + 1)
+        self.prev_histogram: Optional[float] = None
+        self.value = self._neutral(0.0, 0.0, 0.0)
+
+    @staticmethod
+    def _neutral(macd_line: float, signal_line: float, histogram: float) -> dict:
+        return {"macd_line": macd_line, "signal_line": signal_line, "histogram": histogram, "macd_signal": "neutral"}
+
+    def update(self, price: float) -> dict:
+        """価格を追加して最新の {macd_line, signal_line, histogram, macd_signal} を返す"""
+        fast_value = self.fast_ema.update(price)
+        slow_value = self.slow_ema.update(price)
+        if fast_value is not None:
+            self.fast_history.append(fast_value)
+        if slow_value is None:
+            return self.value
+
+        macd_line = self.fast_history[0] - slow_value
+        signal_line = self.signal_ema.update(macd_line)
+        if signal_line is None:
+            self.value = self._neutral(macd_line, 0.0, macd_line)
+            return self.value
+
+        histogram = macd_line - signal_line
+        signal = "neutral"
+        if self.prev_histogram is not None:
+            if self.prev_histogram < 0 and histogram > 0:
+                signal = "buy"  # ゴールデンクロス
+            elif self.prev_histogram > 0 and histogram < 0:
+                signal = "sell"  # デッドクロス
+        self.prev_histogram = histogram
+
+        self.value = {
+            "macd_line": macd_line,
+            "signal_line": signal_line,
+            "histogram": histogram,
+            "macd_signal": signal,
+        }
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "macd",
+            "fast": self.fast,
+            "slow": self.slow,
+            "signal_period": self.signal_period,
+            "fast_ema": self.fast_ema.to_dict(),
+            "slow_ema": self.slow_ema.to_dict(),
+            "signal_ema": self.signal_ema.to_dict(),
+            "fast_history": list(self.fast_history),
+            "prev_histogram": self.prev_histogram,
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingMACD":
+        indicator = cls(data["fast"], data["slow"], data["signal_period"])
+        indicator.fast_ema = StreamingEMA.from_dict(data["fast_ema"])
+        indicator.slow_ema = StreamingEMA.from_dict(data["slow_ema"])
+        indicator.signal_ema = StreamingEMA.from_dict(data["signal_ema"])
+        indicator.fast_history.extend(data["fast_history"])
+        indicator.prev_histogram = data["prev_histogram"]
+        indicator.value = dict(data["value"])
+        return indicator
+
+
+class StreamingBollinger:
+    """ボリンジャーバンド（直近period本のSMA ± 標準偏差 × std_dev）"""
+
+    __slots__ = ("period", "std_dev", "window", "value")
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        self.period = period
+        self.std_dev = std_dev
+        self.window: deque = deque(maxlen=period)
+        self.value: Optional[dict] = None
+
+    def update(self, price: float) -> dict:
+        """価格を追加して最新の {upper_band, middle_band, lower_band, bb_position} を返す"""
+        self.window.append(price)
+        if len(self.window) < self.period:
+            middle = sum(self.window) / len(self.window)
+            self.value = {"upper_band": middle, "middle_band": middle, "lower_band": middle, "bb_position": "middle"}
+            return self.value
+
+        middle_band = sum(self.window) / self.period
+        variance = sum((p - middle_band) ** 2 for p in self.window) / self.period
+        std = variance ** 0.5
+        upper_band = middle_band + (std * self.std_dev)
+        lower_band = middle_band - (std * self.std_dev)
+
+        if price > upper_band:
+            position = "above_upper"
+        elif price > middle_band:
+            position = "upper_half"
+        elif price > lower_band:
+            position = "lower_half"
+        else:
+            position = "below_lower"
+
+        self.value = {
+            "upper_band": upper_band,
+            "middle_band": middle_band,
+            "lower_band": lower_band,
+            "bb_position": position,
+        }
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "bollinger",
+            "period": self.period,
+            "std_dev": self.std_dev,
+            "window": list(self.window),
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingBollinger":
+        indicator = cls(data["period"], data["std_dev"])
+        indicator.window.extend(data["window"])
+        indicator.value = dict(data["value"]) if data["value"] is not None else None
+        return indicator
+
+
+class StreamingIndicatorSet:
+    """
+    RSI・MACD・ボリンジャーバンドをまとめて逐次更新
+
+    update の戻り値は AnalysisService.calculate_indicator_series の
+    各系列のi番目と同じキーの辞書（値は浮動小数点の誤差の範囲で一致）。
+    """
+
+    __slots__ = ("rsi", "macd", "bollinger", "count")
+
+    def __init__(
+        self,
+        rsi_period: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal_period: int = 9,
+        bb_period: int = 20,
+        bb_std_dev: float = 2
+    ):
+        self.rsi = StreamingRSI(rsi_period)
+        self.macd = StreamingMACD(macd_fast, macd_slow, macd_signal_period)
+        self.bollinger = StreamingBollinger(bb_period, bb_std_dev)
+        self.count = 0
+
+    def update(self, price: float) -> dict:
+        """価格を追加して最新の指標値を返す"""
+        price = float(price)
+        self.count += 1
+        values = {"rsi": self.rsi.update(price)}
+        values.update(self.macd.update(price))
+        values.update(self.bollinger.update(price))
+        return values
+
+    def extend(self, prices: Sequence[float]) -> Optional[dict]:
+        """複数の価格を順に追加して最後の指標値を返す（過去データからの初期化用）"""
+        values = None
+        for price in prices:
+            values = self.update(price)
+        return values
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "set",
+            "count": self.count,
+            "rsi": self.rsi.to_dict(),
+            "macd": self.macd.to_dict(),
+            "bollinger": self.bollinger.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingIndicatorSet":
+        indicator = cls.__new__(cls)
+        indicator.rsi = StreamingRSI.from_dict(data["rsi"])
+        indicator.macd = StreamingMACD.from_dict(data["macd"])
+        indicator.bollinger = StreamingBollinger.from_dict(data["bollinger"])
+        indicator.count = data["count"]
+        return indicator
+
+
+# to_dict の "type" → クラス
+INDICATOR_TYPES: Dict[str, Type] = {
+    "ema": StreamingEMA,
+    "rsi": StreamingRSI,
+    "macd": StreamingMACD,
+    "bollinger": StreamingBollinger,
+    "set": StreamingIndicatorSet,
+}
+
+
+def from_dict(data: dict):
+    """to_dict() の辞書から指標オブジェクトを復元（Redisから読み込んだ状態など）"""
+    indicator_type = INDICATOR_TYPES.get(data.get("type"))
+    if indicator_type is None:
+        raise ValueError(f"Unknown indicator state type: {data.get('type')}")
+    return indicator_type.from_dict(data)
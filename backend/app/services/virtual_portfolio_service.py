@@ -57,10 +57,12 @@ class VirtualPortfolioService:
         )
         holdings = list(result.scalars().all())
 
+        # 現在価格を一括取得
+        prices = await crypto_service.get_prices_map([h.symbol for h in holdings])
+
         holdings_with_price = []
         for holding in holdings:
-            # 現在価格を取得
-            price_data = await crypto_service.get_price(holding.symbol)
+            price_data = prices.get(holding.symbol.upper())
             current_price = price_data.current_price if price_data else 0.0
 
             # 損益計算
@@ -0,0 +1,148 @@
+"""
+キャッシュ値のコーデック（シリアライザ × 圧縮方式）ごとのエンコード・デコード時間とサイズの比較
+
+価格（小）・365日分のチャート・バックテスト結果（365日分の資産曲線と取引履歴）を
+実際のレスポンススキーマで作り、キャッシュに保存する形（model_dump）でエンコードする。
+インストールされていないシリアライザ・圧縮方式は表示しない。Redisは使わない。
+
+    cd backend
+    python benchmarks/cache_codecs.py --repeat 200
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.schemas.backtest import BacktestMetrics, BacktestResponse, BacktestStrategy, BacktestTrade  # noqa: E402
+from app.schemas.crypto import ChartDataPoint, ChartDataResponse, CryptoPriceResponse  # noqa: E402
+from app.services.cache_codec import COMPRESSORS, SERIALIZERS, CacheCodec  # noqa: E402
+
+DAY_MS = 86400000
+
+
+def price_payload() -> dict:
+    """価格キャッシュ（crypto:price:{symbol}）の値"""
+    price = CryptoPriceResponse(
+        symbol="BTC",
+        name="Bitcoin",
+        current_price=45000.5,
+        price_change_24h=1250.75,
+        price_change_percentage_24h=2.85,
+        market_cap=880000000000,
+        total_volume=35000000000,
+        high_24h=45500.0,
+        low_24h=43200.0,
+        last_updated=datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+    )
+    return {"data": price.model_dump(), "cached_at": time.time()}
+
+
+def chart_payload(days: int) -> dict:
+    """チャートキャッシュ（crypto:chart:{symbol}:{days}）の値"""
+    start = 1704067200000
+    chart = ChartDataResponse(
+        symbol="BTC",
+        name="Bitcoin",
+        prices=[
+            ChartDataPoint(timestamp=start + i * DAY_MS, price=45000 + 3000 * math.sin(i / 9) + i * 12.345)
+            for i in range(days + 1)
+        ],
+        total_points=days + 1,
+    )
+    return {"data": chart.model_dump(), "cached_at": time.time()}
+
+
+def backtest_payload(days: int) -> dict:
+    """バックテスト結果キャッシュ（backtest:result:{key}）の値"""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    trades = [
+        BacktestTrade(
+            trade_id=i + 1,
+            type="buy" if i % 2 == 0 else "sell",
+            timestamp=start + timedelta(days=i * 7),
+            price=45000 + 1000 * math.sin(i),
+            amount=0.2222,
+            value=10000.0 + i,
+            profit_loss=None if i % 2 == 0 else 150.0 - i,
+            profit_loss_percent=None if i % 2 == 0 else 1.5 - i / 100,
+        )
+        for i in range(days // 7)
+    ]
+    response = BacktestResponse(
+        symbol="BTC",
+        name="Bitcoin",
+        strategy=BacktestStrategy(name="RSI Reversal", buy_signal="rsi_oversold", sell_signal="rsi_overbought"),
+        start_date=start,
+        end_date=start + timedelta(days=days),
+        initial_capital=10000.0,
+        final_capital=12500.0,
+        trades=trades,
+        metrics=BacktestMetrics(
+            total_trades=len(trades),
+            winning_trades=20,
+            losing_trades=6,
+            win_rate=76.9,
+            total_return=2500.0,
+            total_return_percent=25.0,
+            max_drawdown=-15.5,
+            sharpe_ratio=1.5,
+            avg_profit_per_trade=96.15,
+            avg_profit_per_winning_trade=150.0,
+            avg_loss_per_losing_trade=-80.0,
+        ),
+        equity_curve=[
+            {"timestamp": 1704067200000 + i * DAY_MS, "value": 10000 * (1 + 0.25 * i / days) + 200 * math.sin(i)}
+            for i in range(days)
+        ],
+    )
+    return response.model_dump(mode="json")
+
+
+def per_call_us(func, value, repeat: int) -> float:
+    """1回あたりの所要時間（マイクロ秒、repeat回の平均）"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(value)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(args):
+    payloads = {
+        "price": price_payload(),
+        f"chart {args.days}d": chart_payload(args.days),
+        f"backtest {args.days}d": backtest_payload(args.days),
+    }
+    print(f"serializers: {', '.join(SERIALIZERS)} / compression: {', '.join(COMPRESSORS)}")
+    print(f"compression applied to values >= {args.min_compress_bytes} bytes, {args.repeat} runs each\n")
+
+    for label, payload in payloads.items():
+        baseline = None
+        print(label)
+        print(f"  {'codec':<16} {'bytes':>8} {'ratio':>6} {'encode us':>10} {'decode us':>10}")
+        for serializer in SERIALIZERS:
+            for compression in COMPRESSORS:
+                codec = CacheCodec(serializer, compression, args.min_compress_bytes)
+                encoded = codec.encode(payload)
+                if codec.decode(encoded) is None:
+                    raise AssertionError(f"{serializer}+{compression} failed to round-trip")
+                size = len(encoded)
+                baseline = baseline or size
+                encode_us = per_call_us(codec.encode, payload, args.repeat)
+                decode_us = per_call_us(codec.decode, encoded, args.repeat)
+                print(
+                    f"  {serializer + '+' + compression:<16} {size:8d} {size / baseline:6.2f} "
+                    f"{encode_us:10.1f} {decode_us:10.1f}"
+                )
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="チャート・資産曲線の日数")
+    parser.add_argument("--repeat", type=int, default=200, help="各コーデックの実行回数")
+    parser.add_argument("--min-compress-bytes", type=int, default=2048, help="圧縮する最小サイズ（バイト）")
+    main(parser.parse_args())
@@ -0,0 +1,147 @@
+"""
+CoinGecko障害時のサーキットブレーカーと古い値の返却を確認するハーネス
+
+CoinGeckoの代わりにプロセス内の偽の上流API（httpx.MockTransport）を使い、
+正常 → 障害（タイムアウト / 5xx）→ 復旧 の順に価格・チャートを取得して、
+応答時間・is_stale・サーキットの状態の推移を表示する。
+
+最後に取得できたデータはRedisに保存するため、REDIS_URL のRedisが必要
+（crypto:price:BTC などのキーを書き換えるので、使い捨てのDBを指定すること）。
+
+    cd backend
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/circuit_breaker_outage.py --mode timeout
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# 価格履歴ストア（DB）を使わずチャートを上流APIから直接取得し、
+# 応答時間に呼び出し予算の待ち時間が混ざらないよう予算を広げる
+os.environ.setdefault("PRICE_HISTORY_ENABLED", "false")
+os.environ.setdefault("COINGECKO_RATE_LIMIT_PER_MINUTE", "6000")
+os.environ.setdefault("COINGECKO_RATE_LIMIT_BURST", "100")
+os.environ.setdefault("COINGECKO_RETRY_BASE_DELAY", "0.05")
+
+import httpx  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.circuit_breaker import coingecko_breaker  # noqa: E402
+from app.services.crypto_service import crypto_service  # noqa: E402
+from app.services.http_client import http_client_service  # noqa: E402
+from app.services.rate_limiter import UpstreamUnavailableError  # noqa: E402
+from app.services.redis_service import redis_service  # noqa: E402
+
+
+class FakeUpstream:
+    """CoinGeckoの /coins/markets と /coins/{id}/market_chart を返す偽の上流API"""
+
+    def __init__(self, hang: float):
+        self.mode = "healthy"  # healthy / timeout / error
+        self.hang = hang
+        self.calls = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.mode == "timeout":
+            # 応答しない上流API（クライアントのタイムアウトまで待たされる）
+            await asyncio.sleep(self.hang)
+            raise httpx.ReadTimeout("Upstream timed out", request=request)
+        if self.mode == "error":
+            return httpx.Response(503)
+
+        ids = {coin_id: symbol for symbol, coin_id in crypto_service.COIN_ID_MAP.items()}
+        if request.url.path.endswith("/coins/markets"):
+            requested = request.url.params.get("ids", "").split(",")
+            return httpx.Response(200, json=[
+                {
+                    "id": coin_id,
+                    "symbol": ids[coin_id].lower(),
+                    "name": crypto_service.get_coin_name(ids[coin_id]),
+                    "current_price": 45000.0,
+                    "last_updated": "2024-01-01T12:00:00Z",
+                }
+                for coin_id in requested if coin_id in ids
+            ])
+        if request.url.path.endswith("/market_chart"):
+            days = int(request.url.params.get("days", 7))
+            now = int(time.time() * 1000)
+            return httpx.Response(200, json={
+                "prices": [[now - (days - i) * 86400000, 45000 + 500 * math.sin(i)] for i in range(days + 1)]
+            })
+        return httpx.Response(404)
+
+
+async def timed(label: str, call):
+    """1回取得して応答時間・is_stale・データの経過秒数・サーキットの状態を表示"""
+    started = time.perf_counter()
+    try:
+        result = await call()
+        outcome = (
+            f"is_stale={result.is_stale} age={result.data_age_seconds}" if result else "None"
+        )
+    except UpstreamUnavailableError as e:
+        outcome = f"{type(e).__name__}: {e}"
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"  {label:<8} {elapsed_ms:8.1f} ms  circuit={coingecko_breaker.state:<9} {outcome}")
+
+
+async def expire_cache(symbol: str, days: int):
+    """通常のキャッシュを消してhard TTL切れの状態にする（最後に取得できたデータは残す）"""
+    await redis_service.delete(f"crypto:price:{symbol}")
+    await redis_service.delete(f"crypto:chart:{symbol}:{days}")
+
+
+async def main(args):
+    upstream = FakeUpstream(hang=args.hang)
+    await redis_service.connect()
+    if not await redis_service.ping():
+        print(f"Redis is not reachable at {settings.REDIS_URL}")
+        return
+    await http_client_service.connect(transport=httpx.MockTransport(upstream.handler))
+    coingecko_breaker.recovery_timeout = args.recovery_timeout
+
+    symbol, days = "BTC", 7
+    for key in (f"crypto:price:{symbol}", f"crypto:chart:{symbol}:{days}"):
+        await redis_service.delete(key)
+        await redis_service.delete(crypto_service._last_known_good_key(key))
+
+    try:
+        print("healthy")
+        await timed("price", lambda: crypto_service.get_price(symbol))
+        await timed("chart", lambda: crypto_service.get_chart_data(symbol, days))
+
+        print(f"outage ({args.mode})")
+        upstream.mode = args.mode
+        calls_before = upstream.calls
+        for _ in range(args.requests):
+            await expire_cache(symbol, days)
+            await timed("price", lambda: crypto_service.get_price(symbol))
+        print(f"  upstream calls during outage: {upstream.calls - calls_before}")
+
+        print(f"recovery (waiting {args.recovery_timeout}s for half-open)")
+        upstream.mode = "healthy"
+        await asyncio.sleep(args.recovery_timeout)
+        await expire_cache(symbol, days)
+        await timed("price", lambda: crypto_service.get_price(symbol))
+        await timed("chart", lambda: crypto_service.get_chart_data(symbol, days))
+
+        print("breaker stats")
+        for key, value in coingecko_breaker.get_stats().items():
+            print(f"  {key}: {value}")
+        print(f"  last_known_good_hits: {crypto_service.last_known_good_hits}")
+    finally:
+        await http_client_service.disconnect()
+        await redis_service.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["timeout", "error"], default="timeout", help="障害の種類")
+    parser.add_argument("--hang", type=float, default=1.0, help="timeoutモードで上流APIが応答しない秒数")
+    parser.add_argument("--requests", type=int, default=8, help="障害中に送るリクエスト数")
+    parser.add_argument("--recovery-timeout", type=float, default=2.0, help="サーキットが開いている秒数")
+    asyncio.run(main(parser.parse_args()))
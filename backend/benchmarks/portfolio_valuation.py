@@ -0,0 +1,168 @@
+"""
+ポートフォリオ一覧の評価（get_portfolios_with_metrics）のクエリ回数・価格取得回数・所要時間の比較
+
+ページの各行について get_portfolio_with_metrics を呼ぶ行ごとの評価（行ごとに
+SELECT 1回と価格取得1回）と、ページ1回のクエリ・通貨ごとの価格の一括取得・
+メモリ上での計算で評価する get_portfolios_with_metrics を、行数を変えて比べる。
+クエリ回数はSQLAlchemyのエンジンが実行したSELECT文の数で数える。
+
+価格はCoinGeckoの代わりにプロセス内の偽の上流API（httpx.MockTransport）から取得する。
+REDIS_URL のRedisに接続できればキャッシュを使い、できなければRedisなしで毎回上流APIを呼ぶ。
+DATABASE_URL の portfolios テーブルを作り直すので、使い捨てのDBを指定すること
+（未指定ならaiosqliteの一時ファイルを使う）。
+
+    cd backend
+    python benchmarks/portfolio_valuation.py --rows 100 10000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'portfolio_valuation.db')}"
+)
+# 行ごとの評価で価格取得の待ち時間が呼び出し予算に支配されないよう予算を広げる
+os.environ.setdefault("COINGECKO_RATE_LIMIT_PER_MINUTE", "10000000")
+os.environ.setdefault("COINGECKO_RATE_LIMIT_BURST", "100000")
+os.environ.setdefault("PRICE_HISTORY_ENABLED", "false")
+os.environ.setdefault("DEBUG", "false")  # SQLのログ出力を所要時間に含めない
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.models.portfolio import Portfolio  # noqa: E402
+from app.services.crypto_service import crypto_service  # noqa: E402
+from app.services.http_client import http_client_service  # noqa: E402
+from app.services.portfolio_service import portfolio_service  # noqa: E402
+from app.services.redis_service import redis_service  # noqa: E402
+
+SYMBOLS = list(crypto_service.COIN_ID_MAP)[:10]
+
+selects = 0
+price_lookups = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_selects(conn, cursor, statement, parameters, context, executemany):
+    global selects
+    if statement.lstrip().upper().startswith("SELECT"):
+        selects += 1
+
+
+def _counting(method):
+    """crypto_serviceの価格取得メソッドの呼び出し回数を数える"""
+    async def wrapper(*args, **kwargs):
+        global price_lookups
+        price_lookups += 1
+        return await method(*args, **kwargs)
+    return wrapper
+
+
+crypto_service.get_price = _counting(crypto_service.get_price)
+crypto_service.get_prices_map = _counting(crypto_service.get_prices_map)
+
+
+async def fake_markets(request: httpx.Request) -> httpx.Response:
+    """CoinGeckoの /coins/markets を返す偽の上流API"""
+    ids = {coin_id: symbol for symbol, coin_id in crypto_service.COIN_ID_MAP.items()}
+    if not request.url.path.endswith("/coins/markets"):
+        return httpx.Response(404)
+    requested = request.url.params.get("ids", "").split(",")
+    return httpx.Response(200, json=[
+        {
+            "id": coin_id,
+            "symbol": ids[coin_id].lower(),
+            "name": crypto_service.get_coin_name(ids[coin_id]),
+            "current_price": 1000.0 + len(coin_id),
+            "last_updated": "2024-01-01T12:00:00Z",
+        }
+        for coin_id in requested if coin_id in ids
+    ])
+
+
+async def seed(rows: int):
+    """portfolios テーブルを作り直して rows 行を投入"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=[Portfolio.__table__])
+        await conn.run_sync(Base.metadata.create_all, tables=[Portfolio.__table__])
+        purchase_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        await conn.execute(insert(Portfolio), [
+            {
+                "symbol": SYMBOLS[i % len(SYMBOLS)],
+                "name": crypto_service.get_coin_name(SYMBOLS[i % len(SYMBOLS)]),
+                "amount": 0.5 + i % 7,
+                "purchase_price": 900.0 + i % 200,
+                "purchase_date": purchase_date,
+            }
+            for i in range(rows)
+        ])
+
+
+async def per_row(rows: int):
+    """行ごとの評価（ページ取得後、各行で get_portfolio_with_metrics を呼ぶ）"""
+    async with AsyncSessionLocal() as db:
+        portfolios = await portfolio_service.get_portfolios(db, 0, rows)
+        return [await portfolio_service.get_portfolio_with_metrics(db, p.id) for p in portfolios]
+
+
+async def batched(rows: int):
+    """一括評価"""
+    async with AsyncSessionLocal() as db:
+        return await portfolio_service.get_portfolios_with_metrics(db, 0, rows)
+
+
+async def measure(label: str, repeat: int, rows: int, run):
+    """repeat回実行して1回あたりのクエリ回数・価格取得回数・所要時間（中央値）を表示"""
+    global selects, price_lookups
+    timings = []
+    for _ in range(repeat):
+        selects = price_lookups = 0
+        started = time.perf_counter()
+        result = await run(rows)
+        timings.append((time.perf_counter() - started) * 1000)
+    if len(result) != rows:
+        raise AssertionError(f"{label}: expected {rows} rows, got {len(result)}")
+    print(
+        f"  {label:<10} selects {selects:6d}   price lookups {price_lookups:6d}   "
+        f"median {statistics.median(timings):10.2f} ms"
+    )
+    return statistics.median(timings)
+
+
+async def main(args):
+    await redis_service.connect()
+    redis_state = "redis"
+    if not await redis_service.ping():
+        # 接続できないRedisへの再試行を所要時間に含めない
+        await redis_service.disconnect()
+        redis_service.redis_client = None
+        redis_state = "no redis"
+    await http_client_service.connect(transport=httpx.MockTransport(fake_markets))
+    print(f"{settings.DATABASE_URL} ({redis_state}), {len(SYMBOLS)} symbols, {args.repeat} runs")
+
+    try:
+        for rows in args.rows:
+            await seed(rows)
+            print(f"{rows} rows")
+            single = await measure("per-row", args.repeat, rows, per_row)
+            bulk = await measure("batched", args.repeat, rows, batched)
+            print(f"  speedup {single / bulk:.1f}x")
+    finally:
+        await http_client_service.disconnect()
+        await redis_service.disconnect()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10000], help="ポートフォリオの行数")
+    parser.add_argument("--repeat", type=int, default=3, help="各方式の実行回数")
+    asyncio.run(main(parser.parse_args()))
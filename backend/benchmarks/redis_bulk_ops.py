@@ -0,0 +1,137 @@
+"""
+RedisServiceの単一キー操作と一括操作（MGET・パイプライン）の往復回数・所要時間の比較
+
+100キーの読み込み・書き込み・削除を、1キーずつの呼び出しと
+mget / mset_with_ttl / delete_many / pipeline() で実行して比べる。
+往復回数はredis-pyのコネクションがコマンドを送信した回数で数える。
+
+ローカル層（プロセス内LRU）はRedisとの往復を測るため既定で無効にする。
+bench:* のキーを書き込むので、使い捨てのDBを指定すること。
+
+    cd backend
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/redis_bulk_ops.py --keys 100 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+os.environ.setdefault("LOCAL_CACHE_ENABLED", "false")
+
+from redis.asyncio.connection import AbstractConnection  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.redis_service import redis_service  # noqa: E402
+
+round_trips = 0
+_send_packed_command = AbstractConnection.send_packed_command
+
+
+async def _counting_send_packed_command(self, command, check_health=True):
+    """コマンド（パイプラインなら積んだ全コマンド）の送信1回を往復1回として数える"""
+    global round_trips
+    round_trips += 1
+    return await _send_packed_command(self, command, check_health)
+
+
+AbstractConnection.send_packed_command = _counting_send_packed_command
+
+
+def make_value(i: int) -> dict:
+    """価格キャッシュと同程度の大きさの値"""
+    return {
+        "data": {
+            "symbol": f"SYM{i}",
+            "name": f"Coin {i}",
+            "current_price": 45000.5 + i,
+            "price_change_24h": 1250.75,
+            "price_change_percentage_24h": 2.85,
+            "market_cap": 880000000000,
+            "total_volume": 35000000000,
+            "last_updated": "2024-01-01T12:00:00Z",
+        },
+        "cached_at": time.time(),
+    }
+
+
+async def measure(label: str, repeat: int, run):
+    """repeat回実行して1回あたりの往復回数と所要時間（中央値）を表示"""
+    global round_trips
+    timings = []
+    trips = 0
+    for _ in range(repeat):
+        round_trips = 0
+        started = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - started) * 1000)
+        trips = round_trips
+    print(f"  {label:<28} round trips {trips:5d}   median {statistics.median(timings):8.2f} ms")
+    return statistics.median(timings)
+
+
+async def main(args):
+    await redis_service.connect()
+    if not await redis_service.ping():
+        print(f"Redis is not reachable at {settings.REDIS_URL}")
+        return
+
+    keys = [f"bench:price:{i}" for i in range(args.keys)]
+    mapping = {key: make_value(i) for i, key in enumerate(keys)}
+
+    async def set_each():
+        for key, value in mapping.items():
+            await redis_service.set(key, value, expire=600)
+
+    async def get_each():
+        for key in keys:
+            await redis_service.get(key)
+
+    async def delete_each():
+        for key in keys:
+            await redis_service.delete(key)
+
+    async def mixed_pipeline():
+        async with redis_service.pipeline() as pipe:
+            pipe.mset_with_ttl(mapping, expire=600)
+            pipe.mget(keys)
+            pipe.delete(*keys)
+
+    async def mixed_each():
+        await set_each()
+        await get_each()
+        await delete_each()
+
+    print(f"{args.keys} keys, {args.repeat} runs ({settings.REDIS_URL})")
+    try:
+        print("write")
+        single = await measure("set x N", args.repeat, set_each)
+        bulk = await measure("mset_with_ttl", args.repeat, lambda: redis_service.mset_with_ttl(mapping, expire=600))
+        print(f"  speedup {single / bulk:.1f}x")
+
+        print("read")
+        single = await measure("get x N", args.repeat, get_each)
+        bulk = await measure("mget", args.repeat, lambda: redis_service.mget(keys))
+        print(f"  speedup {single / bulk:.1f}x")
+
+        print("delete")
+        single = await measure("delete x N", args.repeat, delete_each)
+        bulk = await measure("delete_many", args.repeat, lambda: redis_service.delete_many(keys))
+        print(f"  speedup {single / bulk:.1f}x")
+
+        print("write + read + delete")
+        single = await measure("single-key calls", args.repeat, mixed_each)
+        bulk = await measure("pipeline()", args.repeat, mixed_pipeline)
+        print(f"  speedup {single / bulk:.1f}x")
+    finally:
+        await redis_service.delete_many(keys)
+        await redis_service.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100, help="1回の操作で扱うキー数")
+    parser.add_argument("--repeat", type=int, default=20, help="各操作の実行回数")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,257 @@
+"""
+サーキットブレーカーと上流API障害時の古い値の返却のテスト
+
+CoinGeckoの代わりに httpx.MockTransport、Redisの代わりにプロセス内の辞書を使う。
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import app.services.crypto_service as crypto_module
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.crypto_service import CryptoService
+from app.services.http_client import HttpClientService
+from app.services.rate_limiter import TokenBucketLimiter, UpstreamRateLimitError
+from app.services.redis_service import redis_service
+from app.services.single_flight import SingleFlight
+
+
+class MemoryRedis:
+    """RedisServiceが使うコマンドだけを実装したプロセス内のRedisの代わり"""
+
+    def __init__(self):
+        self.values = {}
+
+    def _live(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    async def get(self, key):
+        return self._live(key)
+
+    async def mget(self, keys):
+        return [self._live(key) for key in keys]
+
+    async def setex(self, key, seconds, value):
+        self.values[key] = (value, time.monotonic() + seconds)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key):
+        return int(self._live(key) is not None)
+
+    async def pttl(self, key):
+        if self._live(key) is None:
+            return -2
+        return int((self.values[key][1] - time.monotonic()) * 1000)
+
+    async def publish(self, channel, message):
+        return 0
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    """積んだコマンドをexecuteでまとめて実行する"""
+
+    def __init__(self, redis: MemoryRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((getattr(self.redis, name), args))
+            return self
+        return queue
+
+    async def execute(self):
+        commands, self.commands = self.commands, []
+        return [await command(*args) for command, args in commands]
+
+
+class Upstream:
+    """応答の状態（ok / 500 / timeout / 404 / 429）を切り替えられる偽のCoinGecko"""
+
+    def __init__(self):
+        self.mode = "ok"
+        self.calls = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.mode == "500":
+            return httpx.Response(500)
+        if self.mode == "timeout":
+            raise httpx.ReadTimeout("timed out", request=request)
+        if self.mode == "404":
+            return httpx.Response(404)
+        if self.mode == "429":
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        symbols = {coin_id: symbol for symbol, coin_id in CryptoService.COIN_ID_MAP.items()}
+        ids = request.url.params["ids"].split(",")
+        return httpx.Response(200, json=[
+            {
+                "id": coin_id,
+                "symbol": symbols[coin_id].lower(),
+                "current_price": 45000.0,
+                "last_updated": "2024-01-01T00:00:00Z",
+            }
+            for coin_id in ids
+        ])
+
+
+@pytest.fixture
+def outage(monkeypatch):
+    """偽の上流API・Redisと、閾値2・復旧待ち0.05秒のサーキットブレーカーに差し替える"""
+    upstream = Upstream()
+    client_service = HttpClientService()
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05)
+    monkeypatch.setattr(crypto_module, "http_client_service", client_service)
+    monkeypatch.setattr(crypto_module, "coingecko_limiter", TokenBucketLimiter("test", 6000, 100))
+    monkeypatch.setattr(crypto_module, "coingecko_breaker", breaker)
+    monkeypatch.setattr(crypto_module, "single_flight", SingleFlight())
+    monkeypatch.setattr(redis_service, "redis_client", MemoryRedis())
+    monkeypatch.setattr(settings, "PRICE_HISTORY_ENABLED", False)
+    monkeypatch.setattr(settings, "COINGECKO_MAX_RETRIES", 1)
+    monkeypatch.setattr(settings, "COINGECKO_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(settings, "COINGECKO_RETRY_MAX_DELAY", 0.01)
+    return upstream, client_service, breaker, CryptoService()
+
+
+def run_with_client(client_service, upstream, scenario):
+    async def main():
+        await client_service.connect(transport=httpx.MockTransport(upstream.handler))
+        try:
+            return await scenario()
+        finally:
+            await client_service.disconnect()
+
+    return asyncio.run(main())
+
+
+def test_breaker_state_transitions():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=0.05)
+
+    for _ in range(2):
+        breaker.record_failure(breaker.before_call())
+    assert breaker.state == "closed"
+    breaker.record_failure(breaker.before_call())
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # 復旧待ちの後は1件だけ試行し、失敗すれば再び開く
+    time.sleep(0.06)
+    probe = breaker.before_call()
+    assert probe is True and breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure(probe)
+    assert breaker.state == "open"
+
+    # 試行が成功すれば閉じる
+    time.sleep(0.06)
+    breaker.record_success(breaker.before_call())
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 0
+    assert breaker.opened == 2
+    assert breaker.rejected == 2
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=30.0)
+    breaker.record_failure(breaker.before_call())
+    breaker.record_success(breaker.before_call())
+    breaker.record_failure(breaker.before_call())
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("mode", ["500", "timeout"])
+def test_upstream_outage_opens_and_recovers(outage, mode):
+    upstream, client_service, breaker, crypto = outage
+    url = f"{crypto.COINGECKO_API_BASE}/coins/markets"
+
+    async def scenario():
+        upstream.mode = mode
+        try:
+            await crypto._request(url, params={"ids": "bitcoin"})
+        except httpx.TransportError:
+            pass
+        assert breaker.state == "open"
+
+        # 開いている間は上流APIを呼ばない
+        calls = upstream.calls
+        with pytest.raises(CircuitOpenError):
+            await crypto._request(url, params={"ids": "bitcoin"})
+        assert upstream.calls == calls
+
+        upstream.mode = "ok"
+        await asyncio.sleep(0.06)
+        response = await crypto._request(url, params={"ids": "bitcoin"})
+        assert response.status_code == 200
+
+    run_with_client(client_service, upstream, scenario)
+    assert breaker.state == "closed"
+    assert breaker.opened == 1
+
+
+def test_client_errors_do_not_count_as_failures(outage):
+    upstream, client_service, breaker, crypto = outage
+    url = f"{crypto.COINGECKO_API_BASE}/coins/markets"
+
+    async def scenario():
+        upstream.mode = "404"
+        for _ in range(5):
+            response = await crypto._request(url, params={"ids": "bitcoin"})
+            assert response.status_code == 404
+        upstream.mode = "429"
+        for _ in range(3):
+            with pytest.raises(UpstreamRateLimitError):
+                await crypto._request(url, params={"ids": "bitcoin"})
+
+    run_with_client(client_service, upstream, scenario)
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.consecutive_failures == 0
+
+
+def test_last_known_good_is_served_as_stale(outage):
+    upstream, client_service, breaker, crypto = outage
+
+    async def scenario():
+        fresh = await crypto.get_price("BTC")
+        await crypto.get_prices_map(["ETH"])
+        # キャッシュの期限切れ（最後に取得できたデータは残る）
+        await redis_service.delete_many(["crypto:price:BTC", "crypto:price:ETH"])
+
+        upstream.mode = "500"
+        during_outage = [await crypto.get_price("BTC") for _ in range(3)]
+        calls = upstream.calls
+        prices = await crypto.get_prices_map(["BTC", "ETH"])
+        return fresh, during_outage, calls, prices
+
+    fresh, during_outage, calls, prices = run_with_client(client_service, upstream, scenario)
+    assert fresh.is_stale is False
+    assert breaker.state == "open"
+    for price in during_outage + list(prices.values()):
+        assert price.is_stale is True
+        assert price.current_price == 45000.0
+        assert price.data_age_seconds is not None
+    assert set(prices) == {"BTC", "ETH"}
+    # サーキットが開いた後は上流APIを待たずに古い値を返す
+    assert upstream.calls == calls
+    assert crypto.last_known_good_hits == 5
@@ -0,0 +1,211 @@
+"""
+共有HTTPクライアント（HttpClientService）のテスト
+
+CoinGeckoの代わりに httpx.MockTransport を使い、Redis・DBには接続しない。
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import app.main as main_module
+import app.services.crypto_service as crypto_module
+from app.api import metrics as metrics_api
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.crypto_service import CryptoService
+from app.services.http_client import HttpClientService
+from app.services.rate_limiter import TokenBucketLimiter
+from app.services.redis_service import redis_service
+
+
+class FakeCoinGecko:
+    """/coins/markets と /coins/{id}/market_chart を返し、受け取ったリクエストを記録する"""
+
+    def __init__(self):
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path.endswith("/coins/markets"):
+            ids = request.url.params["ids"].split(",")
+            symbols = {coin_id: symbol for symbol, coin_id in CryptoService.COIN_ID_MAP.items()}
+            return httpx.Response(200, json=[
+                {"id": coin_id, "symbol": symbols[coin_id].lower(), "current_price": 100.0 + i}
+                for i, coin_id in enumerate(ids)
+            ])
+        if request.url.path.endswith("/market_chart"):
+            return httpx.Response(200, json={
+                "prices": [[1704067200000 + i * 86400000, 100.0 + i] for i in range(8)]
+            })
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    CryptoServiceが使う共有クライアント・レート制限・サーキットブレーカーを
+    テスト用の新しいインスタンスに差し替え、Redisなしで動かす
+    """
+    fake = FakeCoinGecko()
+    client_service = HttpClientService()
+    monkeypatch.setattr(crypto_module, "http_client_service", client_service)
+    monkeypatch.setattr(crypto_module, "coingecko_limiter", TokenBucketLimiter("test", 6000, 100))
+    monkeypatch.setattr(crypto_module, "coingecko_breaker", CircuitBreaker("test", 5, 30.0))
+    monkeypatch.setattr(redis_service, "redis_client", None)
+    monkeypatch.setattr(settings, "PRICE_HISTORY_ENABLED", False)
+    monkeypatch.setattr(settings, "HTTP_DEFAULT_TIMEOUT", 11.0)
+    monkeypatch.setattr(settings, "HTTP_CONNECT_TIMEOUT", 2.5)
+    monkeypatch.setattr(settings, "COINGECKO_MARKETS_TIMEOUT", 4.0)
+    monkeypatch.setattr(settings, "COINGECKO_CHART_TIMEOUT", 9.0)
+    return fake, client_service, CryptoService()
+
+
+def test_per_endpoint_timeouts(upstream):
+    fake, client_service, crypto = upstream
+
+    async def scenario():
+        await client_service.connect(transport=httpx.MockTransport(fake.handler))
+        try:
+            assert await crypto.get_price("BTC")
+            assert await crypto.get_chart_data("BTC", 7)
+            assert await crypto.get_prices_map(["ETH", "SOL"])
+        finally:
+            await client_service.disconnect()
+
+    asyncio.run(scenario())
+
+    timeouts = {request.url.path: request.extensions["timeout"] for request in fake.requests}
+    markets = timeouts["/api/v3/coins/markets"]
+    chart = timeouts["/api/v3/coins/bitcoin/market_chart"]
+    assert markets["read"] == settings.COINGECKO_MARKETS_TIMEOUT
+    assert chart["read"] == settings.COINGECKO_CHART_TIMEOUT
+    assert markets["connect"] == chart["connect"] == settings.HTTP_CONNECT_TIMEOUT
+
+
+def test_default_timeout_without_override(upstream):
+    fake, client_service, _ = upstream
+
+    async def scenario():
+        await client_service.connect(transport=httpx.MockTransport(fake.handler))
+        try:
+            await client_service.get("https://api.coingecko.com/api/v3/coins/markets", params={"ids": "bitcoin"})
+        finally:
+            await client_service.disconnect()
+
+    asyncio.run(scenario())
+    timeout = fake.requests[0].extensions["timeout"]
+    assert timeout["read"] == settings.HTTP_DEFAULT_TIMEOUT
+    assert timeout["connect"] == settings.HTTP_CONNECT_TIMEOUT
+
+
+def test_client_is_reused_across_calls(upstream, monkeypatch):
+    fake, client_service, crypto = upstream
+    created = []
+
+    class CountingClient(httpx.AsyncClient):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", CountingClient)
+
+    async def scenario():
+        await client_service.connect(transport=httpx.MockTransport(fake.handler))
+        client = client_service.client
+        try:
+            await crypto.get_price("BTC")
+            await crypto.get_price("ETH")
+            await crypto.get_chart_data("SOL", 7)
+            await crypto.get_prices_map(["ADA", "DOT"])
+            # 接続済みなら再度connectしても作り直さない
+            await client_service.connect(transport=httpx.MockTransport(fake.handler))
+            assert client_service.client is client
+        finally:
+            await client_service.disconnect()
+
+    asyncio.run(scenario())
+    assert len(fake.requests) == 4
+    assert len(created) == 1
+    assert client_service.get_stats()["total_requests"] == 4
+
+
+def test_request_counters_and_metrics_endpoint(monkeypatch):
+    client_service = HttpClientService()
+    monkeypatch.setattr(metrics_api, "http_client_service", client_service)
+
+    async def scenario():
+        entered = asyncio.Queue()
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/fail":
+                raise httpx.ConnectError("connection refused", request=request)
+            await entered.put(request.url.path)
+            await release.wait()
+            return httpx.Response(200, json={"ok": True})
+
+        await client_service.connect(transport=httpx.MockTransport(handler))
+        try:
+            calls = [asyncio.create_task(client_service.get(f"https://upstream.test/{i}")) for i in range(3)]
+            for _ in calls:
+                await entered.get()
+
+            stats = client_service.get_stats()
+            assert stats["connected"] is True
+            assert stats["in_flight"] == 3
+            assert stats["peak_in_flight"] == 3
+
+            release.set()
+            await asyncio.gather(*calls)
+            with pytest.raises(httpx.ConnectError):
+                await client_service.get("https://upstream.test/fail")
+
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main_module.app), base_url="http://api.test"
+            ) as api:
+                response = await api.get(f"{settings.API_V1_PREFIX}/metrics/http")
+        finally:
+            await client_service.disconnect()
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] == 3
+    assert stats["total_requests"] == 4
+    assert stats["total_errors"] == 1
+    assert stats["max_connections"] == settings.HTTP_MAX_CONNECTIONS
+
+
+def test_lifespan_opens_and_closes_client(monkeypatch):
+    client_service = HttpClientService()
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def unreachable():
+        return False
+
+    # HTTPクライアント以外の依存（DB・Redis・計算プール・事前更新）は起動しない
+    monkeypatch.setattr(main_module, "http_client_service", client_service)
+    monkeypatch.setattr(main_module, "init_db", noop)
+    monkeypatch.setattr(redis_service, "connect", noop)
+    monkeypatch.setattr(redis_service, "disconnect", noop)
+    monkeypatch.setattr(redis_service, "ping", unreachable)
+    monkeypatch.setattr(main_module.compute_pool, "start", lambda: None)
+    monkeypatch.setattr(main_module.compute_pool, "shutdown", lambda: None)
+    monkeypatch.setattr(settings, "PREWARM_ENABLED", False)
+
+    async def scenario():
+        async with main_module.lifespan(main_module.app):
+            client = client_service.client
+            assert client is not None
+            assert not client.is_closed
+        return client
+
+    client = asyncio.run(scenario())
+    assert client.is_closed
+    assert client_service.client is None
+    assert client_service.get_stats()["connected"] is False
@@ -0,0 +1,160 @@
+"""
+指標計算バックエンドの一致テスト
+
+INDICATOR_BACKEND=python（リファレンス実装）とNumPyバックエンドの結果が
+1e-9 以内で一致することを確認する。
+"""
+import math
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.services import numpy_indicators
+from app.services.analysis_service import AnalysisService
+
+np = pytest.importorskip("numpy")
+
+TOLERANCE = 1e-9
+MIN_POINTS = AnalysisService.NUMPY_MIN_POINTS
+LENGTHS = [MIN_POINTS - 1, MIN_POINTS, MIN_POINTS + 1, 365]
+
+
+def make_prices(n: int, start: float, seed: int = 42) -> list:
+    """再現可能なランダムウォークの価格系列"""
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(n - 1):
+        prices.append(prices[-1] * (1 + rng.gauss(0, 0.03)))
+    return prices
+
+
+def assert_close(actual, expected, label: str = ""):
+    """数値（または数値の系列）が相対・絶対とも1e-9以内で一致することを確認"""
+    actual = np.asarray(actual, dtype=np.float64).tolist()
+    expected = np.asarray(expected, dtype=np.float64).tolist()
+    if not isinstance(expected, list):
+        actual, expected = [actual], [expected]
+    assert len(actual) == len(expected), label
+    for i, (a, e) in enumerate(zip(actual, expected)):
+        assert math.isclose(a, e, rel_tol=TOLERANCE, abs_tol=TOLERANCE), f"{label}[{i}]: {a} != {e}"
+
+
+def assert_series_equal(actual: dict, expected: dict):
+    """系列辞書の数値系列は1e-9以内、シグナル・位置の系列は完全一致を確認"""
+    assert actual.keys() == expected.keys()
+    for key, values in expected.items():
+        if key in ("macd_signal", "bb_position"):
+            assert list(actual[key]) == list(values), key
+        else:
+            assert_close(actual[key], values, key)
+
+
+def reference_slope(prices: list) -> float:
+    """線形回帰の傾き（calculate_trendの純Python実装と同じ定義）"""
+    n = len(prices)
+    x_mean = (n - 1) / 2
+    y_mean = sum(prices) / n
+    numerator = sum((i - x_mean) * (prices[i] - y_mean) for i in range(n))
+    denominator = sum((i - x_mean) ** 2 for i in range(n))
+    return numerator / denominator
+
+
+@pytest.fixture
+def python_service(monkeypatch):
+    monkeypatch.setattr(settings, "INDICATOR_BACKEND", "python")
+    service = AnalysisService()
+    assert service.backend == "python"
+    return service
+
+
+@pytest.fixture
+def numpy_service(monkeypatch):
+    if not numpy_indicators.NUMPY_AVAILABLE:
+        pytest.skip("NumPy is not available")
+    monkeypatch.setattr(settings, "INDICATOR_BACKEND", "numpy")
+    service = AnalysisService()
+    assert service.backend == "numpy"
+    return service
+
+
+PRICE_CASES = {
+    "altcoin": lambda n: make_prices(n, 2.5),
+    "btc_scale": lambda n: make_prices(n, 65000.0, seed=7),
+    "micro_cap": lambda n: make_prices(n, 0.00001234, seed=3),
+    "constant": lambda n: [45000.0] * n,
+}
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+@pytest.mark.parametrize("case", PRICE_CASES)
+def test_series_parity(python_service, numpy_service, case, n):
+    prices = PRICE_CASES[case](n)
+
+    assert_close(numpy_service.calculate_rsi_series(prices), python_service.calculate_rsi_series(prices), "rsi")
+    assert_series_equal(numpy_service.calculate_macd_series(prices), python_service.calculate_macd_series(prices))
+    assert_series_equal(
+        numpy_service.calculate_bollinger_series(prices), python_service.calculate_bollinger_series(prices)
+    )
+    assert_close(numpy_service.calculate_ema(prices, 12), python_service.calculate_ema(prices, 12), "ema")
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+@pytest.mark.parametrize("case", PRICE_CASES)
+def test_volatility_and_trend_parity(python_service, numpy_service, case, n):
+    prices = PRICE_CASES[case](n)
+
+    assert_close(numpy_service.calculate_volatility(prices), python_service.calculate_volatility(prices))
+
+    trend, strength = numpy_service.calculate_trend(prices)
+    expected_trend, expected_strength = python_service.calculate_trend(prices)
+    assert trend == expected_trend
+    assert_close(strength, expected_strength, "trend_strength")
+
+    if case != "constant":
+        slope, y_mean = numpy_indicators.trend_slope(prices)
+        assert_close(slope, reference_slope(prices), "slope")
+        assert_close(y_mean, sum(prices) / n, "y_mean")
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 14, 15, 20, 26, 34, 35])
+def test_short_series_parity(python_service, n):
+    """NUMPY_MIN_POINTS未満でもNumPy関数自体はリファレンス実装と一致する"""
+    if not numpy_indicators.NUMPY_AVAILABLE:
+        pytest.skip("NumPy is not available")
+    prices = make_prices(n, 30000.0, seed=n)
+
+    assert_close(numpy_indicators.rsi_series(prices), python_service.calculate_rsi_series(prices), "rsi")
+    assert_series_equal(numpy_indicators.macd_series(prices), python_service.calculate_macd_series(prices))
+    assert_series_equal(
+        numpy_indicators.bollinger_series(prices), python_service.calculate_bollinger_series(prices)
+    )
+    assert_close(numpy_indicators.volatility(prices), python_service.calculate_volatility(prices), "volatility")
+
+
+@pytest.mark.parametrize("n", [MIN_POINTS - 1, MIN_POINTS + 1, 200])
+def test_two_dimensional_parity(python_service, numpy_service, n):
+    """(時点, 銘柄) の2次元配列の各列がリファレンス実装の1次元の結果と一致する"""
+    columns = [make_prices(n, start, seed=i) for i, start in enumerate([65000.0, 3200.0, 0.45, 1.0])]
+    columns.append([100.0] * n)
+    matrix = np.column_stack(columns)
+
+    rsi = numpy_indicators.rsi_series(matrix)
+    macd = numpy_indicators.macd_series(matrix)
+    bollinger = numpy_indicators.bollinger_series(matrix)
+    ema = numpy_indicators.ema(matrix, 26)
+    assert rsi.shape == matrix.shape
+
+    for j, column in enumerate(columns):
+        assert_close(rsi[:, j], python_service.calculate_rsi_series(column), f"rsi col {j}")
+        assert_series_equal(
+            {key: values[:, j] for key, values in macd.items()}, python_service.calculate_macd_series(column)
+        )
+        assert_series_equal(
+            {key: values[:, j] for key, values in bollinger.items()},
+            python_service.calculate_bollinger_series(column)
+        )
+        assert_close(ema[:, j], python_service.calculate_ema(column, 26), f"ema col {j}")
+
+    # サービス経由でも2次元配列をそのまま受け取れる
+    assert_close(numpy_service.calculate_rsi_series(matrix)[:, 0], rsi[:, 0], "service rsi")
@@ -0,0 +1,139 @@
+"""
+価格取得の集約（single-flight）のテスト
+
+CoinGeckoの代わりに httpx.MockTransport を使い、Redis・DBには接続しない。
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import app.services.crypto_service as crypto_module
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.crypto_service import CryptoService
+from app.services.http_client import HttpClientService
+from app.services.rate_limiter import TokenBucketLimiter
+from app.services.redis_service import redis_service
+from app.services.single_flight import SingleFlight
+
+
+class SlowMarkets:
+    """/coins/markets を少し遅れて返し、リクエストごとのidsを記録する"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.requested = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        ids = request.url.params["ids"].split(",")
+        self.requested.append(sorted(ids))
+        await asyncio.sleep(self.delay)
+        symbols = {coin_id: symbol for symbol, coin_id in CryptoService.COIN_ID_MAP.items()}
+        return httpx.Response(200, json=[
+            {
+                "id": coin_id,
+                "symbol": symbols[coin_id].lower(),
+                "current_price": 100.0 + i,
+                "last_updated": "2024-01-01T00:00:00Z",
+            }
+            for i, coin_id in enumerate(ids)
+        ])
+
+
+@pytest.fixture
+def markets(monkeypatch):
+    """共有クライアント・レート制限・サーキットブレーカー・single-flightをテスト用に差し替える"""
+    upstream = SlowMarkets()
+    client_service = HttpClientService()
+    flights = SingleFlight()
+    monkeypatch.setattr(crypto_module, "http_client_service", client_service)
+    monkeypatch.setattr(crypto_module, "coingecko_limiter", TokenBucketLimiter("test", 6000, 100))
+    monkeypatch.setattr(crypto_module, "coingecko_breaker", CircuitBreaker("test", 5, 30.0))
+    monkeypatch.setattr(crypto_module, "single_flight", flights)
+    monkeypatch.setattr(redis_service, "redis_client", None)
+    monkeypatch.setattr(settings, "PRICE_HISTORY_ENABLED", False)
+    return upstream, client_service, flights, CryptoService()
+
+
+def run_with_client(client_service, upstream, scenario):
+    async def main():
+        await client_service.connect(transport=httpx.MockTransport(upstream.handler))
+        try:
+            return await scenario()
+        finally:
+            await client_service.disconnect()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_batches_share_one_upstream_call(markets):
+    upstream, client_service, flights, crypto = markets
+
+    async def scenario():
+        return await asyncio.gather(*(crypto.get_prices_map(["BTC", "ETH", "SOL"]) for _ in range(20)))
+
+    results = run_with_client(client_service, upstream, scenario)
+    assert upstream.requested == [["bitcoin", "ethereum", "solana"]]
+    assert all(set(prices) == {"BTC", "ETH", "SOL"} for prices in results)
+    assert flights.get_stats()["coalesced"] == 19 * 3
+    assert flights.get_stats()["in_flight"] == 0
+
+
+def test_only_symbols_not_in_flight_go_upstream(markets):
+    upstream, client_service, _, crypto = markets
+
+    async def scenario():
+        first = asyncio.ensure_future(crypto.get_prices_map(["BTC", "ETH"]))
+        single = asyncio.ensure_future(crypto.get_price("SOL"))
+        await asyncio.sleep(0)
+        second = await crypto.get_prices_map(["ETH", "SOL", "ADA"])
+        return await first, await single, second
+
+    first, single, second = run_with_client(client_service, upstream, scenario)
+    assert sorted(upstream.requested) == [["bitcoin", "ethereum"], ["cardano"], ["solana"]]
+    assert set(first) == {"BTC", "ETH"}
+    assert single.symbol == "SOL"
+    assert set(second) == {"ETH", "SOL", "ADA"}
+    assert second["ETH"].current_price == first["ETH"].current_price
+
+
+def test_stale_revalidation_is_coalesced(markets, monkeypatch):
+    upstream, client_service, _, crypto = markets
+    stale_at = time.time() - settings.PRICE_CACHE_SOFT_TTL - 1
+
+    async def stale_cache(keys):
+        return [
+            {"data": {"symbol": key.rsplit(":", 1)[1], "name": "x", "current_price": 1.0,
+                      "last_updated": "2024-01-01T00:00:00Z"}, "cached_at": stale_at}
+            for key in keys
+        ]
+
+    monkeypatch.setattr(redis_service, "mget", stale_cache)
+
+    async def scenario():
+        results = await asyncio.gather(*(crypto.get_prices_map(["BTC", "ETH"]) for _ in range(10)))
+        await asyncio.gather(*crypto._background_tasks)
+        return results
+
+    results = run_with_client(client_service, upstream, scenario)
+    # 古い値はその場で返し、再取得は10リクエストで1回だけ
+    assert all(prices["BTC"].current_price == 1.0 for prices in results)
+    assert upstream.requested == [["bitcoin", "ethereum"]]
+    assert crypto.stale_hits == 20
+
+
+def test_prewarm_refresh_joins_user_fetch(markets):
+    upstream, client_service, _, crypto = markets
+
+    async def scenario():
+        user = asyncio.ensure_future(crypto.get_prices_map(["BTC", "ETH"]))
+        await asyncio.sleep(0)
+        refreshed = await crypto.refresh_prices(["BTC", "ETH", "DOT"])
+        return await user, refreshed
+
+    user, refreshed = run_with_client(client_service, upstream, scenario)
+    assert sorted(upstream.requested) == [["bitcoin", "ethereum"], ["polkadot"]]
+    assert set(refreshed) == {"BTC", "ETH", "DOT"}
+    assert refreshed["BTC"].current_price == user["BTC"].current_price
@@ -0,0 +1,129 @@
+"""
+逐次更新版テクニカル指標の一致テスト
+
+StreamingIndicatorSet を1本ずつ更新した値が、純Python・NumPyの各バックエンドの系列計算
+（calculate_indicator_series）のi番目と1e-9以内で一致することと、
+to_dict / from_dict（JSON経由）で途中の状態を復元しても結果が変わらないことを確認する。
+"""
+import json
+import math
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.services import numpy_indicators, streaming_indicators
+from app.services.analysis_service import AnalysisService
+from app.services.streaming_indicators import StreamingEMA, StreamingIndicatorSet
+
+TOLERANCE = 1e-9
+LABELS = ("macd_signal", "bb_position")
+
+
+def make_prices(n: int, start: float, seed: int) -> list:
+    """再現可能なランダムウォークの価格系列"""
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(n - 1):
+        prices.append(prices[-1] * (1 + rng.gauss(0, 0.03)))
+    return prices
+
+
+def assert_values_match(values: dict, series: dict, i: int):
+    """逐次更新の値が系列のi番目と一致する（数値は1e-9以内、シグナル・位置は完全一致）"""
+    assert values.keys() == series.keys()
+    for key, value in values.items():
+        expected = series[key][i]
+        if key in LABELS:
+            assert value == expected, f"{key}[{i}]"
+        else:
+            assert math.isclose(value, expected, rel_tol=TOLERANCE, abs_tol=TOLERANCE), (
+                f"{key}[{i}]: {value} != {expected}"
+            )
+
+
+def round_trip(indicator):
+    """状態をJSON文字列にしてから復元する（Redisに保存して別プロセスで続ける場合と同じ）"""
+    return streaming_indicators.from_dict(json.loads(json.dumps(indicator.to_dict())))
+
+
+@pytest.fixture(params=["python", "numpy"])
+def service(request, monkeypatch):
+    if request.param == "numpy" and not numpy_indicators.NUMPY_AVAILABLE:
+        pytest.skip("NumPy is not available")
+    monkeypatch.setattr(settings, "INDICATOR_BACKEND", request.param)
+    service = AnalysisService()
+    assert service.backend == request.param
+    return service
+
+
+PRICE_CASES = {
+    "altcoin": lambda n, seed: make_prices(n, 2.5, seed),
+    "btc_scale": lambda n, seed: make_prices(n, 65000.0, seed),
+    "micro_cap": lambda n, seed: make_prices(n, 0.00001234, seed),
+    "constant": lambda n, seed: [45000.0] * n,
+}
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("case", PRICE_CASES)
+def test_streaming_matches_series(service, case, seed):
+    prices = PRICE_CASES[case](120, seed)
+    series = service.calculate_indicator_series(prices)
+
+    indicator = StreamingIndicatorSet()
+    for i, price in enumerate(prices):
+        assert_values_match(indicator.update(price), series, i)
+    assert indicator.count == len(prices)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_round_trip_preserves_state(service, seed):
+    """毎回の更新の後で状態を復元し直しても系列計算と一致する"""
+    prices = make_prices(150, 30000.0, seed)
+    series = service.calculate_indicator_series(prices)
+
+    indicator = StreamingIndicatorSet()
+    for i, price in enumerate(prices):
+        indicator = round_trip(indicator)
+        assert_values_match(indicator.update(price), series, i)
+
+
+@pytest.mark.parametrize("split", [0, 1, 13, 14, 25, 26, 34, 35, 100])
+def test_resume_after_split(split):
+    """途中まで計算した状態から再開した値が、最初から計算し続けた値と一致する"""
+    prices = make_prices(120, 1800.0, seed=split)
+
+    continuous = StreamingIndicatorSet()
+    expected = [continuous.update(price) for price in prices]
+
+    resumed = StreamingIndicatorSet()
+    resumed.extend(prices[:split])
+    resumed = round_trip(resumed)
+    assert [resumed.update(price) for price in prices[split:]] == expected[split:]
+    assert resumed.to_dict() == continuous.to_dict()
+
+
+def test_custom_periods(service):
+    prices = make_prices(80, 100.0, seed=5)
+    params = {"rsi_period": 7, "macd_fast": 5, "macd_slow": 10, "macd_signal_period": 4,
+              "bb_period": 10, "bb_std_dev": 1.5}
+    series = service.calculate_indicator_series(prices, **params)
+
+    indicator = StreamingIndicatorSet(**params)
+    for i, price in enumerate(prices):
+        assert_values_match(indicator.update(price), series, i)
+
+
+def test_ema_matches_reference(service):
+    prices = make_prices(100, 250.0, seed=9)
+    expected = service.calculate_ema(prices, 12)
+    ema = StreamingEMA(12)
+    values = [ema.update(price) for price in prices]
+    for value, reference in zip(values[-len(expected):], expected):
+        assert math.isclose(value, reference, rel_tol=TOLERANCE, abs_tol=TOLERANCE)
+
+
+def test_unknown_state_type():
+    with pytest.raises(ValueError):
+        streaming_indicators.from_dict({"type": "vwap"})